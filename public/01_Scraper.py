@@ -8,6 +8,12 @@ import pandas as pd
 import hashlib
 import pyperclip
 
+from lead_store import open_store, ensure_table, upsert_row
+from pipeline import PIPELINE_RUN, SCRAPED_TABLE, wait_for_room, run_keywords
+from handoff import append_table
+from telemetry import record, timed
+from progress import ProgressTracker
+
 
 LOG_FILE = "log_01"
 
@@ -258,31 +264,46 @@ def main():
         "profile.default_content_setting_values.notifications": 1
     }
     options.add_experimental_option("prefs", prefs)
-    driver = uc.Chrome(options=options, version_main=138)
+    with timed("selenium", "chrome_start"):
+        driver = uc.Chrome(options=options, version_main=138)
 
-    login_to_linkedin(driver)
+    with timed("selenium", "login"):
+        login_to_linkedin(driver)
 
     # Load already logged posts
     logged_posts = load_logged_posts()
 
-    try:
-        with open("keywords.txt", "r", encoding="utf-8") as f:
-            keywords = [line.strip() for line in f if line.strip()]
-    except Exception as e:
-        print(f"Erreur lors de la lecture du fichier keywords.txt : {e}")
-        return
+    # Mode pipeline: chaque post part tout de suite vers l'enrichissement via le store
+    conn = None
+    if PIPELINE_RUN:
+        conn = open_store()
+        ensure_table(conn, SCRAPED_TABLE)
+
+    # 06_Executable --keywords remplace keywords.txt pour ce run
+    keywords = run_keywords()
+    if keywords:
+        print(f"Mots-clés du run : {', '.join(keywords)}")
+    else:
+        try:
+            with open("keywords.txt", "r", encoding="utf-8") as f:
+                keywords = [line.strip() for line in f if line.strip()]
+        except Exception as e:
+            print(f"Erreur lors de la lecture du fichier keywords.txt : {e}")
+            return
 
     all_data = []
+    MAX_POSTS = int(os.environ.get("MAX_POSTS") or 20)  # 06_Executable --max-posts
+    progress = ProgressTracker("scrape", total=len(keywords) * MAX_POSTS, unit="posts")
 
     for keyword in keywords:
         print(f"\n==== Traitement du mot-clé : {keyword} ====")
-        go_to_hashtag_page(driver, keyword)
+        with timed("selenium", "search_page", keyword=keyword):
+            go_to_hashtag_page(driver, keyword)
         feed_url = driver.current_url
 
         data_list = []
         seen_post_ids = set()
         post_index = 0
-        MAX_POSTS = 20
         scroll_attempts = 0
         MAX_SCROLLS = 70
 
@@ -303,7 +324,9 @@ def main():
                     post_index += 1
                     continue
 
-                data = extract_post_data(driver, post, post_index, feed_url)
+                with timed("row", "scrape", keyword=keyword) as fields:
+                    data = extract_post_data(driver, post, post_index, feed_url)
+                    fields["ok"] = bool(data)
                 if data:
                     if data['post_id'] in logged_posts:
                         print(f"Post #{post_index+1} déjà loggé, ignoré.")
@@ -318,37 +341,39 @@ def main():
                     logged_posts.add(data['post_id'])
                     data['keyword'] = keyword
                     data_list.append(data)
+                    progress.advance()
                     print(f"Post #{post_index+1} extrait. Total: {len(data_list)}/{MAX_POSTS}")
+                    if conn is not None:
+                        upsert_row(conn, SCRAPED_TABLE, data['post_id'], data)
+                        # Back-pressure: on attend si l'enrichissement a trop de retard
+                        record("backpressure", "scrape", wait_for_room(conn, "scrape", "enrich"))
 
                 post_index += 1
 
             if len(data_list) < MAX_POSTS:
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
                 print("Scroll supplémentaire... en attente de nouveaux posts.")
-                time.sleep(7)
+                with timed("selenium", "scroll_wait", keyword=keyword):
+                    time.sleep(7)
                 scroll_attempts += 1
 
         all_data.extend(data_list)
+        progress.total -= MAX_POSTS - len(data_list)  # mot-clé épuisé avant MAX_POSTS: ETA recalculée
 
     df = pd.DataFrame(all_data)
     df.drop_duplicates(subset=["post_id"], inplace=True)
     
-    # Save results: append to Scraped.xlsx if exists
-    output_file = 'Scraped.xlsx'
-    if os.path.exists(output_file):
-        try:
-            existing_df = pd.read_excel(output_file)
-            combined_df = pd.concat([existing_df, df], ignore_index=True)
-            combined_df.drop_duplicates(subset=["post_id"], inplace=True)
-            combined_df.to_excel(output_file, index=False)
-            print("Données ajoutées à Scraped.xlsx existant.")
-        except Exception as e:
-            print(f"Impossible d'ajouter à Scraped.xlsx : {e}")
-    else:
-        df.to_excel(output_file, index=False)
-        print("Scraped.xlsx créé avec les données.")
+    # Save results: nouveau row group ajouté à Scraped (Parquet), l'historique n'est pas réécrit
+    try:
+        append_table(df, "Scraped", dedup_on="post_id")
+        print(f"{len(df)} posts ajoutés à Scraped.")
+    except Exception as e:
+        print(f"Impossible d'ajouter à Scraped : {e}")
     print("Extraction terminée.")
+    progress.finish()
 
+    if conn is not None:
+        conn.close()
     driver.quit()
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import pandas as pd
 import re
-import os
+
+from handoff import read_table, write_table, table_path
+from progress import ProgressTracker
 
 # Fonction de nettoyage sans emojis
 def clean_text(text):
@@ -13,8 +15,8 @@ def clean_text(text):
     text = re.sub(r"[^\w\s]", "", text)                 
     return text.lower().strip()
 
-def load_data(filepath="Scraped.xlsx"):
-    return pd.read_excel(filepath)
+def load_data(filepath="Scraped"):
+    return read_table(filepath)
 
 # Nettoyage 
 def enrich_data(df):
@@ -25,15 +27,15 @@ def enrich_data(df):
 
 def main():
     df = load_data()
+    progress = ProgressTracker("clean", total=len(df))
     df = enrich_data(df)
     
-    # Supprimer le fichier existant s'il existe pour le remplacer
-    output_file = "Cleaned.xlsx"
-    if os.path.exists(output_file):
-        os.remove(output_file)
-    
-    df.to_excel(output_file, index=False)
-    print(f"Fichier nettoyé généré : {output_file}")
+    # Remplace la table existante (Parquet, + .xlsx si EXPORT_EXCEL=all)
+    output_file = "Cleaned"
+    write_table(df, output_file)
+    print(f"Fichier nettoyé généré : {table_path(output_file)}")
+    progress.advance(len(df))
+    progress.finish()
 
 if __name__ == "__main__":
     main()
@@ -2,162 +2,55 @@ import os
 import re
 import json
 import time
+import argparse
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 from random import uniform
-from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
 
+from llm_cache import LLMCache, CachedChain
+from llm_dispatcher import DispatchedLLM, get_dispatcher, load_chain_models, chain_model  # Backends Ollama partagés (OLLAMA_BACKENDS)
+from context_compactor import COMPACT_SNIPPETS, compact_snippets, count_tokens
+from page_fetch import scrape_page_text, get_session  # Téléchargement borné + extraction lxml incrémentale, session partagée
+from lead_store import (
+    STORE_FILE, row_key, open_store, ensure_table, count_rows, load_keys,
+    upsert_row, upsert_many, read_rows, read_frame,
+)
+from pipeline import POLL_SECONDS, backlog, cleaned_frame, stage_finished, wait_for_room, in_scope, row_limit
+from progress import ProgressTracker
+from handoff import read_table, write_table, table_exists, table_mtime, table_path
+from telemetry import record
+from lead_schema import without_text  # post_text reste dans Cleaned, référencé par post_id
+from priority import order_frame, IntervalExport  # mode --priority de 06: meilleurs posts d'abord
+
 # === SETTINGS ===
-INPUT_FILE = "Cleaned.xlsx"
-OUTPUT_FILE = "Enriched.xlsx"
+INPUT_FILE = table_path("Cleaned")    # Parquet (repli sur Cleaned.xlsx si absent)
+OUTPUT_FILE = table_path("Enriched")
 
-# --- Nouveau schéma de logs ---
-LOG_FILE = "log_03.csv"        # CSV append-only succès/erreurs
-LOG_TXT = "log.txt"            # Liste simple d'index traités (reprise)
-BATCH_SAVE = 50                # Sauvegarde vers Enriched.xlsx toutes les N lignes
+# --- Résultats: store SQLite (une ligne commitée par post traité) ---
+STORE_TABLE = "enriched"
+TOKENS_TABLE = "enrich_tokens"   # Taille des prompts d'enrichissement par post (avant/après compaction)
+LOG_FILE = "log_03.csv"        # Ancien CSV append-only, importé une fois dans le store
+EXPORT_EVERY = int(os.environ.get("EXPORT_EVERY", "0"))  # Export Excel intermédiaire toutes les N lignes (0 = fin seulement)
 
 SLEEP_MIN, SLEEP_MAX = 1.5, 3.0
 DEBUG = False
 
-# Colonnes à logger (append dans LOG_FILE, dédupliquées sur 'index' à l'export)
+# Colonnes stockées (upsert sur 'post_id', donc jamais de doublon à l'export)
 COLUMNS_TO_LOG = [
-    "index", "company_name", "website", "location",
+    "post_id", "company_name", "website", "location",
     "one_sentence_description",
     "professional_email", "post_author", "author_role",
     "city", "country", "web_source_used", "inference_confidence",
     "theme", "post_url", "error"
 ]
 
-# === UTILITAIRES WEB ===
-def duckduckgo_search_with_urls(query, max_results=3):
-    try:
-        url = f"https://html.duckduckgo.com/html/?q={query}"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
-        results = []
-        for link in soup.select(".result__a")[:max_results]:
-            href = link.get("href")
-            if href and href.startswith("http"):
-                results.append(href)
-        return results
-    except Exception as e:
-        print(f"[ERROR] DuckDuckGo search failed: {str(e)}")
-        return []
-
-def scrape_page_text(url):
-    try:
-        res = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-        soup = BeautifulSoup(res.text, "html.parser")
-        title = soup.title.string.strip() if soup.title and soup.title.string else ""
-        meta_desc = soup.find("meta", attrs={"name": "description"})
-        meta = meta_desc["content"].strip() if meta_desc and meta_desc.get("content") else ""
-        paragraphs = " ".join(p.get_text(strip=True) for p in soup.find_all("p")[:5])
-        return f"[URL: {url}]\nTitle: {title}\nMeta: {meta}\nContent: {paragraphs[:1000]}"
-    except Exception as e:
-        return f"[URL: {url}] - Failed to scrape: {str(e)}"
-
-# === JSON SAFE PARSE ===
-def safe_json_parse(response_text):
-    """Safely parse JSON from LLM response"""
-    try:
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        else:
-            print(f"[WARNING] No JSON found in response: {response_text[:200]}...")
-            return {}
-    except json.JSONDecodeError as e:
-        print(f"[ERROR] JSON parsing failed: {str(e)}")
-        print(f"Response was: {response_text[:200]}...")
-        return {}
-
-# === LOGGING (CSV + TXT) ===
-def ensure_log_headers():
-    if not os.path.exists(LOG_FILE):
-        pd.DataFrame(columns=COLUMNS_TO_LOG).to_csv(LOG_FILE, index=False)
-
-def load_logged_items_from_csv():
-    if os.path.exists(LOG_FILE):
-        try:
-            logged_df = pd.read_csv(LOG_FILE, usecols=["index"])
-            return set(logged_df["index"].tolist())
-        except Exception:
-            return set()
-    return set()
-
-def load_logged_items_from_txt():
-    if not os.path.exists(LOG_TXT):
-        return set()
-    items = set()
-    with open(LOG_TXT, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line.isdigit() or (line and line.lstrip("-").isdigit()):
-                items.add(int(line))
-    return items
-
-def append_log_txt(item_id):
-    try:
-        with open(LOG_TXT, "a", encoding="utf-8") as f:
-            f.write(f"{item_id}\n")
-    except Exception as e:
-        print(f"[WARNING] Failed to append to {LOG_TXT}: {e}")
-
-def clear_log_txt():
-    try:
-        if os.path.exists(LOG_TXT):
-            os.remove(LOG_TXT)
-    except Exception as e:
-        print(f"[WARNING] Failed to clear {LOG_TXT}: {e}")
-
-def _append_log_row(row_dict):
-    # Écrit une ligne dans LOG_FILE en respectant l'ordre des colonnes
-    try:
-        pd.DataFrame([row_dict])[COLUMNS_TO_LOG].to_csv(LOG_FILE, mode="a", header=False, index=False)
-    except Exception as e:
-        print(f"[ERROR] Failed writing to {LOG_FILE}: {e}")
-
-def save_enriched_snapshot(df_input):
-    """Fusionne df_input (Cleaned.xlsx) avec le LOG_FILE dédupliqué, puis écrit OUTPUT_FILE."""
-    try:
-        if not os.path.exists(LOG_FILE):
-            # Si pas de log, exporter seulement l'input
-            df_input.to_excel(OUTPUT_FILE, index=False)
-            return
-        log_df = pd.read_csv(LOG_FILE)
-        # Déduplication stricte sur 'index' (on garde la dernière occurrence)
-        log_df = log_df.drop_duplicates(subset=["index"], keep="last")
-        merged = df_input.merge(log_df, how="left", left_index=True, right_on="index")
-        merged.to_excel(OUTPUT_FILE, index=False)
-    except Exception as e:
-        print(f"[WARNING] Failed to save snapshot to {OUTPUT_FILE}: {e}")
-
-# === MAIN ===
-def main():
-    # Lecture input
-    df = pd.read_excel(INPUT_FILE)
-    print(f"[INFO] Total rows: {len(df)}")
-
-    # Prépare fichiers de log
-    ensure_log_headers()
-
-    # Reprise: indices déjà faits
-    already_done_csv = load_logged_items_from_csv()
-    processed_items_txt = load_logged_items_from_txt()
-    already_done = already_done_csv.union(processed_items_txt)
-    print(f"[INFO] Already processed rows (CSV+TXT): {len(already_done)}")
-
-    # LLM
-    llm = OllamaLLM(model="mistral", temperature=0)
-
-    # --- Prompt inférence nom de société (inchangé) ---
-    inference_prompt = PromptTemplate(
-        input_variables=["author_name", "author_role", "post_text"],
-        template="""
+# === PROMPTS ===
+# --- Prompt inférence nom de société (inchangé) ---
+inference_prompt = PromptTemplate(
+    input_variables=["author_name", "author_role", "post_text"],
+    template="""
 You are a professional assistant. Based on the following LinkedIn post and author info, infer the name of the company the author works at.
 Author: {author_name}
 Role: {author_role}
@@ -171,13 +64,12 @@ If the company cannot be determined, return:
   "inferred_company_name": "Not found"
 }}
 """
-    )
-    inference_chain = inference_prompt | llm
+)
 
-    # --- Prompt classification du thème (5 catégories fixes) ---
-    theme_prompt = PromptTemplate(
-        input_variables=["post_text"],
-        template="""
+# --- Prompt classification du thème (5 catégories fixes) ---
+theme_prompt = PromptTemplate(
+    input_variables=["post_text"],
+    template="""
 You are an expert in marine and offshore infrastructure. Based on the LinkedIn post below, classify the topic into one of the following categories:
 - MARINE INFRASTRUCTURE
 - PIPELINES
@@ -191,13 +83,12 @@ Return your answer in this strict JSON format:
   "theme": "..."
 }}
 """
-    )
-    theme_chain = theme_prompt | llm
+)
 
-    # --- Prompt enrichissement (inchangé) ---
-    enrichment_prompt = PromptTemplate(
-        input_variables=["post_text", "company_name", "author_name", "author_role", "city", "country", "web_snippets"],
-        template="""
+# --- Prompt enrichissement (inchangé) ---
+enrichment_prompt = PromptTemplate(
+    input_variables=["post_text", "company_name", "author_name", "author_role", "city", "country", "web_snippets"],
+    template="""
 You are a B2B research assistant. Your task is to enrich company information based on the provided data and web content.
 Here is the available data:
 LinkedIn Post:
@@ -227,17 +118,219 @@ Return this strict JSON format:
   "inference_confidence": "e.g. 90%"
 }}
 """
-    )
-    enrichment_chain = enrichment_prompt | llm
+)
+
+# === UTILITAIRES WEB ===
+def duckduckgo_search_with_urls(query, max_results=3):
+    try:
+        url = f"https://html.duckduckgo.com/html/?q={query}"
+        headers = {"User-Agent": "Mozilla/5.0"}
+        res = get_session().get(url, headers=headers, timeout=10)
+        soup = BeautifulSoup(res.text, "html.parser")
+        results = []
+        for link in soup.select(".result__a")[:max_results]:
+            href = link.get("href")
+            if href and href.startswith("http"):
+                results.append(href)
+        return results
+    except Exception as e:
+        print(f"[ERROR] DuckDuckGo search failed: {str(e)}")
+        return []
+
+# === JSON SAFE PARSE ===
+def safe_json_parse(response_text):
+    """Safely parse JSON from LLM response"""
+    try:
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+        else:
+            print(f"[WARNING] No JSON found in response: {response_text[:200]}...")
+            return {}
+    except json.JSONDecodeError as e:
+        print(f"[ERROR] JSON parsing failed: {str(e)}")
+        print(f"Response was: {response_text[:200]}...")
+        return {}
+
+# === STORE (SQLite WAL, upsert par ligne, clé = post_id) ===
+def _rekey_positional(rows, df_input):
+    """Rattache des lignes indexées par position à leur post_id.
+
+    Correspondance par post_url d'abord (contenu), puis par index uniquement
+    si l'URL est absente de df_input.
+    """
+    by_url = {}
+    for r in df_input.to_dict(orient="records"):
+        if r.get("post_url"):
+            by_url[str(r["post_url"]).strip()] = row_key(r)
+    keyed, lost = [], 0
+    for r in rows:
+        post_id = by_url.get(str(r.get("post_url") or "").strip())
+        if post_id is None:
+            try:
+                post_id = row_key(df_input.iloc[int(r["index"])])
+            except (KeyError, ValueError, TypeError, IndexError):
+                lost += 1
+                continue
+        r = {k: v for k, v in r.items() if k != "index"}
+        r["post_id"] = post_id
+        keyed.append((post_id, r))
+    return keyed, lost
+
+def migrate_legacy_logs(conn, df_input):
+    """Importe l'ancien LOG_FILE (CSV indexé par position) et re-clé les lignes positionnelles du store."""
+    legacy = [r for r in read_rows(conn, STORE_TABLE) if "post_id" not in r]
+    if legacy:
+        with conn:
+            conn.executemany(f'DELETE FROM "{STORE_TABLE}" WHERE key = ?', [(str(r["index"]),) for r in legacy])
+    elif not count_rows(conn, STORE_TABLE) and os.path.exists(LOG_FILE):
+        try:
+            log_df = pd.read_csv(LOG_FILE).drop_duplicates(subset=["index"], keep="last")
+            legacy = log_df.astype(object).where(log_df.notna(), None).to_dict(orient="records")
+        except Exception as e:
+            print(f"[WARNING] Failed to read legacy {LOG_FILE}: {e}")
+    if not legacy:
+        return 0
+    keyed, lost = _rekey_positional(legacy, df_input)
+    upsert_many(conn, STORE_TABLE, keyed)
+    print(f"[INFO] Migrated {len(keyed)} positional rows to post_id keys ({lost} unmatched, will be re-enriched)")
+    return len(keyed)
+
+def load_processed_items(conn):
+    return load_keys(conn, STORE_TABLE)
+
+def save_result(conn, result, started=None):
+    # Commit immédiat: une ligne présente dans le store = post traité (reprise)
+    try:
+        upsert_row(conn, STORE_TABLE, result["post_id"], result)
+    except Exception as e:
+        print(f"[ERROR] Failed writing post {result['post_id']} to {STORE_FILE.name}: {e}")
+    if started is not None:
+        record("row", "enrich", time.perf_counter() - started, ok=not result.get("error"))
+
+def log_prompt_tokens(conn, post_id, raw_prompt, prompt):
+    tokens = {
+        "post_id": post_id,
+        "prompt_tokens_raw": count_tokens(raw_prompt),
+        "prompt_tokens": count_tokens(prompt),
+    }
+    try:
+        upsert_row(conn, TOKENS_TABLE, post_id, tokens)
+    except Exception as e:
+        print(f"[WARNING] Failed writing prompt tokens for {post_id}: {e}")
+    return tokens
+
+def report_prompt_tokens(conn):
+    tokens = read_frame(conn, TOKENS_TABLE)
+    if tokens.empty:
+        return
+    raw, kept = tokens["prompt_tokens_raw"].sum(), tokens["prompt_tokens"].sum()
+    print(f"[INFO] Enrichment prompt tokens: {kept} sent vs {raw} uncompacted "
+          f"({1 - kept / raw:.0%} saved over {len(tokens)} posts)")
+
+def save_enriched_snapshot(df_input, conn):
+    """Fusionne df_input (Cleaned) avec le store sur post_id, puis écrit OUTPUT_FILE (sans post_text)."""
+    try:
+        log_df = read_frame(conn, STORE_TABLE, columns=COLUMNS_TO_LOG)
+        if log_df.empty:
+            # Si rien en base, exporter seulement l'input
+            write_table(without_text(df_input), OUTPUT_FILE)
+            return
+        keyed_input = df_input.assign(post_id=[row_key(r) for r in df_input.to_dict(orient="records")])
+        merged = keyed_input.merge(log_df, how="left", on="post_id")
+        write_table(without_text(merged), OUTPUT_FILE)
+    except Exception as e:
+        print(f"[WARNING] Failed to save snapshot to {OUTPUT_FILE}: {e}")
+
+def export_needed(processed):
+    # L'export Excel n'est qu'un dump du store: inutile s'il est déjà à jour
+    if processed or not table_exists(OUTPUT_FILE):
+        return True
+    return table_mtime(OUTPUT_FILE) < max(table_mtime(INPUT_FILE), os.path.getmtime(STORE_FILE))
+
+def export_input(conn):
+    """Mode --follow: tout Cleaned (lignes des runs précédents comprises) + les lignes du store pas encore nettoyées par 02."""
+    fresh = cleaned_frame(conn)
+    if not table_exists(INPUT_FILE):
+        return fresh
+    cleaned = read_table(INPUT_FILE)
+    if fresh.empty:
+        return cleaned
+    known = {row_key(r) for r in cleaned.to_dict(orient="records")}
+    new = fresh[[row_key(r) not in known for r in fresh.to_dict(orient="records")]]
+    return pd.concat([cleaned, new], ignore_index=True)
+
+def follow_rows(conn, already_done):
+    """Mode --follow: lignes scrapées au fil de l'eau (store), jusqu'à la fin du scraping."""
+    seen = set(already_done)
+    while True:
+        finished = stage_finished(conn, "scrape")  # lu avant le store: aucune ligne oubliée
+        fresh = in_scope(cleaned_frame(conn))
+        new = [(idx, row) for idx, row in order_frame(fresh, conn).iterrows() if row_key(row) not in seen]
+        for idx, row in new:
+            seen.add(row_key(row))
+            # Back-pressure: on attend si la notation a trop de retard
+            wait_for_room(conn, "enrich", "score")
+            yield idx, row
+        if finished and not new:
+            return
+        if not new:
+            time.sleep(POLL_SECONDS)
+
+# === MAIN ===
+def main(follow=False):
+    # Prépare le store (+ import de l'ancien CSV)
+    conn = open_store()
+
+    # Lecture input (Cleaned, ou le store en mode pipeline)
+    df = cleaned_frame(conn) if follow else read_table(INPUT_FILE)
+    print(f"[INFO] Total rows: {len(df)}")
+    ensure_table(conn, STORE_TABLE)
+    ensure_table(conn, TOKENS_TABLE)
+    migrate_legacy_logs(conn, df)
+
+    # Reprise: post_id déjà faits (indépendant de l'ordre de Cleaned.xlsx)
+    already_done = load_processed_items(conn)
+    print(f"[INFO] Already processed rows (store): {len(already_done)}")
+
+    # LLM (+ cache persistant des réponses, temperature=0 donc déterministe)
+    # Un modèle par chaîne (llm_models.json): les classifications peuvent tourner sur un modèle plus léger
+    llm_cache = LLMCache()
+    models = load_chain_models()
+
+    def chain(name, prompt):
+        return CachedChain(name, prompt, DispatchedLLM(chain_model(name, models), temperature=0), llm_cache)
+
+    inference_chain = chain("inference_chain", inference_prompt)
+    theme_chain = chain("theme_chain", theme_prompt)
+    enrichment_chain = chain("enrichment_chain", enrichment_prompt)
 
     # === Cache du thème: clé (company_name|author_name) ===
     theme_cache = {}
 
-    processed_since_save = 0
+    processed = 0
+    limit = row_limit()  # --limit de 06_Executable (0 = tout)
+
+    # Seules les lignes des mots-clés du run sont traitées (les plus prometteuses d'abord en mode priorité);
+    # l'export reprend tout df
+    scope = order_frame(in_scope(df), conn)
+    def snapshot():
+        save_enriched_snapshot(export_input(conn) if follow else df, conn)
+
+    partial = IntervalExport(snapshot)
 
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="Enriching"):
-        if idx in already_done:
+    # Progression (UI): total connu d'avance, ou ré-estimé d'après le retard sur le scraping en --follow
+    todo = None if follow else sum(1 for r in scope.to_dict(orient="records") if row_key(r) not in already_done)
+    progress = ProgressTracker("enrich", total=min(todo, limit) if todo is not None and limit else todo)
+    rows = follow_rows(conn, already_done) if follow else scope.iterrows()
+    for idx, row in tqdm(rows, total=None if follow else len(scope), desc="Enriching"):
+        post_id = row_key(row)
+        if post_id in already_done:
             continue
+        if limit and processed >= limit:
+            print(f"[INFO] Limite de {limit} lignes atteinte (--limit), arrêt de l'enrichissement")
+            break
+        row_start = time.perf_counter()
 
         post_text = str(row.get("post_text", "")).strip()[:1000]
         author_name = str(row.get("author_name", "")).strip()
@@ -270,7 +363,7 @@ Return this strict JSON format:
         # Skip si données essentielles manquantes
         if not post_text or not author_name or not company_name:
             result = {
-                "index": idx,
+                "post_id": post_id,
                 "company_name": company_name or "Missing",
                 "website": "Missing",
                 "location": "Missing",
@@ -286,12 +379,12 @@ Return this strict JSON format:
                 "post_url": post_url,
                 "error": "Missing essential fields"
             }
-            _append_log_row(result)
-            append_log_txt(idx)
-            processed_since_save += 1
-            if processed_since_save >= BATCH_SAVE:
-                save_enriched_snapshot(df)
-                processed_since_save = 0
+            save_result(conn, result, row_start)
+            processed += 1
+            progress.advance(remaining=backlog(conn, "enrich") if follow else None)
+            if EXPORT_EVERY and processed % EXPORT_EVERY == 0:
+                snapshot()
+            partial.tick()
             time.sleep(uniform(SLEEP_MIN, SLEEP_MAX))
             continue
 
@@ -305,15 +398,25 @@ Return this strict JSON format:
             if DEBUG:
                 print(f"\n[DEBUG] Web snippets for {company_name}:\n{snippets[:500]}...\n")
 
-            response = enrichment_chain.invoke({
+            # Compaction: on ne garde que les phrases utiles (BM25) dans un budget de tokens
+            enrichment_inputs = {
                 "post_text": post_text,
                 "company_name": company_name,
                 "author_name": author_name,
                 "author_role": author_role,
                 "city": city,
                 "country": country,
-                "web_snippets": snippets
-            })
+                "web_snippets": compact_snippets(snippets, company_name) if COMPACT_SNIPPETS else snippets
+            }
+            tokens = log_prompt_tokens(
+                conn, post_id,
+                enrichment_prompt.format(**{**enrichment_inputs, "web_snippets": snippets}),
+                enrichment_prompt.format(**enrichment_inputs),
+            )
+            if DEBUG:
+                print(f"[DEBUG] Prompt tokens for row {idx}: {tokens['prompt_tokens']} (raw {tokens['prompt_tokens_raw']})")
+
+            response = enrichment_chain.invoke(enrichment_inputs)
             parsed = safe_json_parse(response)
 
             # 3) Thème (avec cache)
@@ -333,7 +436,7 @@ Return this strict JSON format:
                 theme_cache[cache_key] = {"parsed": parsed_theme if 'parsed_theme' in locals() else {}, "theme": theme}
 
             result = {
-                "index": idx,
+                "post_id": post_id,
                 "company_name": parsed.get("company_name", company_name),
                 "website": parsed.get("website", "Not found"),
                 "location": parsed.get("location", "Not found"),
@@ -353,7 +456,7 @@ Return this strict JSON format:
         except Exception as e:
             print(f"[ERROR] Enrichment failed for row {idx}: {str(e)}")
             result = {
-                "index": idx,
+                "post_id": post_id,
                 "company_name": company_name,
                 "website": "Error",
                 "location": "Error",
@@ -370,23 +473,34 @@ Return this strict JSON format:
                 "error": str(e)
             }
 
-        # 4) Log CSV append-only + log.txt (reprise)
-        _append_log_row(result)
-        append_log_txt(idx)
+        # 4) Upsert dans le store (fait office de reprise)
+        save_result(conn, result, row_start)
 
-        # 5) Sauvegarde par lot (merge + dédup sur 'index')
-        processed_since_save += 1
-        if processed_since_save >= BATCH_SAVE:
-            save_enriched_snapshot(df)
-            processed_since_save = 0
+        # 5) Export intermédiaire optionnel
+        processed += 1
+        progress.advance(remaining=backlog(conn, "enrich") if follow else None)
+        if EXPORT_EVERY and processed % EXPORT_EVERY == 0:
+            snapshot()
+        partial.tick()  # mode priorité: Enriched réécrit toutes les EXPORT_INTERVAL secondes
 
         # Pause anti-rate-limit
         time.sleep(uniform(SLEEP_MIN, SLEEP_MAX))
 
     # === Sortie finale ===
-    print("\n[INFO] Creating final output file...")
-    save_enriched_snapshot(df)
-    print(f"[INFO] Enriched file saved as: {OUTPUT_FILE}")
+    if follow or export_needed(processed):
+        print("\n[INFO] Creating final output file...")
+        snapshot()
+        print(f"[INFO] Enriched file saved as: {OUTPUT_FILE}")
+    else:
+        print(f"[INFO] {OUTPUT_FILE} already up to date, export skipped")
+    progress.finish()
+    report_prompt_tokens(conn)
+    llm_cache.report()
+    get_dispatcher().report()
+    conn.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Enrichissement des posts nettoyés")
+    parser.add_argument("--follow", action="store_true",
+                        help="lit les posts au fil du scraping (store) au lieu de Cleaned.xlsx (06_Executable --pipeline)")
+    main(follow=parser.parse_args().follow)
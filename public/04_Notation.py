@@ -2,59 +2,69 @@ import os
 import re
 import json
 import time
+import hashlib
+import importlib
+import threading
+import argparse
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
+import numpy as np
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 from tqdm import tqdm
 from random import uniform
-from langchain_ollama import OllamaLLM
 from langchain.prompts import PromptTemplate
 
+from llm_cache import LLMCache, CachedChain, template_hash
+from llm_dispatcher import DispatchedLLM, get_dispatcher, load_chain_models, chain_model
+from geo_gazetteer import GeoScorer, gazetteer_version
+from page_fetch import get_session  # keep-alive connections shared with 03_Enricher
+from telemetry import record
+from project_clusters import cluster_posts
+from pipeline import POLL_SECONDS, backlog, enriched_frame, stage_finished, in_scope, row_limit
+from progress import ProgressTracker
+from priority import order_pairs, IntervalExport  # 06_Executable --priority: best leads first
+from handoff import read_table, write_table, table_exists, table_path
+from lead_schema import attach_text, without_text  # post_text is stored once, in Cleaned
+from lead_store import (
+    STORE_FILE, row_key, open_store, ensure_table, count_rows,
+    upsert_row, upsert_many, read_row, read_frame,
+)
+
 # === SETTINGS (paths resolved relative to this script) ===
 BASE_DIR = Path(__file__).resolve().parent
-INPUT_FILE = Path(os.environ.get("INPUT_FILE", "Enriched.xlsx"))
-OUTPUT_FILE = Path(os.environ.get("OUTPUT_FILE", "Scored_Enriched.xlsx"))
-LOG_FILE = Path(os.environ.get("LOG_FILE", "log_04.txt"))
+INPUT_FILE = Path(os.environ.get("INPUT_FILE", "Enriched"))           # Parquet, or the legacy .xlsx
+OUTPUT_FILE = Path(os.environ.get("OUTPUT_FILE", "Scored_Enriched"))  # Parquet + .xlsx export
+SCORING_CONFIG = Path(os.environ.get("SCORING_CONFIG", "scoring_config.json"))
+STORE_TABLE = "scored"
 SLEEP_MIN, SLEEP_MAX = 1.5, 3.0
+ROW_WORKERS = int(os.environ.get("ROW_WORKERS", "2"))  # rows scored at the same time
+CASCADE_THRESHOLD = int(os.environ.get("CASCADE_THRESHOLD", "30"))  # relevance below this skips opportunity/contact (0 = off)
+CLUSTER_PROJECTS = os.environ.get("CLUSTER_PROJECTS", "1") != "0"  # analyse each project once per run
 
 # Make relative paths point to the script folder
 if not INPUT_FILE.is_absolute():
     INPUT_FILE = BASE_DIR / INPUT_FILE
 if not OUTPUT_FILE.is_absolute():
     OUTPUT_FILE = BASE_DIR / OUTPUT_FILE
-if not LOG_FILE.is_absolute():
-    LOG_FILE = BASE_DIR / LOG_FILE
-
-print(f"Script dir: {BASE_DIR}")
-print(f"CWD:        {Path.cwd()}")
-print(f"INPUT_FILE: {INPUT_FILE}")
-
-# Preflight: ensure the input exists
-if not INPUT_FILE.exists():
-    raise FileNotFoundError(f"INPUT_FILE not found at: {INPUT_FILE}")
-
-# === LOGGING FUNCTIONS ===
-def load_logged_items():
-    if not LOG_FILE.exists():
-        return set()
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        return set(line.strip() for line in f if line.strip())
-
-def append_log(item_id):
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"{item_id}\n")
-
-def clear_log():
-    LOG_FILE.write_text("", encoding="utf-8")
-
+INPUT_FILE, OUTPUT_FILE = table_path(INPUT_FILE), table_path(OUTPUT_FILE)
+if not SCORING_CONFIG.is_absolute():
+    SCORING_CONFIG = BASE_DIR / SCORING_CONFIG
+
+# score_global formula (overridden by SCORING_CONFIG)
+DEFAULT_SCORING = {
+    "weights": {"relevance": 0.50, "stage": 0.35, "company_fit": 0.15},
+    "geo_bonus": 2,
+    "geo_bonus_threshold": 70,
+    "max_score": 100,
+}
 # === SEARCH FUNCTION ===
 def duckduckgo_search(query):
     try:
         url = f"https://html.duckduckgo.com/html/?q={query}"
         headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(url, headers=headers, timeout=20)
+        res = get_session().get(url, headers=headers, timeout=20)
         res.raise_for_status()
         soup = BeautifulSoup(res.text, "html.parser")
         results = [a.text.strip() for a in soup.select(".result__a")]
@@ -188,20 +198,60 @@ REASONING: [Brief explanation of scores and recommendations]
 )
 
 # === INITIALIZE LLM AND CHAINS ===
-llm = OllamaLLM(model="mistral", temperature=0)
-
-project_analysis_chain = project_analysis_prompt | llm
-scoring_chain = scoring_prompt | llm
-opportunity_chain = opportunity_analysis_prompt | llm
-contact_action_chain = contact_action_prompt | llm
-
-geo_chain = PromptTemplate(
+geo_prompt = PromptTemplate(
     input_variables=["city", "country"],
     template="""Estimate the accessibility score (0-100) for COSMA to operate based on the city and country. Coastal European areas are high priority.
 City: {city}
 Country: {country}
 Return only the number."""
-) | llm
+)
+
+LLM_TEMPERATURE = 0.0
+
+CHAIN_PROMPTS = [
+    ("project_analysis_chain", project_analysis_prompt),
+    ("scoring_chain", scoring_prompt),
+    ("opportunity_chain", opportunity_analysis_prompt),
+    ("contact_action_chain", contact_action_prompt),
+    ("geo_chain", geo_prompt),
+]
+
+# Model of each chain (llm_models.json): classification chains may use a smaller one
+_MODELS = load_chain_models()
+CHAIN_MODELS = {name: chain_model(name, _MODELS) for name, _ in CHAIN_PROMPTS}
+
+# Bumped automatically whenever a prompt, a model, the cascade, clustering or the gazetteer changes
+PROMPT_VERSION = hashlib.sha256(json.dumps([
+    [name, f"{CHAIN_MODELS[name]}@{LLM_TEMPERATURE}", template_hash(prompt)]
+    for name, prompt in CHAIN_PROMPTS
+] + [CASCADE_THRESHOLD, CLUSTER_PROJECTS, gazetteer_version()]).encode("utf-8")).hexdigest()[:16]
+
+# Built on first use by warm_up(), then kept for the life of the process
+llm = llm_cache = geo_scorer = None
+project_analysis_chain = scoring_chain = opportunity_chain = contact_action_chain = geo_chain = None
+_WARM_LOCK = threading.Lock()
+
+def warm_up():
+    """Create the LLM client, response cache, chains and geo scorer once (idempotent)."""
+    global llm, llm_cache, geo_scorer
+    global project_analysis_chain, scoring_chain, opportunity_chain, contact_action_chain, geo_chain
+    with _WARM_LOCK:
+        if llm is not None:
+            return
+        llm_cache = LLMCache()  # persistent, keyed on model + template hash + inputs
+        chains = {name: CachedChain(name, prompt, DispatchedLLM(CHAIN_MODELS[name], LLM_TEMPERATURE), llm_cache)
+                  for name, prompt in CHAIN_PROMPTS}
+        project_analysis_chain = chains["project_analysis_chain"]
+        scoring_chain = chains["scoring_chain"]
+        opportunity_chain = chains["opportunity_chain"]
+        contact_action_chain = chains["contact_action_chain"]
+        geo_chain = chains["geo_chain"]
+        # Offline gazetteer; geo_chain is only asked once per unknown (city, country)
+        geo_scorer = GeoScorer(geo_chain)
+        llm = geo_chain.llm
+
+# Up to 3 chains of the same row can be in flight (geo, scoring, opportunity)
+CALL_POOL = ThreadPoolExecutor(max_workers=3 * ROW_WORKERS)
 
 # === HELPER FUNCTIONS ===
 def extract_field(text, field_name):
@@ -216,6 +266,33 @@ def extract_score(text, field_name):
     score_match = re.search(r"\d+", field_text)
     return int(score_match.group()) if score_match else 0
 
+def load_scoring_config(path=SCORING_CONFIG):
+    config = json.loads(json.dumps(DEFAULT_SCORING))
+    if path.exists():
+        user = json.loads(path.read_text(encoding="utf-8"))
+        config["weights"].update(user.pop("weights", {}))
+        config.update(user)
+    return config
+
+def global_scores(relevance, stage, company_fit, geo, config):
+    """score_global for scalars or whole columns (numpy/pandas)."""
+    w = config["weights"]
+    score = w["relevance"] * relevance + w["stage"] * stage + w["company_fit"] * company_fit
+    bonus = (geo > config["geo_bonus_threshold"]) * config["geo_bonus"]
+    return np.round(np.minimum(config["max_score"], score + bonus), 1)
+
+SCORING = load_scoring_config()
+
+def low_priority_recommendation(author_name, author_role, relevance, stage, company):
+    """Rule-based contact/action text for leads stopped by the cascade."""
+    ideal_contact = f"{author_name} ({author_role})" if author_role else author_name
+    recommended_action = "Low priority - archive"
+    reasoning = (
+        f"Scores: Relevance={relevance}, Stage={stage}, Company={company}. "
+        f"Project relevance is below {CASCADE_THRESHOLD}, so no opportunity or contact analysis was run."
+    )
+    return ideal_contact, recommended_action, reasoning
+
 def enforce_one_sentence(text, max_words=25):
     """Keep the first sentence and hard-cap to max_words."""
     text = re.sub(r"\s+", " ", str(text)).strip()
@@ -225,93 +302,264 @@ def enforce_one_sentence(text, max_words=25):
         first = " ".join(words[:max_words]).rstrip(".") + "."
     return first
 
-# === LOAD EXCEL INPUT ===
-df = pd.read_excel(INPUT_FILE)
-results = []
-logged_items = load_logged_items()
-
-# === MAIN PROCESSING LOOP ===
-for idx, row in tqdm(df.iterrows(), total=len(df), desc="Scoring LinkedIn posts for COSMA"):
+# === STORE (one committed row per scored post = result + done-marker) ===
+def migrate_legacy_output(conn):
+    """Import rows already scored in OUTPUT_FILE once, so they are not scored again."""
+    if count_rows(conn, STORE_TABLE) or not table_exists(OUTPUT_FILE):
+        return 0
     try:
-        item_id = str(row.get("item_id", idx))
-        if item_id in logged_items:
-            continue  # Skip already processed
-
-        # Robust fallbacks for missing fields
-        post_text = str(
-            row.get("post_text")
-            or row.get("one_sentence_description")
-            or row.get("post")
-            or row.get("content")
-            or row.get("text")
-            or ""
-        )[:1500]
-
-        raw_company_name = row.get("company_name", "")
-
-        author_name = str(
-            row.get("author_name")
-            or row.get("post_author")
-            or row.get("author")
-            or row.get("profile_name")
-            or row.get("author_full_name")
-            or ""
-        )
-
-        author_role = str(row.get("author_role", ""))
-        city = str(row.get("city", ""))
-        country = str(row.get("country", ""))
-        website = str(row.get("website", ""))
-        one_sentence_description = str(row.get("one_sentence_description", ""))
-        post_url = str(row.get("post_url") or row.get("post_url_x") or row.get("post_url_y") or "")
-
-        if not post_text or not author_name:
-            row_dict = row.to_dict()
-            row_dict["error"] = "Missing required fields"
-            results.append(row_dict)
+        legacy = read_table(OUTPUT_FILE)
+    except Exception as e:
+        print(f"[WARNING] Failed to read legacy {OUTPUT_FILE.name}: {e}")
+        return 0
+    if "score_global" not in legacy.columns:
+        return 0
+    legacy = legacy[legacy["score_global"].notna()]
+    records = legacy.astype(object).where(legacy.notna(), None).to_dict(orient="records")
+    upsert_many(conn, STORE_TABLE, ((row_key(r), r) for r in records))
+    print(f"Migrated {len(records)} scored rows from {OUTPUT_FILE.name} to {STORE_FILE.name}")
+    return len(records)
+
+def scored_fingerprints(conn, unstamped=None):
+    """Fingerprint of every row that got a score (rows stored with an error are retried), read only.
+
+    Rows scored before fingerprints existed get one from their stored inputs,
+    i.e. they are assumed to match the current prompts; such rows are added
+    to ``unstamped`` when it is given.
+    """
+    fingerprints = {}
+    for key, data in conn.execute(
+        f"SELECT key, data FROM \"{STORE_TABLE}\" WHERE json_extract(data, '$.score_global') IS NOT NULL"
+    ).fetchall():
+        row = json.loads(data)
+        if not row.get("scoring_fingerprint"):
+            row["scoring_fingerprint"] = scoring_fingerprint(row)
+            if unstamped is not None:
+                unstamped.append((key, row))
+        fingerprints[key] = row["scoring_fingerprint"]
+    return fingerprints
+
+def load_scored_fingerprints(conn):
+    """scored_fingerprints(), with the rows scored before fingerprints existed stamped once."""
+    stamped = []
+    fingerprints = scored_fingerprints(conn, stamped)
+    if stamped:
+        upsert_many(conn, STORE_TABLE, stamped)
+    return fingerprints
+
+def store_score(conn, item_id, row_dict):
+    """Store a scoring result. A failed row keeps the scores it already had, only the error is
+    recorded; its old fingerprint no longer matches, so it is retried next run."""
+    if row_dict.get("score_global") is None:
+        previous = read_row(conn, STORE_TABLE, item_id)
+        if previous is not None and previous.get("score_global") is not None:
+            row_dict = {**previous, "error": row_dict.get("error")}
+    upsert_row(conn, STORE_TABLE, item_id, without_text(row_dict))
+
+def export_scored(conn):
+    """Write OUTPUT_FILE from the store, best leads first."""
+    final_df = read_frame(conn, STORE_TABLE)
+
+    # Safe sort (avoid KeyError if nothing scored)
+    if "score_global" in final_df.columns:
+        final_df = final_df.sort_values("score_global", ascending=False)
+    else:
+        print("No 'score_global' column found; writing output without sorting. "
+              "This usually means inputs were missing (e.g., post_text/author_name).")
+
+    write_table(without_text(final_df), OUTPUT_FILE)
+    return final_df
+
+def export_partial(conn):
+    """Scored_Enriched and the front-end JSON with the rows scored so far (priority mode)."""
+    export_scored(conn)
+    to_json = importlib.import_module("05_excel_to_json")
+    to_json.clean_and_convert_excel(to_json.EXCEL_FILE, to_json.OUTPUT_JSON)
+
+# === ROW INPUTS ===
+def _first(row, *names):
+    """First non-empty value among ``names`` (NaN and None count as missing)."""
+    for name in names:
+        value = row.get(name)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
             continue
-
+        if str(value).strip():
+            return str(value)
+    return ""
+
+def scoring_inputs(row):
+    """Everything score_row reads from an input row, with robust fallbacks for missing fields."""
+    company_name = _first(row, "company_name").strip()
+    return {
+        "post_text": _first(row, "post_text", "one_sentence_description", "post", "content", "text")[:1500],
+        "company_name": company_name or "Company name not identified",
+        "author_name": _first(row, "author_name", "post_author", "author", "profile_name", "author_full_name"),
+        "author_role": _first(row, "author_role", "author_role_x", "author_role_y"),
+        "city": _first(row, "city", "city_x", "city_y"),
+        "country": _first(row, "country", "country_x", "country_y"),
+        "website": _first(row, "website"),
+        "one_sentence_description": _first(row, "one_sentence_description"),
+        "post_url": _first(row, "post_url", "post_url_x", "post_url_y"),
+    }
+
+def scoring_fingerprint(row):
+    """Hash of the scoring inputs and prompt versions: a row is re-scored when it changes."""
+    payload = json.dumps([PROMPT_VERSION, scoring_inputs(row)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+# === PROJECT CLUSTERS ===
+class ClusterShare:
+    """Project-level results computed by the first member of a cluster and reused by the others."""
+
+    def __init__(self, cluster_id, size=1):
+        self.cluster_id = cluster_id
+        self.size = size
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def get(self, name, compute):
+        with self._lock:
+            future = self._futures.get(name)
+            owner = future is None
+            if owner:
+                future = self._futures[name] = Future()
+        if owner:
+            try:
+                future.set_result(compute())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+def cluster_pending(pending):
+    """One ClusterShare per project among the (key, row) pairs about to be scored."""
+    if not CLUSTER_PROJECTS:
+        return {key: ClusterShare(key) for key, _ in pending}
+    posts = []
+    for key, row in pending:
+        inputs = scoring_inputs(row)
+        posts.append((key, inputs["post_text"], inputs["company_name"]))
+    clusters = cluster_posts(posts)
+    sizes = {}
+    for cluster_id in clusters.values():
+        sizes[cluster_id] = sizes.get(cluster_id, 0) + 1
+    shares = {cluster_id: ClusterShare(cluster_id, size) for cluster_id, size in sizes.items()}
+    return {key: shares[cluster_id] for key, cluster_id in clusters.items()}
+
+def report_clusters(shares):
+    clusters = {id(s): s for s in shares.values()}
+    multi = [s for s in clusters.values() if s.size > 1]
+    if not multi:
+        return
+    members = sum(s.size for s in multi)
+    print(f"Project clusters: {len(clusters)} projects for {len(shares)} rows "
+          f"({len(multi)} shared by {members} rows, largest {max(s.size for s in multi)})")
+
+# === ROW SCORING ===
+def score_row(row, timings=None, share=None):
+    """Run the scoring chains on one input row and return the output row.
+
+    Independent chains run concurrently; ``timings`` receives the duration of each call.
+    ``row`` may be a pandas row or a plain dict (ad-hoc posts from the API).
+    Rows of the same ``share`` (project cluster) reuse its analysis and opportunity; geo stays
+    per row (authors of one project live in different places), GeoScorer memoizes it anyway.
+    """
+    warm_up()
+    if isinstance(row, dict):
+        row = pd.Series(row)
+    inputs = scoring_inputs(row)
+    post_text = inputs["post_text"]
+    final_company_name = inputs["company_name"]
+    author_name = inputs["author_name"]
+    author_role = inputs["author_role"]
+    city = inputs["city"]
+    country = inputs["country"]
+    website = inputs["website"]
+    one_sentence_description = inputs["one_sentence_description"]
+    post_url = inputs["post_url"]
+
+    if not post_text or not author_name:
+        row_dict = row.to_dict()
+        row_dict["error"] = "Missing required fields"
+        return row_dict
+
+    # Per-row dependency graph (* = once per project cluster):
+    #   geo (gazetteer) -------------------------------------------+
+    #   web search* -> analysis* -> scoring -+-> opportunity* -----+-> row
+    #                                        +-> contact ----------+
+    # opportunity/contact only run when relevance >= CASCADE_THRESHOLD
+    timings = timings if timings is not None else {}
+    share = share if share is not None else ClusterShare(row_key(row))
+
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    # Geo score only needs city/country: in flight from the start (LLM only for unknown places)
+    geo_future = CALL_POOL.submit(timed, "geo", geo_scorer.score, city, country)
+
+    def analyse_project():
         # Web search
         search_query = f"{website} offshore marine survey {city} {country}"
-        web_results = duckduckgo_search(search_query)
-
-        final_company_name = (
-            raw_company_name.strip()
-            if isinstance(raw_company_name, str) and raw_company_name.strip()
-            else "Company name not identified"
-        )
+        web_results = timed("web_search", duckduckgo_search, search_query)
 
         # STEP 1: Project Analysis
-        analysis_response = project_analysis_chain.invoke({
+        return timed("project_analysis_chain", project_analysis_chain.invoke, {
             "post_text": post_text,
             "company_name": final_company_name,
             "web_results": web_results
         })
 
-        project_summary = extract_field(analysis_response, "PROJECT_SUMMARY")
-        project_phase = extract_field(analysis_response, "PROJECT_PHASE")
-        relevant_keywords = extract_field(analysis_response, "KEYWORDS")
-
-        # STEP 2: Scoring
-        scoring_response = scoring_chain.invoke({
-            "post_text": post_text,
-            "project_summary": project_summary,
-            "company_name": final_company_name,
+    analysis_response = share.get("analysis", analyse_project)
+
+    project_summary = extract_field(analysis_response, "PROJECT_SUMMARY")
+    project_phase = extract_field(analysis_response, "PROJECT_PHASE")
+    relevant_keywords = extract_field(analysis_response, "KEYWORDS")
+
+    # STEP 2: Scoring (tier 1 of the cascade, always run)
+    scoring_future = CALL_POOL.submit(timed, "scoring_chain", scoring_chain.invoke, {
+        "post_text": post_text,
+        "project_summary": project_summary,
+        "company_name": final_company_name,
+        "author_role": author_role,
+        "one_sentence_description": one_sentence_description
+    })
+    opportunity_inputs = {
+        "post_text": post_text,
+        "project_summary": project_summary,
+        "company_name": final_company_name
+    }
+    # Without the cascade, opportunity only needs the summary and runs next to scoring
+    def analyse_opportunity():
+        return timed("opportunity_chain", opportunity_chain.invoke, opportunity_inputs)
+
+    opportunity_future = None
+    if not CASCADE_THRESHOLD:
+        opportunity_future = CALL_POOL.submit(share.get, "opportunity", analyse_opportunity)
+
+    scoring_response = scoring_future.result()
+    project_relevance = extract_score(scoring_response, "PROJECT_RELEVANCE")
+    project_stage = extract_score(scoring_response, "PROJECT_STAGE")
+    company_fit = extract_score(scoring_response, "COMPANY_FIT")
+
+    if project_relevance >= CASCADE_THRESHOLD:
+        scoring_tier = "full"
+
+        # STEP 3 + 4: Opportunity Analysis and Contact & Action Recommendations (tier 2)
+        if opportunity_future is None:
+            opportunity_future = CALL_POOL.submit(share.get, "opportunity", analyse_opportunity)
+        contact_future = CALL_POOL.submit(timed, "contact_action_chain", contact_action_chain.invoke, {
+            "author_name": author_name,
             "author_role": author_role,
-            "one_sentence_description": one_sentence_description
-        })
-
-        project_relevance = extract_score(scoring_response, "PROJECT_RELEVANCE")
-        project_stage = extract_score(scoring_response, "PROJECT_STAGE")
-        company_fit = extract_score(scoring_response, "COMPANY_FIT")
-
-        # STEP 3: Opportunity Analysis
-        opportunity_response = opportunity_chain.invoke({
-            "post_text": post_text,
             "project_summary": project_summary,
-            "company_name": final_company_name
+            "relevance_score": project_relevance,
+            "stage_score": project_stage,
+            "company_score": company_fit
         })
 
+        opportunity_response = opportunity_future.result()
         cosma_opportunity = extract_field(opportunity_response, "COSMA_OPPORTUNITY")
         opportunity_capability = extract_field(opportunity_response, "CAPABILITY")
         opportunity_evidence = extract_field(opportunity_response, "EVIDENCE")
@@ -319,82 +567,236 @@ for idx, row in tqdm(df.iterrows(), total=len(df), desc="Scoring LinkedIn posts
         # Enforce single concise sentence (belt-and-braces)
         cosma_opportunity = enforce_one_sentence(cosma_opportunity, 25)
 
-        # STEP 4: Contact & Action Recommendations
-        contact_response = contact_action_chain.invoke({
-            "author_name": author_name,
-            "author_role": author_role,
-            "project_summary": project_summary,
-            "relevance_score": project_relevance,
-            "stage_score": project_stage,
-            "company_score": company_fit
-        })
-
+        contact_response = contact_future.result()
         ideal_contact = extract_field(contact_response, "IDEAL_CONTACT")
         recommended_action = extract_field(contact_response, "RECOMMENDED_ACTION")
         reasoning = extract_field(contact_response, "REASONING")
+    else:
+        # Early exit: the contact prompt would only say "archive" for such leads
+        scoring_tier = "low"
+        cosma_opportunity = opportunity_capability = opportunity_evidence = ""
+        ideal_contact, recommended_action, reasoning = low_priority_recommendation(
+            author_name, author_role, project_relevance, project_stage, company_fit
+        )
 
-        # Geo score
-        geo_score_raw = geo_chain.invoke({"city": city, "country": country}).strip()
-        digits = re.findall(r"\d+", geo_score_raw)
-        geo_score = int(digits[0]) if digits else 0
-
-        # Calculate global score
-        global_score = 0.50 * project_relevance + 0.35 * project_stage + 0.15 * company_fit
-        if geo_score > 70:
-            global_score = min(100, global_score + 2)
-
-        # Save results
-        row_dict = row.to_dict()
-        row_dict.update({
-            "company_name": final_company_name,
-            "geographic_accessibility": geo_score,
-            "project_summary": project_summary,
-            "project_phase": project_phase,
-            "relevant_keywords": relevant_keywords,
-            "cosma_opportunity": cosma_opportunity,
-            "opportunity_capability": opportunity_capability,
-            "opportunity_evidence": opportunity_evidence,
-            "ideal_contact": ideal_contact,
-            "recommended_action": recommended_action,
-            "reasoning": reasoning,
-            "score_project_relevance": project_relevance,
-            "score_project_stage": project_stage,
-            "score_company_fit": company_fit,
-            "score_global": round(global_score, 1),
-            "post_url": post_url
-        })
-
-        results.append(row_dict)
-        append_log(item_id)
-
+    # Geo score
+    geo_score = geo_future.result()
+
+    # Calculate global score
+    global_score = float(global_scores(project_relevance, project_stage, company_fit, geo_score, SCORING))
+
+    # Save results
+    row_dict = row.to_dict()
+    row_dict.update({
+        "company_name": final_company_name,
+        "geographic_accessibility": geo_score,
+        "project_summary": project_summary,
+        "project_phase": project_phase,
+        "relevant_keywords": relevant_keywords,
+        "cosma_opportunity": cosma_opportunity,
+        "opportunity_capability": opportunity_capability,
+        "opportunity_evidence": opportunity_evidence,
+        "ideal_contact": ideal_contact,
+        "recommended_action": recommended_action,
+        "reasoning": reasoning,
+        "score_project_relevance": project_relevance,
+        "score_project_stage": project_stage,
+        "score_company_fit": company_fit,
+        "score_global": global_score,
+        "post_url": post_url,
+        "scoring_tier": scoring_tier,
+        "project_cluster": share.cluster_id,
+        "cluster_size": share.size,
+        "scoring_fingerprint": scoring_fingerprint(row)
+    })
+    return row_dict
+
+def score_row_timed(row, share=None):
+    """score_row() for the row pool: never raises, returns (row_dict, latency)."""
+    timings = {}
+    start = time.perf_counter()
+    failed = False
+    try:
+        row_dict = score_row(row, timings, share)
     except Exception as e:
         row_dict = row.to_dict()
         row_dict["error"] = str(e)
-        results.append(row_dict)
-
+        failed = True
+    wall = time.perf_counter() - start
+    record("row", "score", wall, ok=not failed, tier=row_dict.get("scoring_tier"),
+           cluster_size=row_dict.get("cluster_size"))
     time.sleep(uniform(SLEEP_MIN, SLEEP_MAX))
+    # Sum of call durations = what the same row costs when run one call after another
+    latency = None
+    if timings:
+        latency = {"wall": wall, "sequential": sum(timings.values()), "calls": timings,
+                   "tier": row_dict.get("scoring_tier")}
+    return row_dict, latency
+
+def score_batch(keyed_rows, workers=ROW_WORKERS, shares=None):
+    """Score (key, row) pairs with ``workers`` rows in flight; yields (key, row_dict, latency) as rows finish.
+
+    ``shares`` maps a key to its project ClusterShare (see cluster_pending).
+    """
+    warm_up()
+    shares = shares or {}
+    with ThreadPoolExecutor(max_workers=workers) as row_pool:
+        futures = {row_pool.submit(score_row_timed, row, shares.get(key)): key for key, row in keyed_rows}
+        for future in as_completed(futures):
+            row_dict, latency = future.result()
+            yield futures[future], row_dict, latency
+
+def report_latency(latencies):
+    if not latencies:
+        return
+    n = len(latencies)
+    wall = sorted(l["wall"] for l in latencies)
+    sequential = sorted(l["sequential"] for l in latencies)
+    print(f"Per-row latency over {n} rows ({ROW_WORKERS} rows in flight):")
+    print(f"  sequential chains: mean {sum(sequential) / n:.1f}s, median {sequential[n // 2]:.1f}s")
+    print(f"  dependency graph:  mean {sum(wall) / n:.1f}s, median {wall[n // 2]:.1f}s")
+    per_call = {}
+    for l in latencies:
+        for name, d in l["calls"].items():
+            per_call.setdefault(name, []).append(d)
+    for name, durations in sorted(per_call.items()):
+        print(f"  {name:<24} mean {sum(durations) / len(durations):.2f}s")
+
+    # Cascade: skipped calls are valued at their mean duration on full-tier rows
+    tiers = {}
+    for l in latencies:
+        tiers[l["tier"]] = tiers.get(l["tier"], 0) + 1
+    skipped = ["opportunity_chain", "contact_action_chain"]
+    saved_per_row = sum(sum(per_call[c]) / len(per_call[c]) for c in skipped if c in per_call)
+    print("Scoring tiers: " + ", ".join(f"{t}={n}" for t, n in sorted(tiers.items(), key=str)))
+    if tiers.get("low"):
+        print(f"  cascade saved {2 * tiers['low']} LLM calls, ~{tiers['low'] * saved_per_row:.0f}s of model time")
+    reused = sum(1 for l in latencies if "project_analysis_chain" not in l["calls"])
+    if reused:
+        print(f"  project clusters reused the analysis of {reused} rows")
+
+# === RESCORE (no LLM call) ===
+def rescore():
+    """Recompute score_global of every stored row from SCORING_CONFIG and re-export."""
+    start = time.perf_counter()
+    conn = open_store()
+    ensure_table(conn, STORE_TABLE)
+    migrate_legacy_output(conn)
+    df = read_frame(conn, STORE_TABLE)
+    scored = df["score_global"].notna() if "score_global" in df.columns else pd.Series(False, index=df.index)
+    if not scored.any():
+        print("Nothing to rescore: no scored row in the store.")
+        conn.close()
+        return
+
+    cols = ["score_project_relevance", "score_project_stage", "score_company_fit", "geographic_accessibility"]
+    relevance, stage, company_fit, geo = (pd.to_numeric(df.loc[scored, c], errors="coerce").fillna(0) for c in cols)
+    df.loc[scored, "score_global"] = global_scores(relevance, stage, company_fit, geo, SCORING)
+
+    records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+    upsert_many(conn, STORE_TABLE, ((row_key(r), r) for r in records))
+    export_scored(conn)
+    conn.close()
+    print(f"Rescored {int(scored.sum())} rows with {SCORING_CONFIG.name} in {time.perf_counter() - start:.1f}s -> {OUTPUT_FILE}")
 
-# === EXPORT TO EXCEL (APPEND + DEDUP) ===
-final_df = pd.DataFrame(results)
-
-if OUTPUT_FILE.exists():
-    existing_df = pd.read_excel(OUTPUT_FILE)
-    final_df = pd.concat([existing_df, final_df], ignore_index=True)
-
-# Remove duplicates based on item_id if exists
-if "item_id" in final_df.columns:
-    final_df = final_df.drop_duplicates(subset=["item_id"], keep="last")
-
-# Safe sort (avoid KeyError if nothing scored)
-if "score_global" in final_df.columns:
-    final_df = final_df.sort_values("score_global", ascending=False)
-else:
-    print("No 'score_global' column found; writing output without sorting. "
-          "This usually means inputs were missing (e.g., post_text/author_name).")
-
-final_df.to_excel(OUTPUT_FILE, index=False)
-
-print(f"File saved: {OUTPUT_FILE}")
-print("Top 10 leads preview:")
-preview_cols = [c for c in ["company_name", "score_global", "cosma_opportunity", "opportunity_capability", "post_url"] if c in final_df.columns]
-print(final_df[preview_cols].head(10))
\ No newline at end of file
+# === MAIN PROCESSING LOOP ===
+def pending_rows(df, scored, quiet=False):
+    """(key, row) pairs whose inputs or prompts changed since their last score (run keywords only)."""
+    pending, changed = [], 0
+    df = in_scope(df)
+    for _, row in df.iterrows():
+        item_id = row_key(row)
+        previous = scored.get(item_id)
+        if previous == scoring_fingerprint(row):
+            continue
+        changed += previous is not None
+        pending.append((item_id, row))
+    if pending or not quiet:
+        print(f"Rows to score: {len(pending)} ({len(pending) - changed} new, {changed} changed, "
+              f"{len(df) - len(pending)} unchanged)")
+    return order_pairs(pending)  # priority mode: most promising rows first (and first kept by --limit)
+
+def follow_batches(conn, scored):
+    """--follow: batches of freshly enriched rows (store) until 03_Enricher is finished."""
+    while True:
+        finished = stage_finished(conn, "enrich")  # read before the rows so none is missed
+        df = enriched_frame(conn)
+        pending = pending_rows(df, scored, quiet=True) if not df.empty else []
+        if pending:
+            yield pending
+        elif finished:
+            return
+        else:
+            time.sleep(POLL_SECONDS)
+
+def main(follow=False):
+    print(f"Script dir: {BASE_DIR}")
+    print(f"CWD:        {Path.cwd()}")
+    print(f"INPUT_FILE: {'store (--follow)' if follow else INPUT_FILE}")
+
+    # Preflight: ensure the input exists
+    if not follow and not table_exists(INPUT_FILE):
+        raise FileNotFoundError(f"INPUT_FILE not found at: {INPUT_FILE}")
+
+    conn = open_store()
+    ensure_table(conn, STORE_TABLE)
+    migrate_legacy_output(conn)
+    scored = load_scored_fingerprints(conn)
+
+    # Re-score exactly the rows whose inputs or prompts changed since their last score
+    batches = follow_batches(conn, scored) if follow else [pending_rows(attach_text(read_table(INPUT_FILE)), scored)]
+    latencies = []
+    limit = row_limit()  # 06_Executable --limit (0 = no limit)
+    if limit and not follow:
+        batches = [batches[0][:limit]]
+    attempted = 0
+    progress = ProgressTracker("score", total=None if follow else len(batches[0]))
+    partial = IntervalExport(lambda: export_partial(conn))
+    for pending in batches:
+        if limit and attempted >= limit:
+            print(f"Row limit reached ({limit}, --limit)")
+            break
+        pending = pending[:limit - attempted] if limit else pending
+        attempted += len(pending)
+        shares = cluster_pending(pending)
+        report_clusters(shares)
+        fingerprints = {item_id: scoring_fingerprint(row) for item_id, row in pending}
+
+        # Several rows in flight at once; the store is only written from this thread
+        for item_id, row_dict, latency in tqdm(score_batch(pending, shares=shares), total=len(pending),
+                                               desc="Scoring LinkedIn posts for COSMA"):
+            # Result and done-marker are the same committed row
+            store_score(conn, item_id, row_dict)
+            scored[item_id] = fingerprints[item_id]  # attempted: not picked up again by --follow
+            progress.advance(remaining=backlog(conn, "score") if follow else None)
+            partial.tick()  # priority mode: Scored_Enriched + JSON every EXPORT_INTERVAL seconds
+            if latency:
+                latencies.append(latency)
+
+    progress.finish()
+    report_latency(latencies)
+
+    # === EXPORT TO EXCEL (from the store, already deduplicated) ===
+    final_df = export_scored(conn)
+    conn.close()
+
+    print(f"File saved: {OUTPUT_FILE}")
+    print("Top 10 leads preview:")
+    preview_cols = [c for c in ["company_name", "score_global", "cosma_opportunity", "opportunity_capability", "post_url"] if c in final_df.columns]
+    print(final_df[preview_cols].head(10))
+    if llm is not None:
+        geo_scorer.report()
+        llm_cache.report()
+        get_dispatcher().report()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score enriched leads for COSMA")
+    parser.add_argument("--rescore", action="store_true",
+                        help="recompute score_global from the stored scores and SCORING_CONFIG, without any LLM call")
+    parser.add_argument("--follow", action="store_true",
+                        help="score rows as 03_Enricher stores them instead of reading INPUT_FILE (06_Executable --pipeline)")
+    args = parser.parse_args()
+    if args.rescore:
+        rescore()
+    else:
+        main(follow=args.follow)
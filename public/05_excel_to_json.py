@@ -2,6 +2,10 @@ import json
 from pathlib import Path
 import pandas as pd
 
+from handoff import read_table, table_path
+from lead_schema import apply_schema, attach_text
+from progress import ProgressTracker
+
 BASE = Path(__file__).resolve().parent
 EXCEL_FILE = BASE / "Scored_Enriched.xlsx"
 OUTPUT_JSON = BASE / "Scored_Enriched_clean.json"
@@ -23,6 +27,7 @@ def clean_value(value, default="N/A", max_length=50_000):
     return value
 
 def sanitize_df(df: pd.DataFrame, default="N/A", max_length=50_000) -> pd.DataFrame:
+    df = df.astype(object)  # catégories / entiers nullables du schéma -> valeurs Python simples
     for col in df.columns:
         df[col] = df[col].apply(lambda x: clean_value(x, default=default, max_length=max_length))
     return df
@@ -53,12 +58,16 @@ def clean_and_convert_excel(input_excel: Path, output_json: Path, sheet="first")
     print(f"[debug] script_dir={BASE}")
     print(f"[debug] excel_path={input_excel} (sheet={sheet})")
 
-    if not file_exists(input_excel):
+    # Table Parquet écrite par 04_Notation si présente, sinon l'Excel
+    parquet = table_path(input_excel)
+    if parquet.exists():
+        df = attach_text(read_table(parquet))  # post_text n'est stocké que dans Cleaned
+    elif file_exists(input_excel):
+        # Assurez-vous d'avoir 'openpyxl' installé: pip install openpyxl
+        df = apply_schema(read_excel_df(input_excel, sheet=sheet))  # fusionne les colonnes _x/_y des anciens exports
+    else:
         print(f"Le fichier {input_excel} est introuvable.")
         return
-
-    # Assurez-vous d'avoir 'openpyxl' installé: pip install openpyxl
-    df = read_excel_df(input_excel, sheet=sheet)
     df = sanitize_df(df)
 
     data = df.to_dict(orient="records")
@@ -66,5 +75,10 @@ def clean_and_convert_excel(input_excel: Path, output_json: Path, sheet="first")
 
     print(f"Conversion terminée. {len(data)} lignes sauvegardées dans {output_json}")
 
-if __name__ == "__main__":
+def main():
+    progress = ProgressTracker("export")
     clean_and_convert_excel(EXCEL_FILE, OUTPUT_JSON, sheet="first")
+    progress.finish()
+
+if __name__ == "__main__":
+    main()
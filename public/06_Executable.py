@@ -1,7 +1,22 @@
+import os
 import sys
+import json
+import time
+import uuid
+import argparse
+import importlib
+import threading
+import traceback
 import subprocess
 from pathlib import Path
 
+from lead_store import open_store
+from pipeline import set_stage_state
+from handoff import table_exists, table_mtime
+from telemetry import record, set_stage, flush  # metrics.jsonl (python telemetry.py pour le résumé)
+from progress import SCRIPT_STAGES, start_run, mark_stage  # progression suivie par /api/progress
+from estimator import predict, save_prediction, record_actuals, duration  # prévision vs réel (table "estimates")
+
 BASE_DIR = Path(__file__).resolve().parent
 
 SCRIPTS = [
@@ -12,40 +27,287 @@ SCRIPTS = [
     "05_excel_to_json.py",
 ]
 
-def run_script(name: str) -> int:
+# Par défaut les étapes tournent dans ce processus : pandas/langchain importés une fois,
+# clients Ollama (dispatcher) et session HTTP gardés chauds d'une étape à l'autre.
+# ISOLATED_STAGES=1 (ou --isolated) relance un sous-processus par étape, comme avant.
+ISOLATED = os.environ.get("ISOLATED_STAGES") == "1"
+STAGE_TIMES = []  # (script, démarrage en s ou None, durée totale en s)
+IMPORT_SECONDS = {}  # module -> durée de son premier import (à froid), même fait avant l'étape
+
+def run_script(name: str, isolated: bool = ISOLATED) -> int:
+    return run_subprocess(name) if isolated else run_in_process(name)
+
+def run_subprocess(name: str) -> int:
     script_path = BASE_DIR / name
     if not script_path.exists():
         print(f"[ERREUR] Le fichier {name} est introuvable.", flush=True)
         return 1
 
     print(f"\n\033[96m--- Exécution de {name} ---\033[0m", flush=True)
+    start = time.perf_counter()
     p = subprocess.Popen(
         [sys.executable, str(script_path)],
         cwd=str(BASE_DIR),
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
-        bufsize=1
+        bufsize=1,
+        env={**os.environ, "TELEMETRY_STAGE": Path(name).stem}
     )
 
     for line in iter(p.stdout.readline, ''):
         print(line.rstrip(), flush=True)
     p.stdout.close()
     p.wait()
+    stage_done(name, None, time.perf_counter() - start, p.returncode)
+    return _report_exit(name, p.returncode)
+
+def stage_done(name: str, startup, total: float, code: int, pipelined: bool = False) -> None:
+    STAGE_TIMES.append((name, startup, total))
+    record("stage", Path(name).stem, total, startup=startup, ok=code == 0, pipelined=pipelined)
+    flush()
+    conn = open_store()
+    mark_stage(conn, SCRIPT_STAGES.get(name, Path(name).stem), "done" if code == 0 else "failed")
+    conn.close()
 
-    if p.returncode != 0:
-        print(f"\033[91m[ERREUR] dans {name} (code {p.returncode})\033[0m", flush=True)
+def _report_exit(name: str, code: int) -> int:
+    if code != 0:
+        print(f"\033[91m[ERREUR] dans {name} (code {code})\033[0m", flush=True)
     else:
         print(f"\033[92m[SUCCESS] {name} terminé\033[0m", flush=True)
+    return code
+
+def load_stage(name: str):
+    """Importe le module d'une étape au moment où elle démarre (gratuit s'il l'est déjà).
+
+    La durée du premier import est gardée : l'estimation importe 04_Notation avant le run,
+    son démarrage doit quand même compter cet import à froid.
+    """
+    stem = Path(name).stem
+    if stem not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(stem)
+        IMPORT_SECONDS[stem] = time.perf_counter() - start
+    return sys.modules[stem]
+
+def run_in_process(name: str) -> int:
+    if not (BASE_DIR / name).exists():
+        print(f"[ERREUR] Le fichier {name} est introuvable.", flush=True)
+        return 1
+
+    print(f"\n\033[96m--- Exécution de {name} (in-process) ---\033[0m", flush=True)
+    start = time.perf_counter()
+    startup = None
+    preloaded = IMPORT_SECONDS.get(Path(name).stem, 0.0)  # importé avant l'étape (estimation)
+    set_stage(Path(name).stem)  # les mesures de l'étape sont rattachées à son nom
+    try:
+        module = load_stage(name)
+        if hasattr(module, "warm_up"):
+            module.warm_up()  # 04_Notation : chaînes, cache LLM, géo
+        startup = time.perf_counter() - start + preloaded
+        detail = f", dont import {preloaded:.2f}s fait par l'estimation" if preloaded else ""
+        print(f"[INFO] {name} prêt en {startup:.2f}s (import + préchauffage{detail})", flush=True)
+        result = module.main()
+        code = result if isinstance(result, int) else 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        code = 1
+    sys.stdout.flush()
+    set_stage(None)
+    stage_done(name, startup, time.perf_counter() - start + preloaded, code)
+    return _report_exit(name, code)
+
+# --- Runs partiels (--stages) : une étape sautée laisse ses dernières sorties à la suivante ---
+STAGES = [SCRIPT_STAGES[s] for s in SCRIPTS]
+# Table lue par chaque étape, écrite par l'étape précédente
+STAGE_INPUT = {"clean": "Scraped", "enrich": "Cleaned", "score": "Enriched", "export": "Scored_Enriched"}
+
+def parse_stages(value: str) -> list:
+    stages = [s.strip() for s in value.split(",") if s.strip()] if value else STAGES
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise ValueError(f"étape(s) inconnue(s) : {', '.join(unknown)} (au choix : {', '.join(STAGES)})")
+    return [s for s in STAGES if s in stages]
+
+def check_inputs(stages: list) -> bool:
+    """Une étape dont la précédente est sautée repart de la dernière table écrite par celle-ci."""
+    ok = True
+    for stage in stages:
+        previous = STAGES[STAGES.index(stage) - 1] if stage in STAGE_INPUT else None
+        if previous is None or previous in stages:
+            continue
+        table = STAGE_INPUT[stage]
+        if not table_exists(table):
+            print(f"[ERREUR] {stage} : {table} introuvable, lancez d'abord l'étape {previous}", flush=True)
+            ok = False
+            continue
+        written = table_mtime(table)
+        print(f"[INFO] {stage} repart de {table} ({time.strftime('%d/%m/%Y %H:%M', time.localtime(written))})",
+              flush=True)
+        upstream = STAGE_INPUT.get(previous)
+        if upstream and table_exists(upstream) and table_mtime(upstream) > written:
+            print(f"[WARNING] {table} est plus ancien que {upstream} : relancez {previous} pour le mettre à jour",
+                  flush=True)
+    return ok
+
+def report_stage_times() -> None:
+    if not STAGE_TIMES:
+        return
+    print("\nTemps par étape (démarrage = import + préchauffage, in-process uniquement) :", flush=True)
+    for name, startup, total in STAGE_TIMES:
+        start_txt = f"{startup:6.2f}s" if startup is not None else "     -"
+        print(f"  {name:<22} démarrage {start_txt}   total {total:7.1f}s", flush=True)
+
+# --- Estimation du run (estimator.py), comparée au réel à la fin ---
+def announce_estimate(run_id: str, stages: list, args, pipelined: bool) -> None:
+    try:
+        if "score" in stages and "enrich" not in stages:
+            # L'estimation compare les empreintes de 04_Notation : import chronométré ici, compté à son démarrage
+            load_stage("04_Notation.py")
+        e = predict(args.keywords, stages, args.max_posts, args.limit, pipelined)
+        conn = open_store()
+        save_prediction(conn, run_id, e)
+        conn.close()
+    except Exception as exc:  # une estimation ratée n'empêche pas le run
+        print(f"[WARNING] Estimation indisponible : {exc}", flush=True)
+        return
+    print(f"[INFO] Estimation : ~{duration(e['seconds'])}, {e['posts']} posts, {e['llm_calls']} appels LLM "
+          f"({e['history_runs']} runs d'historique, calibrage x{e['calibration']})", flush=True)
 
-    return p.returncode
+def compare_estimate(run_id: str, wall: float) -> None:
+    try:
+        flush()
+        conn = open_store()
+        row = record_actuals(conn, run_id, wall)
+        conn.close()
+    except Exception as exc:
+        print(f"[WARNING] Comparaison estimation / réel impossible : {exc}", flush=True)
+        return
+    if row is None:
+        return
+    predicted, actual = row["predicted"], row["actual"]
+    print(f"\nEstimé / réel : durée {duration(predicted['seconds'])} / {duration(actual['seconds'])}, "
+          f"posts {predicted['posts']} / {actual['posts']}, "
+          f"appels LLM {predicted['llm_calls']} / {actual['llm_calls']}", flush=True)
+
+# --- Mode pipeline: scraping, enrichissement et notation en parallèle, reliés par le store ---
+# (les étapes parallèles gardent chacune leur sous-processus ; seuls 02/05 suivent --isolated)
+PIPELINE_STAGES = [
+    ("scrape", "01_Scraper.py", []),
+    ("enrich", "03_Enricher.py", ["--follow"]),
+    ("score", "04_Notation.py", ["--follow"]),
+]
+# Script lancé quand une étape se termine avec succès (exports Excel/JSON habituels)
+AFTER_STAGE = {"scrape": "02_Cleaner.py", "score": "05_excel_to_json.py"}
+
+def _relay(stage: str, p: subprocess.Popen) -> None:
+    for line in iter(p.stdout.readline, ''):
+        print(f"[{stage}] {line.rstrip()}", flush=True)
+    p.stdout.close()
+
+def start_stage(stage: str, name: str, args: list, env: dict):
+    print(f"\n\033[96m--- Démarrage de {name} ({stage}) ---\033[0m", flush=True)
+    p = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / name), *args],
+        cwd=str(BASE_DIR),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        env={**env, "TELEMETRY_STAGE": Path(name).stem}
+    )
+    relay = threading.Thread(target=_relay, args=(stage, p), daemon=True)
+    relay.start()
+    return p, relay
+
+def run_pipeline(isolated: bool = ISOLATED, stages: list = STAGES) -> int:
+    run_id = os.environ.get("TELEMETRY_RUN") or uuid.uuid4().hex[:12]
+    env = {**os.environ, "PIPELINE_RUN": run_id, "TELEMETRY_RUN": run_id}
+    selected = [(stage, name, args) for stage, name, args in PIPELINE_STAGES if stage in stages]
+    conn = open_store()
+    for stage, _, _ in PIPELINE_STAGES:
+        # Étape sautée : déjà « terminée », les suivantes reprennent ce qu'elle a laissé dans le store
+        set_stage_state(conn, stage, "running" if stage in stages else "done", run_id)
+
+    started = time.perf_counter()
+    running = {stage: start_stage(stage, name, args, env) for stage, name, args in selected}
+    scripts = {stage: name for stage, name, _ in selected}
+    failed = []
+    while running:
+        for stage, (p, relay) in list(running.items()):
+            if p.poll() is None:
+                continue
+            relay.join()
+            del running[stage]
+            # Les étapes en aval terminent les lignes déjà produites puis s'arrêtent
+            state = "done" if p.returncode == 0 else "failed"
+            set_stage_state(conn, stage, state, run_id)
+            stage_done(scripts[stage], None, time.perf_counter() - started, p.returncode, pipelined=True)
+            if state == "failed":
+                failed.append(stage)
+                print(f"\033[91m[ERREUR] étape {stage} (code {p.returncode})\033[0m", flush=True)
+                continue
+            print(f"\033[92m[SUCCESS] étape {stage} terminée\033[0m", flush=True)
+            after = AFTER_STAGE.get(stage)
+            if after and SCRIPT_STAGES[after] in stages and run_script(after, isolated) != 0:
+                failed.append(AFTER_STAGE[stage])
+        time.sleep(1)
+    conn.close()
+    report_stage_times()
+    return 1 if failed else 0
 
 def main():
-    for script in SCRIPTS:
-        rc = run_script(script)
-        if rc != 0:
-            sys.exit(1)
-    sys.exit(0)
+    parser = argparse.ArgumentParser(description="Pipeline COSMA Radar (01 -> 05)")
+    parser.add_argument("--pipeline", action="store_true", default=os.environ.get("PIPELINED") == "1",
+                        help="scraping, enrichissement et notation en parallèle (back-pressure via le store)")
+    parser.add_argument("--isolated", action="store_true", default=ISOLATED,
+                        help="un sous-processus Python par étape au lieu d'un seul processus (ISOLATED_STAGES=1)")
+    parser.add_argument("--stages", default=os.environ.get("RUN_STAGES", ""),
+                        help=f"étapes à lancer, séparées par des virgules ({','.join(STAGES)} ; défaut : toutes)")
+    parser.add_argument("--keywords", nargs="+", help="mots-clés à traiter (au lieu de keywords.txt / tous les posts)")
+    parser.add_argument("--limit", type=int, help="nombre maximum de lignes enrichies / notées")
+    parser.add_argument("--max-posts", type=int, help="posts scrapés par mot-clé (défaut : 20)")
+    parser.add_argument("--priority", action="store_true", default=os.environ.get("PRIORITY") == "1",
+                        help="enrichit et note les posts les plus prometteurs d'abord, exports partiels réguliers")
+    args = parser.parse_args()
+    try:
+        stages = parse_stages(args.stages)
+    except ValueError as e:
+        parser.error(str(e))
+    # Périmètre du run, lu par les étapes (pipeline.run_keywords / row_limit, 01_Scraper)
+    if args.keywords:
+        os.environ["RUN_KEYWORDS"] = json.dumps(args.keywords, ensure_ascii=False)
+    if args.limit:
+        os.environ["ROW_LIMIT"] = str(args.limit)
+    if args.max_posts:
+        os.environ["MAX_POSTS"] = str(args.max_posts)
+    if args.priority:
+        os.environ["PRIORITY"] = "1"  # lu par priority.py (03/04)
+    os.environ.setdefault("TELEMETRY_RUN", uuid.uuid4().hex[:12])  # un id par exécution, partagé par les étapes
+    os.chdir(BASE_DIR)  # les étapes lisent/écrivent leurs tables relativement au dossier public/
+    pipelined = args.pipeline and any(stage in stages for stage, _, _ in PIPELINE_STAGES)
+    # En --pipeline, enrichissement et notation reprennent le store, pas les tables
+    if not pipelined and not check_inputs(stages):
+        sys.exit(2)
+    conn = open_store()
+    start_run(conn, stages)
+    conn.close()
+    run_id = os.environ["TELEMETRY_RUN"]
+    announce_estimate(run_id, stages, args, pipelined)
+    started = time.perf_counter()
+    if pipelined:
+        rc = run_pipeline(args.isolated, stages)
+    else:
+        rc = 0
+        for script in [s for s in SCRIPTS if SCRIPT_STAGES[s] in stages]:
+            if run_script(script, args.isolated) != 0:
+                rc = 1
+                break
+        report_stage_times()
+    compare_estimate(run_id, time.perf_counter() - started)
+    sys.exit(rc)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,108 @@
+"""Benchmark: Excel (openpyxl) vs Parquet handoff files between stages.
+
+Usage:
+    python bench_handoff.py [--repeat N] [--append-rows N]
+
+For every stage workbook found next to this script (Scraped, Cleaned,
+Enriched, Scored_Enriched), times a full read and write in both formats, a
+projected read of two columns, and the append of a new scrape batch (the
+read + concat + rewrite 01_Scraper used to do vs one new Parquet row group).
+Peak memory covers Python and Arrow allocations. Files are written to a
+temporary folder; the real stage files are left untouched.
+"""
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+import handoff
+
+BASE_DIR = Path(__file__).resolve().parent
+STAGES = ["Scraped", "Cleaned", "Enriched", "Scored_Enriched"]
+PROJECTION = ["post_id", "post_url"]
+
+
+def measure(fn, repeat):
+    """(mean seconds, peak MiB, last result) of fn()."""
+    pool = pa.default_memory_pool()
+    total, peak = 0.0, 0
+    for _ in range(repeat):
+        arrow_before = pool.bytes_allocated()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        total += time.perf_counter() - start
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak = max(peak, py_peak + max(0, pool.max_memory() - arrow_before))
+    return total / repeat, peak / 2**20, result
+
+
+def size_mib(path):
+    files = path.glob("*") if path.is_dir() else [path]
+    return sum(f.stat().st_size for f in files) / 2**20
+
+
+def bench_stage(name, tmp, repeat, append_rows):
+    source = BASE_DIR / f"{name}.xlsx"
+    df = pd.read_excel(source)
+    xlsx, parquet = tmp / f"{name}.xlsx", tmp / f"{name}.parquet"
+    handoff.EXPORT_EXCEL = "0"
+
+    w_x, _, _ = measure(lambda: df.to_excel(xlsx, index=False), repeat)
+    w_p, _, _ = measure(lambda: handoff.write_table(df, parquet), repeat)
+    r_x, m_x, _ = measure(lambda: pd.read_excel(xlsx), repeat)
+    r_p, m_p, _ = measure(lambda: handoff.read_table(parquet), repeat)
+    cols = [c for c in PROJECTION if c in df.columns]
+    p_x, _, _ = measure(lambda: pd.read_excel(xlsx, usecols=cols), repeat)
+    p_p, _, _ = measure(lambda: handoff.read_table(parquet, columns=cols), repeat)
+
+    # Appending a new batch to a growing history
+    batch = df.head(append_rows).assign(post_id=lambda d: d["post_id"].astype(str) + "-new")
+
+    def append_xlsx():
+        combined = pd.concat([pd.read_excel(xlsx), batch], ignore_index=True)
+        combined.drop_duplicates(subset=["post_id"]).to_excel(xlsx, index=False)
+
+    def append_parquet():
+        handoff.append_table(batch, parquet)
+
+    a_x, _, _ = measure(append_xlsx, 1)
+    a_p, _, _ = measure(append_parquet, 1)
+
+    print(f"\n{name}: {len(df)} rows x {len(df.columns)} columns")
+    print(f"  {'':<22}{'xlsx':>10}{'parquet':>10}{'speed-up':>10}")
+    for label, x, p in [("write", w_x, w_p), ("read", r_x, r_p), (f"read {len(cols)} columns", p_x, p_p),
+                        (f"append {len(batch)} rows", a_x, a_p)]:
+        print(f"  {label:<22}{x * 1000:>8.0f}ms{p * 1000:>8.0f}ms{x / p if p else 0:>9.1f}x")
+    print(f"  {'read peak memory':<22}{m_x:>8.1f}MB{m_p:>8.1f}MB")
+    print(f"  {'size on disk':<22}{size_mib(xlsx):>8.2f}MB{size_mib(parquet):>8.2f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--append-rows", type=int, default=20)
+    args = parser.parse_args()
+
+    stages = [s for s in STAGES if (BASE_DIR / f"{s}.xlsx").exists()]
+    if not stages:
+        print(f"[ERROR] No stage workbook in {BASE_DIR}")
+        return 1
+    tmp = Path(tempfile.mkdtemp(prefix="bench_handoff_"))
+    try:
+        for name in stages:
+            bench_stage(name, tmp, args.repeat, args.append_rows)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
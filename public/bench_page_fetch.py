@@ -0,0 +1,136 @@
+"""Benchmark: BeautifulSoup full parse vs streaming lxml extraction (page_fetch).
+
+Usage:
+    python bench_page_fetch.py [corpus_dir] [--download urls.txt] [--repeat N]
+
+corpus_dir contains saved pages (*.html). With --download, each URL of the
+file (one per line) is saved in corpus_dir first. No corpus ships with the
+repo: without saved pages the benchmark runs on generated company pages
+(--synthetic N of them), which give the timings but say little about parity
+on real, often malformed, HTML.
+"""
+import sys
+import time
+import random
+import argparse
+import hashlib
+from pathlib import Path
+
+import requests
+from bs4 import BeautifulSoup
+
+from page_fetch import CHUNK_SIZE, MAX_BYTES, HEADERS, extract_page, format_page_text
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+# --- reference: previous implementation of scrape_page_text (minus the download) ---
+def legacy_extract(url, text):
+    soup = BeautifulSoup(text, "html.parser")
+    title = soup.title.string.strip() if soup.title and soup.title.string else ""
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    meta = meta_desc["content"].strip() if meta_desc and meta_desc.get("content") else ""
+    paragraphs = " ".join(p.get_text(strip=True) for p in soup.find_all("p")[:5])
+    return f"[URL: {url}]\nTitle: {title}\nMeta: {meta}\nContent: {paragraphs[:1000]}"
+
+
+def streaming_extract(url, raw, max_bytes):
+    chunks = (raw[i:i + CHUNK_SIZE] for i in range(0, len(raw), CHUNK_SIZE))
+    summary, read = extract_page(chunks, "utf-8", max_bytes)
+    return format_page_text(url, summary), read
+
+
+def synthetic_pages(n, seed=0):
+    """``n`` generated company pages: heavy head (scripts, styles), nav, then paragraphs."""
+    rng = random.Random(seed)
+    words = ("offshore wind survey geotechnical cable seabed contract monitoring foundation "
+             "project tender engineering vessel installation consent planning").split()
+
+    def sentence(k):
+        return " ".join(rng.choice(words) for _ in range(k)).capitalize() + "."
+
+    pages = []
+    for i in range(n):
+        head = "".join(f"<script>var s{j} = {{a: {j}}}; function f{j}() {{ return '{'x' * 200}'; }}</script>"
+                       for j in range(rng.randint(5, 40)))
+        head += f"<style>{'.c { color: red; margin: 0 } ' * rng.randint(50, 500)}</style>"
+        nav = "".join(f"<li><a href='/p{j}'>{sentence(2)}</a></li>" for j in range(rng.randint(10, 60)))
+        body = "".join(f"<p>{sentence(rng.randint(8, 40))} <b>{sentence(3)}</b></p>" for _ in range(rng.randint(3, 60)))
+        html = (f"<!DOCTYPE html><html><head><title>Company {i}</title>"
+                f"<meta name='description' content='{sentence(12)}'>{head}</head>"
+                f"<body><nav><ul>{nav}</ul></nav><main>{body}</main>"
+                f"<footer>{('<div>' + sentence(5) + '</div>') * rng.randint(10, 100)}</footer></body></html>")
+        pages.append((f"synthetic-{i}.html", html.encode("utf-8")))
+    return pages
+
+
+def download_corpus(urls_file, corpus_dir):
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    for url in Path(urls_file).read_text(encoding="utf-8").split():
+        target = corpus_dir / (hashlib.md5(url.encode("utf-8")).hexdigest() + ".html")
+        if target.exists():
+            continue
+        try:
+            res = requests.get(url, timeout=10, headers=HEADERS)
+            target.write_bytes(res.content)
+            print(f"[INFO] saved {url} ({len(res.content)} bytes)")
+        except Exception as e:
+            print(f"[WARNING] {url}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", nargs="?", default=str(BASE_DIR / "bench_html"))
+    parser.add_argument("--download", metavar="URLS_FILE")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES)
+    parser.add_argument("--synthetic", type=int, default=50, metavar="N",
+                        help="generated pages used when corpus_dir has no saved page")
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus)
+    if args.download:
+        download_corpus(args.download, corpus_dir)
+    pages = [(p.name, p.read_bytes()) for p in sorted(corpus_dir.glob("*.htm*"))]
+    if not pages:
+        print(f"[INFO] No *.html page in {corpus_dir}: {args.synthetic} synthetic pages "
+              f"(--download URLS_FILE to benchmark real pages)")
+        pages = synthetic_pages(args.synthetic)
+
+    t_legacy = t_stream = 0.0
+    total_bytes = read_bytes = same = 0
+    mismatches = []
+    for name, raw in pages:
+        text = raw.decode("utf-8", errors="replace")
+        url = name
+        total_bytes += len(raw)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            ref = legacy_extract(url, text)
+        t_legacy += (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            out, read = streaming_extract(url, raw, args.max_bytes)
+        t_stream += (time.perf_counter() - start) / args.repeat
+        read_bytes += read
+
+        if out == ref:
+            same += 1
+        else:
+            mismatches.append((name, ref, out))
+
+    n = len(pages)
+    print(f"Pages:            {n}  ({total_bytes / 1024:.0f} KiB on disk, {read_bytes / 1024:.0f} KiB read by streaming)")
+    print(f"BeautifulSoup:    {t_legacy * 1000:.1f} ms total, {t_legacy * 1000 / n:.2f} ms/page")
+    print(f"Streaming lxml:   {t_stream * 1000:.1f} ms total, {t_stream * 1000 / n:.2f} ms/page")
+    print(f"Speed-up:         x{t_legacy / t_stream:.1f}" if t_stream else "Speed-up: n/a")
+    print(f"Output parity:    {same}/{n} identical")
+    for name, ref, out in mismatches[:10]:
+        print(f"\n--- {name}\n[legacy]    {ref[:300]!r}\n[streaming] {out[:300]!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Compare a candidate model with the configured one on the classification chains.
+
+Replays a sample of Scored_Enriched (Parquet, or the .xlsx) through inference_chain, theme_chain,
+scoring_chain and geo_chain with both models (LLM cache bypassed, so the
+latencies are real) and reports latency and agreement per chain:
+
+    python compare_models.py --candidate qwen2.5:3b --sample 30
+    python compare_models.py --candidate phi3:mini --chains theme_chain geo_chain --out comparison.csv
+
+If agreement is good enough, set the chain to the candidate in llm_models.json.
+"""
+import re
+import sys
+import time
+import argparse
+import importlib
+from pathlib import Path
+
+import pandas as pd
+
+from llm_cache import LLMCache, CachedChain
+from llm_dispatcher import DispatchedLLM, get_dispatcher, chain_model
+from handoff import read_table, table_path
+from lead_schema import attach_text
+
+BASE_DIR = Path(__file__).resolve().parent
+INPUT_FILE = table_path(BASE_DIR / "Scored_Enriched")
+SCORE_TOLERANCE = 10  # two scores "agree" when they differ by at most this
+
+enricher = importlib.import_module("03_Enricher")
+notation = importlib.import_module("04_Notation")
+
+
+# === INPUTS AND PARSED OUTPUTS PER CHAIN ===
+def _text(row, *names):
+    return notation._first(row, *names)
+
+
+def _json_field(response, field):
+    match = re.search(rf'"{field}"\s*:\s*"([^"]*)"', response)
+    return match.group(1).strip() if match else ""
+
+
+def _company(response):
+    name = _json_field(response, "inferred_company_name").lower()
+    return "" if name in ("", "not found") else re.sub(r"[^a-z0-9]+", " ", name).strip()
+
+
+def _scores(response):
+    return tuple(notation.extract_score(response, f)
+                 for f in ("PROJECT_RELEVANCE", "PROJECT_STAGE", "COMPANY_FIT"))
+
+
+def _number(response):
+    digits = re.findall(r"\d+", response)
+    return min(100, int(digits[0])) if digits else None
+
+
+def _close(a, b):
+    if a is None or b is None:
+        return a == b
+    if isinstance(a, tuple):
+        return all(abs(x - y) <= SCORE_TOLERANCE for x, y in zip(a, b))
+    return abs(a - b) <= SCORE_TOLERANCE
+
+
+CHAINS = {
+    "inference_chain": {
+        "prompt": enricher.inference_prompt,
+        "inputs": lambda r: {"author_name": _text(r, "author_name", "post_author"),
+                             "author_role": _text(r, "author_role", "author_role_x", "author_role_y"),
+                             "post_text": _text(r, "post_text")[:1000]},
+        "parse": _company,
+        "agree": lambda a, b: a == b,
+    },
+    "theme_chain": {
+        "prompt": enricher.theme_prompt,
+        "inputs": lambda r: {"post_text": _text(r, "post_text")[:1000]},
+        "parse": lambda resp: _json_field(resp, "theme").upper(),
+        "agree": lambda a, b: a == b,
+    },
+    "scoring_chain": {
+        "prompt": notation.scoring_prompt,
+        "inputs": lambda r: {"post_text": _text(r, "post_text")[:1500],
+                             "project_summary": _text(r, "project_summary"),
+                             "company_name": _text(r, "company_name") or "Company name not identified",
+                             "author_role": _text(r, "author_role", "author_role_x", "author_role_y"),
+                             "one_sentence_description": _text(r, "one_sentence_description")},
+        "parse": _scores,
+        "agree": _close,
+    },
+    "geo_chain": {
+        "prompt": notation.geo_prompt,
+        "inputs": lambda r: {"city": _text(r, "city", "city_x", "city_y"),
+                             "country": _text(r, "country", "country_x", "country_y")},
+        "parse": _number,
+        "agree": _close,
+    },
+}
+
+
+# === COMPARISON ===
+def run(chain, inputs):
+    start = time.perf_counter()
+    response = chain.invoke(inputs)
+    return response, time.perf_counter() - start
+
+
+def compare(df, name, reference_model, candidate_model):
+    spec = CHAINS[name]
+    no_cache = LLMCache(enabled=False)
+    reference = CachedChain(name, spec["prompt"], DispatchedLLM(reference_model, 0.0), no_cache)
+    candidate = CachedChain(name, spec["prompt"], DispatchedLLM(candidate_model, 0.0), no_cache)
+
+    rows = []
+    for _, row in df.iterrows():
+        inputs = spec["inputs"](row)
+        if not any(str(v).strip() for v in inputs.values()):
+            continue
+        try:
+            ref_response, ref_latency = run(reference, inputs)
+            cand_response, cand_latency = run(candidate, inputs)
+        except Exception as e:
+            print(f"[WARNING] {name}: {e}")
+            continue
+        ref_value, cand_value = spec["parse"](ref_response), spec["parse"](cand_response)
+        rows.append({
+            "chain": name,
+            "post_id": _text(row, "post_id"),
+            "reference": ref_value,
+            "candidate": cand_value,
+            "agree": spec["agree"](ref_value, cand_value),
+            "reference_latency": round(ref_latency, 3),
+            "candidate_latency": round(cand_latency, 3),
+        })
+    return rows
+
+
+def summarize(results, reference_models, candidate_model):
+    print(f"\nCandidate model: {candidate_model} (scores agree within +/-{SCORE_TOLERANCE})")
+    print(f"{'chain':<18}{'reference':<14}{'rows':>6}{'agree':>8}{'ref p50':>10}{'cand p50':>10}{'speedup':>9}")
+    for name, group in results.groupby("chain", sort=False):
+        ref, cand = group["reference_latency"].median(), group["candidate_latency"].median()
+        print(f"{name:<18}{reference_models[name]:<14}{len(group):>6}{group['agree'].mean():>8.0%}"
+              f"{ref:>9.2f}s{cand:>9.2f}s{ref / cand if cand else 0:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and agreement of a smaller model per chain")
+    parser.add_argument("--candidate", required=True, help="Ollama model to evaluate, e.g. qwen2.5:3b")
+    parser.add_argument("--chains", nargs="+", choices=list(CHAINS), default=list(CHAINS))
+    parser.add_argument("--sample", type=int, default=30, help="rows drawn from the input (0 = all)")
+    parser.add_argument("--input", type=Path, default=INPUT_FILE)
+    parser.add_argument("--out", type=Path, help="per-row results as CSV")
+    args = parser.parse_args()
+
+    df = attach_text(read_table(args.input))
+    if args.sample and args.sample < len(df):
+        df = df.sample(n=args.sample, random_state=0)
+    reference_models = {name: chain_model(name) for name in args.chains}
+
+    rows = []
+    for name in args.chains:
+        print(f"[INFO] {name}: {reference_models[name]} vs {args.candidate} on {len(df)} rows")
+        rows.extend(compare(df, name, reference_models[name], args.candidate))
+    if not rows:
+        print("[WARNING] No comparison could be made")
+        return 1
+
+    results = pd.DataFrame(rows)
+    summarize(results, reference_models, args.candidate)
+    if args.out:
+        results.to_csv(args.out, index=False)
+        print(f"[INFO] Per-row results saved to {args.out}")
+    get_dispatcher().report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Compaction of the scraped web snippets sent to 03_Enricher's enrichment prompt.
+
+scrape_page_text() returns whole pages, most of it menus and marketing
+copy. compact_snippets() keeps the sentences that best match the company
+name and the fields to fill (BM25, FIELD_TERMS) within SNIPPET_TOKEN_BUDGET
+tokens, in page order and under their URL headers, so prompts get shorter
+without losing the lines the model answers from. COMPACT_SNIPPETS=0 sends
+the pages as they are.
+"""
+import os
+import re
+import math
+from collections import Counter
+
+# === SETTINGS ===
+SNIPPET_TOKEN_BUDGET = int(os.environ.get("SNIPPET_TOKEN_BUDGET", "300"))
+COMPACT_SNIPPETS = os.environ.get("COMPACT_SNIPPETS", "1") != "0"
+
+# Words that point at the fields enrichment_chain has to fill
+FIELD_TERMS = [
+    "official", "website", "www", "com", "headquarters", "headquartered", "head", "office",
+    "based", "located", "location", "address", "city", "country", "contact", "email", "mail",
+    "about", "company", "founded", "group", "provides", "provider", "specializes", "specialises",
+    "leading", "services", "solutions", "offshore", "marine", "subsea", "energy", "engineering",
+]
+
+BM25_K1, BM25_B = 1.5, 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_URL_RE = re.compile(r"^\[URL: (.+?)\]")
+
+
+def count_tokens(text):
+    """Cheap token estimate (~4 characters per token for English/Mistral)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _terms(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _split_pages(snippets):
+    """Split scrape_page_text() blocks back into (header, [sentences])."""
+    pages = []
+    for block in snippets.split("\n\n"):
+        block = block.strip()
+        if not block:
+            continue
+        lines = block.split("\n")
+        header = lines[0] if _URL_RE.match(lines[0]) else ""
+        body = "\n".join(lines[1:] if header else lines)
+        sentences = []
+        for line in body.split("\n"):
+            for s in _SENTENCE_RE.split(line):
+                s = s.strip()
+                if len(_terms(s)) >= 2:
+                    sentences.append(s)
+        pages.append((header, sentences))
+    return pages
+
+
+def _bm25_scores(docs, query):
+    n = len(docs)
+    avg_len = sum(len(d) for d in docs) / n if n else 0
+    df = Counter(t for d in docs for t in set(d))
+    scores = []
+    for d in docs:
+        tf = Counter(d)
+        score = 0.0
+        for t, weight in query.items():
+            if t not in tf:
+                continue
+            idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+            norm = tf[t] + BM25_K1 * (1 - BM25_B + BM25_B * len(d) / (avg_len or 1))
+            score += weight * idf * tf[t] * (BM25_K1 + 1) / norm
+        scores.append(score)
+    return scores
+
+
+def compact_snippets(snippets, company_name, budget=SNIPPET_TOKEN_BUDGET):
+    """Keep the sentences most relevant to the company and the fields we need, within ``budget`` tokens.
+
+    Sentences are ranked with BM25 against the company name (weighted x3) and
+    FIELD_TERMS, then re-emitted in their original order under their URL header.
+    """
+    if not snippets or count_tokens(snippets) <= budget:
+        return snippets
+    pages = _split_pages(snippets)
+    flat = [(p, i, s) for p, (_, sentences) in enumerate(pages) for i, s in enumerate(sentences)]
+    if not flat:
+        return snippets
+
+    query = Counter(FIELD_TERMS)
+    for t in _terms(company_name or ""):
+        query[t] += 3
+    scores = _bm25_scores([_terms(s) for _, _, s in flat], query)
+
+    # Headers (URLs) are always kept: they feed web_source_used
+    used = sum(count_tokens(h) for h, _ in pages if h)
+    keep = set()
+    for rank in sorted(range(len(flat)), key=lambda k: scores[k], reverse=True):
+        if scores[rank] <= 0:
+            break
+        cost = count_tokens(flat[rank][2])
+        if used + cost > budget:
+            continue
+        keep.add(rank)
+        used += cost
+
+    out = []
+    for p, (header, _) in enumerate(pages):
+        kept = [s for k, (pp, _, s) in enumerate(flat) if pp == p and k in keep]
+        if header or kept:
+            out.append("\n".join(([header] if header else []) + kept))
+    return "\n\n".join(out) if out else snippets
@@ -0,0 +1,310 @@
+"""Time and cost estimate of a run, learnt from the telemetry of previous runs.
+
+One rate per quantity, the median over the last ESTIMATE_HISTORY runs of
+metrics.jsonl (see telemetry.py):
+
+* posts per keyword (scrape row events, per keyword when it was seen before),
+  capped at --max-posts, and the share of scraped posts that are new, hence
+  enriched and scored;
+* scraping seconds per keyword, enrich/score seconds per row (stage wall time
+  over rows, so parallel scoring is accounted for), fixed time of clean/export;
+* LLM calls and tokens per enriched / scored row.
+
+Without scraping, the rows to enrich or score are the ones waiting in the
+stage tables. Until a rate has been measured, DEFAULTS stands in for it.
+
+06_Executable stores its prediction in the lead store ("estimates" table)
+when a run starts and the actual figures when it ends. The actual/predicted
+time ratio of the past runs then scales the next estimates.
+
+    python estimator.py [--keywords K ...] [--stages scrape,clean] [--max-posts N] [--limit N] [--pipeline]
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+import statistics
+from pathlib import Path
+
+from lead_store import open_store, ensure_table, has_table, upsert_row, read_rows, load_keys
+from progress import SCRIPT_STAGES
+from telemetry import events_by_run, load_events
+
+# === SETTINGS ===
+BASE_DIR = Path(__file__).resolve().parent
+KEYWORDS_FILE = BASE_DIR / "keywords.txt"
+ESTIMATES_TABLE = "estimates"
+HISTORY_RUNS = int(os.environ.get("ESTIMATE_HISTORY", "20"))  # most recent runs the rates are learnt on
+COST_PER_1K_TOKENS = float(os.environ.get("COST_PER_1K_TOKENS", "0"))  # 0 with a local Ollama
+MAX_POSTS = 20  # 01_Scraper default
+
+# Stand-ins until the history has a measure (rough figures of a CPU-only Ollama box)
+DEFAULTS = {
+    "posts_per_keyword": 12.0,
+    "fresh_share": 1.0,
+    "scrape_seconds_per_keyword": 90.0,
+    "enrich_seconds_per_row": 20.0,
+    "score_seconds_per_row": 30.0,
+    "clean_seconds": 2.0,
+    "export_seconds": 2.0,
+    "enrich_llm_calls_per_row": 3.0,
+    "score_llm_calls_per_row": 4.0,
+    "enrich_tokens_per_row": 1500.0,
+    "score_tokens_per_row": 4000.0,
+}
+STAGES = list(SCRIPT_STAGES.values())
+SCRIPT_STEMS = {Path(script).stem: stage for script, stage in SCRIPT_STAGES.items()}
+ROW_STAGES = ("enrich", "score")
+
+
+# === MEASURES OF ONE RUN ===
+def measures(events):
+    """Wall seconds, rows, LLM calls and tokens per stage, and posts per keyword, of one run."""
+    m = {"seconds": {}, "rows": {}, "llm": {}, "tokens": {}, "yields": {}, "keywords": set()}
+    for e in events:
+        stage = SCRIPT_STEMS.get(e.get("stage"))
+        if e["kind"] == "stage" and e["name"] in SCRIPT_STEMS and e.get("ok", True):
+            # --pipeline stages run side by side: their wall time includes waiting for upstream
+            if not e.get("pipelined"):
+                m["seconds"][SCRIPT_STEMS[e["name"]]] = e.get("seconds", 0)
+        elif e["kind"] == "row":
+            m["rows"][e["name"]] = m["rows"].get(e["name"], 0) + 1
+            if e["name"] == "scrape":
+                m["yields"][e.get("keyword")] = m["yields"].get(e.get("keyword"), 0) + 1
+        elif e["kind"] == "llm" and stage:
+            m["llm"][stage] = m["llm"].get(stage, 0) + 1
+            m["tokens"][stage] = m["tokens"].get(stage, 0) + e.get("prompt_tokens", 0) + e.get("eval_tokens", 0)
+        elif e["kind"] == "selenium" and e["name"] == "search_page":
+            m["keywords"].add(e.get("keyword"))
+    return m
+
+
+# === RATES ===
+def learn(history=None, conn=None):
+    """Rates measured on the last HISTORY_RUNS runs, plus the time calibration of past estimates."""
+    runs = list((events_by_run() if history is None else history).values())[-HISTORY_RUNS:]
+    samples = {name: [] for name in DEFAULTS}
+    yields = {}
+    for events in runs:
+        m = measures(events)
+        for keyword, posts in m["yields"].items():
+            yields.setdefault(keyword, []).append(posts)
+            samples["posts_per_keyword"].append(posts)
+        scraped = m["rows"].get("scrape")
+        if scraped and m["rows"].get("enrich"):
+            samples["fresh_share"].append(min(m["rows"]["enrich"] / scraped, 1.0))
+        if m["keywords"] and "scrape" in m["seconds"]:
+            samples["scrape_seconds_per_keyword"].append(m["seconds"]["scrape"] / len(m["keywords"]))
+        for stage in ROW_STAGES:
+            rows = m["rows"].get(stage)
+            if not rows:
+                continue
+            if stage in m["seconds"]:
+                samples[f"{stage}_seconds_per_row"].append(m["seconds"][stage] / rows)
+            samples[f"{stage}_llm_calls_per_row"].append(m["llm"].get(stage, 0) / rows)
+            samples[f"{stage}_tokens_per_row"].append(m["tokens"].get(stage, 0) / rows)
+        for stage in ("clean", "export"):
+            if stage in m["seconds"]:
+                samples[f"{stage}_seconds"].append(m["seconds"][stage])
+    return {
+        "rates": {name: statistics.median(v) if v else DEFAULTS[name] for name, v in samples.items()},
+        "measured": sorted(name for name, v in samples.items() if v),
+        "yields": {keyword: statistics.median(v) for keyword, v in yields.items()},
+        "runs": len(runs),
+        "calibration": calibration(conn),
+    }
+
+
+def calibration(conn=None):
+    """Actual/predicted time ratio over the past estimates (1.0 without any); long runs weigh the most."""
+    own = conn is None
+    conn = conn or open_store()
+    try:
+        ensure_table(conn, ESTIMATES_TABLE)
+        rows = sorted(read_rows(conn, ESTIMATES_TABLE), key=lambda r: r["at"])[-HISTORY_RUNS:]
+    finally:
+        if own:
+            conn.close()
+    # Predictions made on DEFAULTS timings say nothing about the bias of the measured rates
+    pairs = [(r["actual"]["seconds"], r["predicted"]["raw_seconds"]) for r in rows
+             if r.get("actual") and r["actual"].get("seconds") and r["predicted"].get("raw_seconds")
+             and not any("seconds" in name for name in r["predicted"].get("defaults_used", []))]
+    predicted = sum(p for _, p in pairs)
+    return round(sum(a for a, _ in pairs) / predicted, 3) if predicted else 1.0
+
+
+# === PREDICTION ===
+def read_keywords():
+    if not KEYWORDS_FILE.exists():
+        return []
+    with open(KEYWORDS_FILE, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def pending_rows(stage, keywords=None):
+    """Rows 03/04 would handle: Cleaned rows not enriched yet; Enriched rows new or whose scoring
+    fingerprint changed (same test as 04_Notation, so a prompt change counts every row again).
+
+    Read only. None when it cannot be told (Enriched without Cleaned: no post text, no fingerprint).
+    """
+    from handoff import read_table, table_exists
+    if stage == "score":
+        notation = importlib.import_module("04_Notation")
+        table, store = notation.INPUT_FILE, notation.STORE_TABLE
+    else:
+        table, store = BASE_DIR / "Cleaned", "enriched"  # next to the scripts, like 03's input
+    if not table_exists(table):
+        return 0
+    try:
+        if stage == "score":
+            from lead_schema import attach_text
+            from lead_store import row_key
+            df = attach_text(read_table(table))  # the fingerprint covers the post text
+        else:
+            df = read_table(table, columns=["post_id", "keyword"])
+    except FileNotFoundError:  # Cleaned missing (or a table deleted meanwhile)
+        return None
+    if keywords and "keyword" in df.columns:
+        df = df[df["keyword"].astype(str).isin(keywords)]
+    conn = open_store()
+    try:
+        known = has_table(conn, store)
+        if stage == "score":
+            scored = notation.scored_fingerprints(conn) if known else {}
+            # iterrows like 04, so the rows (and their fingerprints) are built the same way
+            return sum(scored.get(row_key(row)) != notation.scoring_fingerprint(row) for _, row in df.iterrows())
+        done = load_keys(conn, store) if known else set()
+    finally:
+        conn.close()
+    return int((~df["post_id"].astype(str).isin(done)).sum())
+
+
+def predict(keywords=None, stages=None, max_posts=None, limit=None, pipeline=False, model=None):
+    """Posts, rows, LLM calls, tokens and wall time of a run (same options as 06_Executable)."""
+    model = model or learn()
+    rates = model["rates"]
+    stages = [s for s in STAGES if s in (stages or STAGES)]
+    scoped = keywords  # None: every keyword, for the rows already in the tables
+    keywords = keywords or read_keywords()
+    max_posts = max_posts or MAX_POSTS
+
+    posts = 0
+    if "scrape" in stages:
+        posts = round(sum(min(model["yields"].get(k, rates["posts_per_keyword"]), max_posts) for k in keywords))
+    rows, unknown = {}, []
+
+    def waiting(stage):
+        n = pending_rows(stage, scoped)
+        if n is None:
+            unknown.append(stage)
+        return n or 0
+
+    if "enrich" in stages:
+        rows["enrich"] = round(posts * rates["fresh_share"]) if "scrape" in stages else waiting("enrich")
+    if "score" in stages:
+        rows["score"] = rows["enrich"] if "enrich" in rows else waiting("score")
+    if limit:
+        rows = {stage: min(n, limit) for stage, n in rows.items()}
+
+    seconds = {}
+    for stage in stages:
+        if stage == "scrape":
+            seconds[stage] = len(keywords) * rates["scrape_seconds_per_keyword"]
+        elif stage in ROW_STAGES:
+            seconds[stage] = rows[stage] * rates[f"{stage}_seconds_per_row"]
+        else:
+            seconds[stage] = rates[f"{stage}_seconds"]
+    if pipeline:
+        # Scraping, enrichment and scoring overlap: the slowest of them sets the pace
+        raw = max(seconds.get(s, 0) for s in ("scrape", "enrich", "score")) + seconds.get("clean", 0) \
+            + seconds.get("export", 0)
+    else:
+        raw = sum(seconds.values())
+    llm_calls = sum(n * rates[f"{stage}_llm_calls_per_row"] for stage, n in rows.items())
+    tokens = sum(n * rates[f"{stage}_tokens_per_row"] for stage, n in rows.items())
+    return {
+        "keywords": len(keywords),
+        "stages": stages,
+        "posts": posts,
+        "rows": rows,
+        "rows_unknown": unknown,  # stages whose waiting rows could not be counted (counted as 0)
+        "llm_calls": round(llm_calls),
+        "tokens": round(tokens),
+        "cost": round(tokens / 1000 * COST_PER_1K_TOKENS, 2),
+        "stage_seconds": {stage: round(s * model["calibration"], 1) for stage, s in seconds.items()},
+        "raw_seconds": round(raw, 1),
+        "seconds": round(raw * model["calibration"], 1),
+        "calibration": model["calibration"],
+        "history_runs": model["runs"],
+        "defaults_used": sorted(set(DEFAULTS) - set(model["measured"])),
+    }
+
+
+# === PREDICTED VS ACTUAL ===
+def save_prediction(conn, run, estimate):
+    ensure_table(conn, ESTIMATES_TABLE)
+    upsert_row(conn, ESTIMATES_TABLE, run, {"run": run, "at": time.time(), "predicted": estimate, "actual": None})
+
+
+def actuals(run, wall_seconds):
+    m = measures(load_events(run))
+    return {
+        "posts": m["rows"].get("scrape", 0),
+        "rows": {stage: m["rows"][stage] for stage in ROW_STAGES if stage in m["rows"]},
+        "llm_calls": sum(m["llm"].values()),
+        "tokens": sum(m["tokens"].values()),
+        "seconds": round(wall_seconds, 1),
+    }
+
+
+def record_actuals(conn, run, wall_seconds):
+    """Store the actual figures of ``run`` next to its prediction (None when it had none)."""
+    ensure_table(conn, ESTIMATES_TABLE)
+    row = next((r for r in read_rows(conn, ESTIMATES_TABLE) if r["run"] == run), None)
+    if row is None:
+        return None
+    row["actual"] = actuals(run, wall_seconds)
+    row["ratio"] = {key: round(row["actual"][key] / row["predicted"][key], 3)
+                    for key in ("posts", "llm_calls", "seconds") if row["predicted"].get(key)}
+    upsert_row(conn, ESTIMATES_TABLE, run, row)
+    return row
+
+
+def history(conn, limit=20):
+    """Latest estimates, newest first, with their actual figures when the run is over."""
+    ensure_table(conn, ESTIMATES_TABLE)
+    return sorted(read_rows(conn, ESTIMATES_TABLE), key=lambda r: r["at"], reverse=True)[:limit]
+
+
+def duration(seconds):
+    minutes = round(seconds / 60)
+    return f"{minutes // 60}h{minutes % 60:02d}" if minutes >= 60 else f"{max(minutes, 1)} min"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and cost estimate of a run")
+    parser.add_argument("--keywords", nargs="+", help="keywords of the run (default: keywords.txt)")
+    parser.add_argument("--stages", default="", help=f"comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--max-posts", type=int)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--pipeline", action="store_true")
+    args = parser.parse_args()
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()] or None
+    e = predict(args.keywords, stages, args.max_posts, args.limit, args.pipeline)
+    print(f"{e['keywords']} keywords, stages {','.join(e['stages'])} "
+          f"({e['history_runs']} past runs, calibration x{e['calibration']})")
+    print(f"  posts      {e['posts']}")
+    print(f"  rows       {', '.join(f'{s} {n}' for s, n in e['rows'].items()) or '-'}")
+    if e["rows_unknown"]:
+        print(f"  rows unknown (input table missing): {', '.join(e['rows_unknown'])}")
+    print(f"  LLM calls  {e['llm_calls']}  ({e['tokens']} tokens, cost {e['cost']})")
+    print(f"  time       {duration(e['seconds'])}  "
+          f"({', '.join(f'{s} {duration(t)}' for s, t in e['stage_seconds'].items())})")
+    if e["defaults_used"]:
+        print(f"  not measured yet (defaults): {', '.join(e['defaults_used'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
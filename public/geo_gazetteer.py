@@ -0,0 +1,184 @@
+"""Geographic accessibility score of a lead's location, without an LLM call in most cases.
+
+LinkedIn city/country fields (French or English, with their decorations) are
+matched against geo_gazetteer.csv: the region priority for COSMA times a
+factor for the distance to the coast. Places the gazetteer does not know
+are asked to the geo chain once, and the answer is memoized in the lead
+store (table "geo_memo") for every later row and run.
+"""
+import os
+import re
+import csv
+import json
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+
+from lead_store import STORE_FILE, open_store, ensure_table, read_rows, upsert_row
+
+# === SETTINGS ===
+BASE_DIR = Path(__file__).resolve().parent
+GAZETTEER_FILE = BASE_DIR / "geo_gazetteer.csv"
+MEMO_TABLE = "geo_memo"
+UNKNOWN_GEO_SCORE = int(os.environ.get("UNKNOWN_GEO_SCORE", "50"))  # no city and no country at all
+
+# Priority of each gazetteer region for COSMA (coastal Europe first)
+REGION_PRIORITY = {
+    "north_sea": 100,
+    "baltic": 95,
+    "europe_atlantic": 90,
+    "mediterranean": 80,
+    "europe_inland": 60,
+    "north_america": 60,
+    "middle_east": 55,
+    "north_africa": 55,
+    "asia_pacific": 50,
+    "latin_america": 45,
+    "sub_saharan_africa": 40,
+    "central_asia": 30,
+}
+
+# Distance to the coast (km) -> multiplier
+COAST_FACTORS = [(25, 1.0), (100, 0.85), (300, 0.7)]
+INLAND_FACTOR = 0.5
+
+# LinkedIn (FR) location decorations
+_PREFIXES = (
+    "region metropolitaine de ", "district metropolitain de ", "district de ", "territoire federal de ",
+    "province de ", "etat de ", "comte de ", "ville de ", "metro de ", "grand ", "greater ", "wp ",
+)
+_SUFFIXES = (" et peripherie", " metropolitan area", " area", " urbain", " plains")
+
+
+def normalize(text):
+    """Lowercase, strip accents, punctuation and LinkedIn decorations."""
+    text = str(text or "").strip()
+    if text.lower() in ("nan", "none"):
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r"[^a-z0-9' -]+", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    for prefix in _PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    for suffix in _SUFFIXES:
+        if text.endswith(suffix):
+            text = text[:-len(suffix)]
+    return text.strip()
+
+
+def coast_factor(coast_km):
+    for limit, factor in COAST_FACTORS:
+        if coast_km <= limit:
+            return factor
+    return INLAND_FACTOR
+
+
+# === GAZETTEER ===
+def load_gazetteer(path=GAZETTEER_FILE):
+    """Return (cities, countries) dicts keyed by every normalized name/alias."""
+    cities, countries = {}, {}
+    with open(path, "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        if row["kind"] == "country":
+            entry = {"country": row["name"], "region": row["region"], "coast_km": float(row["coast_km"])}
+            for name in [row["name"]] + [a for a in row["aliases"].split("|") if a]:
+                countries[normalize(name)] = entry
+    for row in rows:
+        if row["kind"] == "city":
+            country = countries[normalize(row["country"])]
+            entry = {"city": row["name"], "country": country["country"], "region": country["region"],
+                     "coast_km": float(row["coast_km"])}
+            for name in [row["name"]] + [a for a in row["aliases"].split("|") if a]:
+                cities[normalize(name)] = entry
+    return cities, countries
+
+
+def gazetteer_version(path=GAZETTEER_FILE):
+    """Hash of the gazetteer file and of the score tables: a change re-scores the rows (04_Notation)."""
+    digest = hashlib.sha256(Path(path).read_bytes())
+    digest.update(json.dumps([REGION_PRIORITY, COAST_FACTORS, INLAND_FACTOR, UNKNOWN_GEO_SCORE],
+                             sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def parse_location(city, country):
+    """Normalized (city, country) from LinkedIn fields such as ('Londres', 'Angleterre, Royaume-Uni')."""
+    city_key = normalize(city)
+    parts = [p for p in str(country or "").split(",") if normalize(p)]
+    country_key = normalize(parts[-1]) if parts else ""
+    return city_key, country_key
+
+
+class GeoScorer:
+    """Deterministic geographic accessibility: gazetteer first, then a memoized LLM answer."""
+
+    def __init__(self, llm_chain=None, store_path=STORE_FILE):
+        self.cities, self.countries = load_gazetteer()
+        self.llm_chain = llm_chain
+        self.stats = {"gazetteer": 0, "memo": 0, "llm": 0, "unknown": 0}
+        self._lock = threading.Lock()  # stats, memo and store writes
+        self._asking = {}  # location key -> Event, set once its LLM answer is in the memo
+        self.conn = open_store(store_path, check_same_thread=False)
+        ensure_table(self.conn, MEMO_TABLE)
+        self.memo = {r["key"]: r["score"] for r in read_rows(self.conn, MEMO_TABLE)}
+
+    def lookup(self, city, country):
+        """Gazetteer score or None when the location is not covered."""
+        city_key, country_key = parse_location(city, country)
+        # A LinkedIn "city" is often just a country ("Royaume-Uni", "Grece")
+        if not country_key and city_key in self.countries:
+            city_key, country_key = "", city_key
+        entry = self.cities.get(city_key)
+        if entry and country_key and self.countries.get(country_key, entry)["country"] != entry["country"]:
+            entry = None  # same city name in another country
+        if entry is None:
+            entry = self.countries.get(country_key)
+        if entry is None:
+            return None
+        return round(REGION_PRIORITY.get(entry["region"], UNKNOWN_GEO_SCORE) * coast_factor(entry["coast_km"]))
+
+    def _count(self, source):
+        with self._lock:
+            self.stats[source] += 1
+
+    def score(self, city, country):
+        score = self.lookup(city, country)
+        if score is not None:
+            self._count("gazetteer")
+            return score
+        key = "|".join(parse_location(city, country))
+        if key == "|":
+            self._count("unknown")
+            return UNKNOWN_GEO_SCORE
+        while True:
+            with self._lock:
+                if key in self.memo:
+                    self.stats["memo"] += 1
+                    return self.memo[key]
+                asking = self._asking.get(key)
+                if asking is None:
+                    asking = self._asking[key] = threading.Event()
+                    break
+            # Another row is asking the LLM about the same place: wait for its answer
+            asking.wait()
+        # Unknown location: ask the LLM once (lock released meanwhile), then reuse forever
+        try:
+            score = UNKNOWN_GEO_SCORE
+            if self.llm_chain is not None:
+                digits = re.findall(r"\d+", self.llm_chain.invoke({"city": city, "country": country}))
+                score = min(100, int(digits[0])) if digits else UNKNOWN_GEO_SCORE
+            with self._lock:
+                self.memo[key] = score
+                upsert_row(self.conn, MEMO_TABLE, key, {"key": key, "city": city, "country": country, "score": score})
+                self.stats["llm"] += 1
+        finally:
+            with self._lock:
+                del self._asking[key]
+            asking.set()  # on failure the waiting rows ask again
+        return score
+
+    def report(self):
+        print("Geo accessibility sources: " + ", ".join(f"{k}={v}" for k, v in self.stats.items()))
@@ -0,0 +1,239 @@
+"""Columnar handoff files between stages (Parquet), Excel only as an export.
+
+Each stage table is a Parquet dataset directory, e.g. ``Scraped.parquet/``:
+``write_table`` replaces it (the new directory is swapped in by renames, and
+between the two renames readers get the previous table, set aside as
+``Scraped.parquet.old-<writer>/``; every writer has its own temporary and
+aside names, so two jobs may rewrite the same table), ``append_table`` adds one part file (one row
+group) without rewriting history, and ``read_table`` reads only the requested
+columns. When a stage has never written Parquet yet, the legacy ``.xlsx``
+next to it is read instead, so existing folders keep working.
+
+Tables are cast to the declared lead schema (lead_schema.py) on both sides,
+so categoricals and nullable integers survive the round trip. The .xlsx
+copies are for end users: text-free tables get their post text back there.
+
+EXPORT_EXCEL controls the .xlsx copies: "final" (default, Scored_Enriched
+only), "all" (every stage, as before) or "0" (none).
+"""
+import os
+import time
+import uuid
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from lead_schema import TEXT_FREE_TABLES, apply_schema, attach_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pip install pyarrow
+    pa = pq = None
+
+# === SETTINGS ===
+HANDOFF_FORMAT = os.environ.get("HANDOFF_FORMAT", "parquet")  # "parquet" or "xlsx" (previous behaviour)
+EXPORT_EXCEL = os.environ.get("EXPORT_EXCEL", "final")
+FINAL_TABLES = {"Scored_Enriched"}
+COMPRESSION = "zstd"
+SWAP_ATTEMPTS = 5      # renames tried when other writers swap the same table at the same time
+STALE_SECONDS = 3600   # temporary / aside directories left by a crashed writer are deleted after this
+
+if HANDOFF_FORMAT == "parquet" and pq is None:
+    print("[WARNING] pyarrow is not installed: stage handoffs fall back to .xlsx")
+    HANDOFF_FORMAT = "xlsx"
+
+
+def table_path(path):
+    """Handoff path of a stage table given as "Cleaned", "Cleaned.xlsx" or "Cleaned.parquet"."""
+    path = Path(path)
+    suffix = ".parquet" if HANDOFF_FORMAT == "parquet" else ".xlsx"
+    return path.with_suffix(suffix) if path.suffix in ("", ".xlsx", ".parquet") else path
+
+
+def _excel_wanted(path):
+    return EXPORT_EXCEL == "all" or (EXPORT_EXCEL == "final" and Path(path).stem in FINAL_TABLES)
+
+
+def _export_excel(df, path):
+    """End-user .xlsx copy of a Parquet table, with the post text joined back."""
+    if Path(path).stem in TEXT_FREE_TABLES:
+        df = attach_text(df)
+    _write_excel(df, Path(path).with_suffix(".xlsx"))
+
+
+def _write_excel(df, target):
+    # Written aside then renamed: a concurrent writer or reader never sees half a workbook
+    tmp = target.with_name(f".{target.stem}-{_writer_tag()}.xlsx")
+    try:
+        df.to_excel(tmp, index=False)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _arrow_safe(df):
+    # Object columns mixing str/int/float (Excel leftovers) cannot become one Arrow type
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].map(lambda v: v if v is None or (isinstance(v, float) and pd.isna(v)) else str(v))
+    return df
+
+
+def _writer_tag():
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def _asides(path):
+    """Tables set aside by write_table while it swaps a new one in, newest first."""
+    asides = []
+    for aside in path.parent.glob(path.name + ".old-*"):
+        try:
+            asides.append((aside.stat().st_mtime, aside))
+        except FileNotFoundError:  # deleted since the glob
+            pass
+    return [aside for _, aside in sorted(asides, reverse=True)]
+
+
+def _parquet_exists(path):
+    # The table, then the ones set aside, then the table again: during a swap one of them is there
+    return path.exists() or bool(_asides(path)) or path.exists()
+
+
+# === READS ===
+def table_exists(path):
+    path = table_path(path)
+    return _parquet_exists(path) or path.with_suffix(".xlsx").exists()
+
+
+def table_mtime(path):
+    path = table_path(path)
+    if path.suffix == ".parquet" and not path.exists():
+        path = next(iter(_asides(path)), path)  # mid-swap
+    if path.is_dir():
+        return max((p.stat().st_mtime for p in path.glob("*.parquet")), default=path.stat().st_mtime)
+    if path.exists():
+        return path.stat().st_mtime
+    return path.with_suffix(".xlsx").stat().st_mtime
+
+
+def _read_parquet(path, columns):
+    parts = sorted(path.glob("*.parquet")) if path.is_dir() else [path]
+    if not parts or not parts[0].exists():
+        raise FileNotFoundError(path)
+    schema = pq.read_schema(parts[0])
+    if columns is not None:
+        columns = [c for c in columns if c in schema.names]
+    # The listed parts, not the directory: a part deleted meanwhile fails instead of reading as empty
+    return apply_schema(pq.read_table([str(p) for p in parts], columns=columns).to_pandas())
+
+
+def read_table(path, columns=None):
+    """Whole stage table, or only ``columns`` (missing ones are skipped)."""
+    path = table_path(path)
+    if path.suffix == ".parquet" and _parquet_exists(path):
+        for attempt in range(3):
+            # Mid-swap: the table is missing for an instant, the previous one is complete aside
+            source = path if path.exists() else next(iter(_asides(path)), path)
+            try:
+                return _read_parquet(source, columns)
+            except FileNotFoundError:  # swapped or deleted while read: look again
+                if attempt == 2:
+                    raise
+                time.sleep(0.05)
+    legacy = path.with_suffix(".xlsx")
+    if not legacy.exists():
+        raise FileNotFoundError(f"{path} not found (nor {legacy.name})")
+    df = apply_schema(pd.read_excel(legacy))
+    return df if columns is None else df[[c for c in columns if c in df.columns]]
+
+
+# === WRITES ===
+def _swap_in(tmp, path, tag):
+    """Rename ``tmp`` to ``path``: the table in place is set aside first, and deleted once replaced."""
+    asides = []
+    try:
+        for attempt in range(SWAP_ATTEMPTS):
+            aside = path.with_name(f"{path.name}.old-{tag}-{attempt}")
+            try:
+                path.rename(aside)
+                asides.append(aside)
+            except FileNotFoundError:  # no table yet, or another writer has just set it aside
+                pass
+            try:
+                tmp.rename(path)
+                return
+            except OSError:  # another writer swapped its table in meanwhile: set that one aside too
+                continue
+        raise OSError(f"{path}: new table not swapped in after {SWAP_ATTEMPTS} attempts")
+    finally:
+        for aside in asides:
+            shutil.rmtree(aside, ignore_errors=True)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _remove_stale(path):
+    # Temporary and aside directories of writers that crashed mid-swap
+    for leftover in [*path.parent.glob(path.name + ".tmp-*"), *path.parent.glob(path.name + ".old-*")]:
+        try:
+            if time.time() - leftover.stat().st_mtime > STALE_SECONDS:
+                shutil.rmtree(leftover, ignore_errors=True)
+        except FileNotFoundError:
+            pass
+
+
+def write_table(df, path):
+    """Replace a stage table (plus its .xlsx export when EXPORT_EXCEL asks for it)."""
+    path = table_path(path)
+    df = apply_schema(df)
+    if path.suffix == ".parquet":
+        _remove_stale(path)
+        tag = _writer_tag()
+        tmp = path.with_name(f"{path.name}.tmp-{tag}")
+        tmp.mkdir()
+        pq.write_table(pa.Table.from_pandas(_arrow_safe(df), preserve_index=False), tmp / "part-00000.parquet",
+                       compression=COMPRESSION)
+        _swap_in(tmp, path, tag)
+    if path.suffix == ".xlsx":
+        _write_excel(df, path)
+    elif _excel_wanted(path):
+        _export_excel(df, path)
+
+
+def append_table(df, path, dedup_on=None):
+    """Add rows to a stage table as a new row group, without rewriting the existing ones."""
+    path = table_path(path)
+    if path.suffix != ".parquet" or not path.exists():
+        existing = read_table(path) if table_exists(path) else None
+        combined = df if existing is None else pd.concat([existing, df], ignore_index=True)
+        if dedup_on:
+            combined = combined.drop_duplicates(subset=[dedup_on])
+        write_table(combined, path)
+        return
+    schema = pq.read_schema(next(path.glob("*.parquet")))
+    if set(df.columns) - set(schema.names):
+        # New columns: the parts must share one schema, so the table is rewritten with the wider one
+        combined = pd.concat([read_table(path), df], ignore_index=True)
+        if dedup_on:
+            combined = combined.drop_duplicates(subset=[dedup_on])
+        write_table(combined, path)
+        return
+    if dedup_on:
+        # Only the key column is read to drop rows already in the table
+        known = set(read_table(path, columns=[dedup_on]).get(dedup_on, pd.Series(dtype=object)).astype(str))
+        df = df[~df[dedup_on].astype(str).isin(known)].drop_duplicates(subset=[dedup_on])
+        if df.empty:
+            return
+    new = _arrow_safe(apply_schema(df))
+    # Same columns and order as the existing parts, so the dataset stays readable as one table
+    for name in schema.names:
+        if name not in new.columns:
+            new[name] = None
+    table = pa.Table.from_pandas(new[[n for n in schema.names]], preserve_index=False)
+    pq.write_table(table.cast(schema, safe=False), path / f"part-{time.time_ns()}.parquet",
+                   compression=COMPRESSION)
+    if _excel_wanted(path):
+        _export_excel(read_table(path), path)
@@ -0,0 +1,286 @@
+"""Persistent queue of 06_Executable runs, started by server.py (/api/run).
+
+Each job is one 06_Executable process. Jobs are kept in the lead store
+("jobs" table), so the queue and the history survive a server restart:
+
+    {"id": "3f2a...", "status": "running", "stages": ["scrape", "clean"], "resources": ["browser"],
+     "command": [...], "pid": 4242, "created": 1729000000.0, "started": 1729000001.2,
+     "ended": null, "returncode": null}
+
+Status: queued -> running -> done | failed | cancelled. Jobs run in their own
+session and outlive a server restart: the next server keeps them running
+(with their resources) until their process exits, then tells done from
+failed by the stage states of their run (progress.py). A job whose
+process is already gone at restart is marked interrupted.
+
+A queued job starts as soon as its resources are free:
+
+* one slot per resource class its stages use (browser for scraping, llm for
+  enrichment and scoring), JOB_SLOTS_BROWSER / JOB_SLOTS_LLM slots per class;
+* no running job that works on the same rows: same or neighbouring stage (a
+  stage writes one table, its neighbours read or write it) over overlapping
+  keywords. Only scrape/enrich/score honour --keywords; a job without
+  keywords covers them all, and clean/export always cover every row.
+
+So a scrape-only job runs next to a scoring job, and with JOB_SLOTS_LLM=2 two
+enrichment jobs run side by side on disjoint keywords; an export still waits
+for a running scoring job. The job id is also the run id (TELEMETRY_RUN) of
+its telemetry and progress events.
+"""
+import os
+import sys
+import time
+import uuid
+import signal
+import threading
+import subprocess
+from pathlib import Path
+from subprocess import Popen, TimeoutExpired
+
+from lead_store import open_store, ensure_table, upsert_row, read_rows
+from progress import SCRIPT_STAGES, snapshot
+
+# === SETTINGS ===
+JOBS_TABLE = "jobs"
+JOB_POLL = float(os.environ.get("JOB_POLL", "1"))  # seconds between two scheduler passes
+
+STAGE_RESOURCES = {"scrape": "browser", "enrich": "llm", "score": "llm"}
+SLOTS = {
+    "browser": int(os.environ.get("JOB_SLOTS_BROWSER", "1")),
+    "llm": int(os.environ.get("JOB_SLOTS_LLM", "1")),
+}
+FINISHED = ("done", "failed", "cancelled", "interrupted")
+STAGE_ORDER = list(SCRIPT_STAGES.values())
+SCOPED_STAGES = ("scrape", "enrich", "score")  # stages restricted to the job's --keywords
+
+
+def resources_of(stages):
+    return sorted({STAGE_RESOURCES[s] for s in stages if s in STAGE_RESOURCES})
+
+
+def touches(stage, other):
+    """True when two stages share a table: same stage, or one feeds the other."""
+    return abs(STAGE_ORDER.index(stage) - STAGE_ORDER.index(other)) <= 1
+
+
+def same_rows(job, other):
+    """True when two jobs cover common keywords (no keywords: every keyword)."""
+    mine, theirs = job["params"].get("keywords"), other["params"].get("keywords")
+    return not mine or not theirs or bool(set(mine) & set(theirs))
+
+
+def conflicts(job, other):
+    """True when ``job`` and ``other`` would read or write the same rows of a table."""
+    rows_shared = same_rows(job, other)
+    return any(touches(s, o) and (rows_shared or s not in SCOPED_STAGES or o not in SCOPED_STAGES)
+               for s in job["stages"] for o in other["stages"])
+
+
+def pid_alive(pid):
+    """True while process ``pid`` runs (jobs started by a previous server have no Popen here)."""
+    if not pid:
+        return False
+    if os.name == "nt":
+        out = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], check=False,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True).stdout
+        return str(pid) in out.split()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by someone else
+        return True
+    try:  # a zombie has exited already
+        return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:  # no /proc (macOS)
+        return True
+
+
+def terminate(proc=None, pid=None):
+    """Stop a job process and its children (06 starts one subprocess per stage in --pipeline).
+
+    Jobs start in their own session / process group, so the whole group gets the signal.
+    ``pid`` alone stops a job started by a previous server.
+    """
+    pid = proc.pid if proc is not None else pid
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], check=False,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return
+    try:
+        os.killpg(pid, signal.SIGTERM)
+        if proc is not None:
+            proc.wait(timeout=5)
+            return
+        deadline = time.time() + 5
+        while pid_alive(pid):
+            if time.time() > deadline:
+                raise TimeoutExpired(str(pid), 5)
+            time.sleep(0.1)
+    except TimeoutExpired:
+        os.killpg(pid, signal.SIGKILL)
+        if proc is not None:
+            proc.wait()
+    except ProcessLookupError:  # already gone
+        pass
+
+
+def run_status(conn, job):
+    """done / failed for a job that ended without us as parent: every stage of its run done or not."""
+    stages = snapshot(conn, run=job["id"])["stages"]
+    return "done" if stages and all(s["state"] == "done" for s in stages) else "failed"
+
+
+class JobQueue:
+    """Jobs in the store, processes in memory; every change goes through ``_lock``."""
+
+    def __init__(self, cwd):
+        self.cwd = str(cwd)
+        self._procs = {}  # job id -> Popen, running jobs of this server only
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # --- store ---
+    def _save(self, conn, job):
+        upsert_row(conn, JOBS_TABLE, job["id"], job)
+
+    def _jobs(self, conn):
+        ensure_table(conn, JOBS_TABLE)
+        return read_rows(conn, JOBS_TABLE)
+
+    # --- scheduling ---
+    def start(self):
+        """Scheduler thread. Jobs of a previous server stay running while their process lives
+        (they keep their resources), the others are marked interrupted."""
+        if self._thread is not None:
+            return
+        conn = open_store()
+        for job in self._jobs(conn):
+            if job["status"] == "running" and not pid_alive(job.get("pid")):
+                job.update(status="interrupted", ended=time.time())
+                self._save(conn, job)
+        conn.close()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:  # the scheduler must outlive one bad pass
+                print(f"[WARNING] Job queue: {e}")
+            time.sleep(JOB_POLL)
+
+    def tick(self):
+        with self._lock:
+            conn = open_store()
+            try:
+                self._reap(conn)
+                self._dispatch(conn)
+            finally:
+                conn.close()
+
+    def _reap(self, conn):
+        for job in self._jobs(conn):
+            proc = self._procs.get(job["id"])
+            if proc is None:
+                # Started by a previous server: no return code, the stage states tell how it ended
+                if job["status"] == "running" and not pid_alive(job.get("pid")):
+                    job.update(status=run_status(conn, job), ended=time.time())
+                    self._save(conn, job)
+                continue
+            if proc.poll() is None:
+                continue
+            del self._procs[job["id"]]
+            if job["status"] == "running":
+                job["status"] = "done" if proc.returncode == 0 else "failed"
+            job.update(returncode=proc.returncode, ended=job.get("ended") or time.time())
+            self._save(conn, job)
+
+    def _dispatch(self, conn):
+        jobs = self._jobs(conn)
+        running = [j for j in jobs if j["status"] == "running"]
+        for job in sorted((j for j in jobs if j["status"] == "queued"), key=lambda j: j["created"]):
+            used = {r: sum(r in j["resources"] for j in running) for r in SLOTS}
+            if any(conflicts(job, j) for j in running) or any(used[r] >= SLOTS[r] for r in job["resources"]):
+                continue  # a later job with other resources or keywords may still start
+            # Own process group / session: cancelling reaches the stage subprocesses too
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" \
+                else {"start_new_session": True}
+            try:
+                proc = Popen(job["command"], cwd=self.cwd, env={**os.environ, "TELEMETRY_RUN": job["id"]}, **group)
+            except OSError as e:
+                job.update(status="failed", ended=time.time(), error=str(e))
+                self._save(conn, job)
+                continue
+            self._procs[job["id"]] = proc
+            job.update(status="running", pid=proc.pid, started=time.time())
+            self._save(conn, job)
+            running.append(job)
+
+    # --- API ---
+    def submit(self, command, stages, params=None):
+        """Queue a run of ``command`` over ``stages``; it starts right away when its resources are free."""
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "stages": list(stages),
+            "resources": resources_of(stages),
+            "params": params or {},
+            "command": list(command),
+            "pid": None,
+            "created": time.time(),
+            "started": None,
+            "ended": None,
+            "returncode": None,
+        }
+        with self._lock:
+            conn = open_store()
+            try:
+                ensure_table(conn, JOBS_TABLE)
+                self._save(conn, job)
+            finally:
+                conn.close()
+        self.tick()
+        return self.get(job["id"])
+
+    def get(self, job_id):
+        conn = open_store()
+        try:
+            return next((j for j in self._jobs(conn) if j["id"] == job_id), None)
+        finally:
+            conn.close()
+
+    def list(self, limit=50):
+        conn = open_store()
+        try:
+            return sorted(self._jobs(conn), key=lambda j: j["created"], reverse=True)[:limit]
+        finally:
+            conn.close()
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or stop a running one. None when the job does not exist."""
+        with self._lock:
+            conn = open_store()
+            try:
+                job = next((j for j in self._jobs(conn) if j["id"] == job_id), None)
+                if job is None or job["status"] in FINISHED:
+                    return job
+                proc = self._procs.get(job_id)
+                if proc is not None and proc.poll() is None:
+                    terminate(proc)
+                elif proc is None and job["status"] == "running" and pid_alive(job.get("pid")):
+                    terminate(pid=job["pid"])  # started by a previous server
+                job.update(status="cancelled", ended=time.time())
+                self._save(conn, job)
+            finally:
+                conn.close()
+        self.tick()  # the freed resources go to the next queued job
+        return self.get(job_id)
+
+    def running(self):
+        return [j for j in self.list(limit=sys.maxsize) if j["status"] == "running"]
+
+    def counts(self):
+        jobs = self.list(limit=sys.maxsize)
+        return {status: sum(j["status"] == status for j in jobs) for status in ("queued", "running")}
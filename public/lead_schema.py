@@ -0,0 +1,134 @@
+"""Declared schema of the lead tables handed between stages.
+
+Every stage table goes through ``apply_schema`` when it is written or read
+(see handoff.py), so the same column always has the same compact dtype:
+
+* low-cardinality labels (keyword, theme, city, country, ...) are categoricals;
+* scores are nullable small integers, score_global a nullable float;
+* ``_x``/``_y`` pairs left by merges are folded back into one column, and
+  columns that only repeat another one (post_author, the old ``index``) are dropped.
+
+The post text, by far the largest column, is stored once: in Cleaned, keyed
+by post_id. Enriched and Scored_Enriched reference it by post_id and stages
+that need it join it back with ``attach_text``. The end-user exports (the
+.xlsx copies written by handoff.py, the JSON of 05) get it back too.
+
+    python lead_schema.py            # memory per 10k leads, before/after, per stage table
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# === SCHEMA ===
+CATEGORY_COLUMNS = [
+    "keyword", "theme", "inference_confidence", "web_source_used", "error",
+    "city", "country", "location", "project_phase", "opportunity_capability", "scoring_tier",
+]
+INT_COLUMNS = {
+    "score_project_relevance": "Int16",
+    "score_project_stage": "Int16",
+    "score_company_fit": "Int16",
+    "geographic_accessibility": "Int16",
+    "cluster_size": "Int32",
+}
+FLOAT_COLUMNS = {"score_global": "Float64"}
+
+# Columns that only repeat another one: dropped when the original is present
+REDUNDANT_COLUMNS = {"post_author": "author_name"}
+LEGACY_COLUMNS = ["index", "Unnamed: 0"]
+
+TEXT_COLUMNS = ["post_text"]
+# Cleaned text lives here (next to the scripts, whatever the cwd); Scraped keeps the raw text as scraped
+TEXT_TABLE = Path(__file__).resolve().parent / "Cleaned"
+TEXT_FREE_TABLES = ("Enriched", "Scored_Enriched")
+
+
+# === CASTS ===
+def fold_merge_suffixes(df):
+    """Fold ``col_x``/``col_y`` into ``col`` (first non-empty value wins)."""
+    for name in [c[:-2] for c in df.columns if c.endswith("_x") and c[:-2] + "_y" in df.columns]:
+        # object first: a categorical cannot take values outside its categories
+        x, y = df[name + "_x"].astype(object), df[name + "_y"].astype(object)
+        values = x.where(x.notna() & (x.astype(str) != ""), y)
+        if name in df.columns:
+            base = df[name].astype(object)
+            values = base.where(base.notna() & (base.astype(str) != ""), values)
+        df = df.drop(columns=[name + "_x", name + "_y"]).assign(**{name: values})
+    return df
+
+
+def drop_redundant(df):
+    drop = [c for c in LEGACY_COLUMNS if c in df.columns]
+    drop += [c for c, original in REDUNDANT_COLUMNS.items() if c in df.columns and original in df.columns]
+    return df.drop(columns=drop)
+
+
+def apply_schema(df):
+    """Same rows, deduplicated columns and compact dtypes."""
+    df = drop_redundant(fold_merge_suffixes(df))
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Excel leftovers may mix numbers and strings in one column
+            values = df[col].where(df[col].isna(), df[col].astype(str))
+            df[col] = values.astype("category")
+    for col, dtype in {**INT_COLUMNS, **FLOAT_COLUMNS}.items():
+        if col in df.columns:
+            numbers = pd.to_numeric(df[col], errors="coerce")
+            df[col] = numbers.round().astype(dtype) if dtype.startswith("Int") else numbers.astype(dtype)
+    return df
+
+
+# === TEXT, STORED ONCE ===
+def without_text(data):
+    """``data`` (a DataFrame or one row as a dict) minus TEXT_COLUMNS."""
+    if isinstance(data, dict):
+        return {k: v for k, v in data.items() if k not in TEXT_COLUMNS}
+    return data.drop(columns=[c for c in TEXT_COLUMNS if c in data.columns])
+
+
+def attach_text(df, texts=None):
+    """Join TEXT_COLUMNS back on post_id (from TEXT_TABLE unless ``texts`` is given).
+
+    Raises FileNotFoundError without TEXT_TABLE: scoring without the post
+    text would silently change every scoring fingerprint.
+    """
+    missing = [c for c in TEXT_COLUMNS if c not in df.columns]
+    if not missing or df.empty or "post_id" not in df.columns:
+        return df
+    if texts is None:
+        from handoff import read_table, table_exists
+        if not table_exists(TEXT_TABLE):
+            raise FileNotFoundError(f"{TEXT_TABLE} not found: {', '.join(missing)} cannot be attached")
+        texts = read_table(TEXT_TABLE, columns=["post_id"] + missing)
+    texts = texts.drop_duplicates(subset=["post_id"])
+    merged = df.astype({"post_id": str}).merge(texts.astype({"post_id": str}), how="left", on="post_id")
+    for col in missing:
+        merged[col] = merged[col].fillna("")
+    return merged
+
+
+# === MEASUREMENT ===
+def memory_per_10k(df):
+    """Deep memory of ``df`` in MB, scaled to 10,000 rows."""
+    return df.memory_usage(deep=True).sum() / max(len(df), 1) * 10_000 / 1e6
+
+
+def main(tables=("Scraped", "Cleaned", "Enriched", "Scored_Enriched")):
+    from handoff import table_path
+    print(f"{'table':<18}{'rows':>6}{'cols':>6}{'before':>10}{'after':>10}{'cols':>6}   (MB per 10k leads)")
+    for name in tables:
+        legacy = table_path(name).with_suffix(".xlsx")
+        if not legacy.exists():
+            continue
+        before = pd.read_excel(legacy)
+        after = apply_schema(before.copy())
+        if name in TEXT_FREE_TABLES:
+            after = without_text(after)
+        print(f"{name:<18}{len(before):>6}{before.shape[1]:>6}{memory_per_10k(before):>10.1f}"
+              f"{memory_per_10k(after):>10.1f}{after.shape[1]:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or ("Scraped", "Cleaned", "Enriched", "Scored_Enriched")))
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+# === SETTINGS (paths resolved relative to this script) ===
+BASE_DIR = Path(__file__).resolve().parent
+STORE_FILE = Path(os.environ.get("STORE_FILE", "lead_store.sqlite"))
+
+if not STORE_FILE.is_absolute():
+    STORE_FILE = BASE_DIR / STORE_FILE
+
+
+# === ROW KEYS ===
+def row_key(row):
+    """Content key of a post: post_id (stable when the input file is reordered)."""
+    post_id = str(row.get("post_id", "") or "").strip()
+    if post_id and post_id.lower() != "nan":
+        return post_id
+    # Fallback: hash of the content, never the position
+    base = f"{row.get('post_url', '')}-{row.get('post_text', '')}"
+    return hashlib.md5(base.encode("utf-8")).hexdigest()
+
+
+# === CONNECTION ===
+def open_store(path=STORE_FILE, check_same_thread=True):
+    """Open the SQLite store in WAL mode (readers never block the writer)."""
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def ensure_table(conn, table):
+    """One table per stage: a primary key plus the row serialized as JSON."""
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS "{table}" ('
+        "key TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+    )
+    conn.commit()
+
+
+# === SERIALIZATION ===
+def _json_default(value):
+    # numpy scalars, pandas timestamps...
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _clean(value):
+    # NaN/NaT are not valid JSON for SQLite's json_extract: store them as null
+    try:
+        return None if pd.isna(value) else value
+    except (TypeError, ValueError):
+        return value
+
+
+def _dumps(row):
+    return json.dumps({k: _clean(v) for k, v in row.items()}, ensure_ascii=False, default=_json_default)
+
+
+# === WRITES ===
+def upsert_row(conn, table, key, row):
+    """Insert or replace a single row and commit it immediately."""
+    with conn:
+        conn.execute(
+            f'INSERT INTO "{table}" (key, data, updated_at) VALUES (?, ?, ?) '
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (str(key), _dumps(row), time.time()),
+        )
+
+
+def upsert_many(conn, table, keyed_rows):
+    """Bulk upsert of (key, row) pairs in a single transaction."""
+    now = time.time()
+    with conn:
+        conn.executemany(
+            f'INSERT INTO "{table}" (key, data, updated_at) VALUES (?, ?, ?) '
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            [(str(k), _dumps(r), now) for k, r in keyed_rows],
+        )
+
+
+# === READS ===
+def load_keys(conn, table):
+    return {k for (k,) in conn.execute(f'SELECT key FROM "{table}"')}
+
+
+def has_table(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def count_rows(conn, table):
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+def read_row(conn, table, key):
+    """One row by key, or None."""
+    found = conn.execute(f'SELECT data FROM "{table}" WHERE key = ?', (str(key),)).fetchone()
+    return json.loads(found[0]) if found else None
+
+
+def read_rows(conn, table):
+    return [json.loads(d) for (d,) in conn.execute(f'SELECT data FROM "{table}" ORDER BY rowid')]
+
+
+def read_frame(conn, table, columns=None):
+    """Whole table as a DataFrame (one row per key, no duplicates by construction)."""
+    df = pd.DataFrame(read_rows(conn, table))
+    if columns is not None:
+        df = df.reindex(columns=columns)
+    return df
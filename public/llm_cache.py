@@ -0,0 +1,233 @@
+"""Persistent cache of LLM responses shared by 03_Enricher and 04_Notation.
+
+All chains run with temperature=0, so an identical prompt sent to the same
+model gives the same answer: re-running a stage after a crash or a stop
+replays those answers from disk instead of calling Ollama again.
+
+CLI:
+    python llm_cache.py --stats
+    python llm_cache.py --invalidate scoring_chain [--invalidate geo_chain ...]
+    python llm_cache.py --clear
+"""
+import os
+import sys
+import json
+import atexit
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from collections import defaultdict
+
+from lead_store import BASE_DIR, open_store
+from telemetry import record
+
+# === SETTINGS ===
+CACHE_FILE = Path(os.environ.get("LLM_CACHE_FILE", "llm_cache.sqlite"))
+CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "50000"))
+CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") != "0"
+EVICT_EVERY = 100  # eviction check every N writes
+FLUSH_SECONDS = float(os.environ.get("LLM_CACHE_FLUSH_SECONDS", "30"))  # hit counters and LRU times kept in memory up to this
+FLUSH_EVERY = 500  # ... or up to this many lookups
+
+if not CACHE_FILE.is_absolute():
+    CACHE_FILE = BASE_DIR / CACHE_FILE
+
+
+def template_hash(prompt):
+    return hashlib.sha256(prompt.template.encode("utf-8")).hexdigest()[:16]
+
+
+def model_id(llm):
+    return f"{getattr(llm, 'model', type(llm).__name__)}@{getattr(llm, 'temperature', None)}"
+
+
+class LLMCache:
+    """SQLite-backed response cache with LRU eviction and per-chain hit counters.
+
+    Lookups only read SQLite: hit/miss counters and last-used times are kept in
+    memory and written in one transaction every FLUSH_SECONDS / FLUSH_EVERY
+    lookups, with the next response written, and at exit (a SIGTERM loses at
+    most that much of the statistics, never a response).
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=CACHE_MAX_ENTRIES, enabled=CACHE_ENABLED):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counts = defaultdict(lambda: [0, 0])  # chain -> [hits, misses] not written yet
+        self._touched = {}  # key -> last_used not written yet
+        self._lookups = 0
+        self._flushed = time.monotonic()
+        self.conn = open_store(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, chain TEXT NOT NULL, template_hash TEXT NOT NULL, "
+                "model TEXT NOT NULL, response TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_chain ON responses (chain)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS chain_stats (chain TEXT PRIMARY KEY, hits INTEGER NOT NULL, misses INTEGER NOT NULL)"
+            )
+        atexit.register(self.flush)
+
+    # --- lookups ---
+    def get(self, chain, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._touched[key] = time.time()
+            self._count(chain, hit=row is not None)
+            if self._lookups >= FLUSH_EVERY or time.monotonic() - self._flushed >= FLUSH_SECONDS:
+                with self.conn:
+                    self._flush_locked()
+        return row[0] if row else None
+
+    def put(self, chain, key, thash, model, response):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock, self.conn:
+            self._flush_locked()  # same transaction: LRU times are current before an eviction
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, chain, template_hash, model, response, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, chain, thash, model, response, now, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict()
+
+    def _count(self, chain, hit):
+        self.stats[chain]["hits" if hit else "misses"] += 1
+        self._counts[chain][0 if hit else 1] += 1
+        self._lookups += 1
+
+    def _flush_locked(self):
+        # Caller holds self._lock and the transaction
+        if self._touched:
+            self.conn.executemany("UPDATE responses SET last_used = MAX(last_used, ?) WHERE key = ?",
+                                  [(t, k) for k, t in self._touched.items()])
+        if self._counts:
+            self.conn.executemany(
+                "INSERT INTO chain_stats (chain, hits, misses) VALUES (?, ?, ?) "
+                "ON CONFLICT(chain) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+                [(chain, hits, misses) for chain, (hits, misses) in self._counts.items()],
+            )
+        self._touched.clear()
+        self._counts.clear()
+        self._lookups = 0
+        self._flushed = time.monotonic()
+
+    def flush(self):
+        """Write the counters and last-used times kept in memory."""
+        with self._lock:
+            if self._counts or self._touched:
+                with self.conn:
+                    self._flush_locked()
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+        self.conn.close()
+
+    def _evict(self):
+        # Least recently used entries beyond max_entries
+        self.conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    # --- maintenance ---
+    def invalidate(self, chain=None, thash=None):
+        """Drop the entries of one chain (all templates, or a single template hash)."""
+        clauses, params = [], []
+        if chain:
+            clauses.append("chain = ?")
+            params.append(chain)
+        if thash:
+            clauses.append("template_hash = ?")
+            params.append(thash)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self._lock, self.conn:
+            return self.conn.execute(f"DELETE FROM responses{where}", params).rowcount
+
+    def hit_rates(self, cumulative=False):
+        if cumulative:
+            self.flush()
+            rows = self.conn.execute("SELECT chain, hits, misses FROM chain_stats ORDER BY chain").fetchall()
+            stats = {c: {"hits": h, "misses": m} for c, h, m in rows}
+        else:
+            stats = {c: dict(s) for c, s in sorted(self.stats.items())}
+        for s in stats.values():
+            total = s["hits"] + s["misses"]
+            s["hit_rate"] = round(s["hits"] / total, 3) if total else 0.0
+        return stats
+
+    def report(self, cumulative=False):
+        stats = self.hit_rates(cumulative)
+        if not stats:
+            print("[INFO] LLM cache: no lookups")
+            return
+        print("[INFO] LLM cache hit rates:")
+        for chain, s in stats.items():
+            print(f"  {chain:<24} {s['hits']:>6} hits / {s['misses']:>6} misses  ({s['hit_rate']:.0%})")
+
+
+class CachedChain:
+    """Drop-in replacement for ``prompt | llm`` with the same ``invoke(inputs)``."""
+
+    def __init__(self, name, prompt, llm, cache):
+        self.name = name
+        self.prompt = prompt
+        self.llm = llm
+        self.cache = cache
+        self.template_hash = template_hash(prompt)
+        self.model = model_id(llm)
+
+    def key(self, inputs):
+        rendered = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{self.model}\0{self.template_hash}\0{rendered}".encode("utf-8")).hexdigest()
+
+    def invoke(self, inputs):
+        start = time.perf_counter()
+        key = self.key(inputs)
+        cached = self.cache.get(self.name, key)
+        if cached is not None:
+            record("chain", self.name, time.perf_counter() - start, cached=True)
+            return cached
+        response = self.llm.invoke(self.prompt.format(**inputs))
+        self.cache.put(self.name, key, self.template_hash, self.model, response)
+        record("chain", self.name, time.perf_counter() - start, cached=False)
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM response cache maintenance")
+    parser.add_argument("--stats", action="store_true", help="cumulative hit rates per chain")
+    parser.add_argument("--invalidate", action="append", metavar="CHAIN", default=[])
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    cache = LLMCache()
+    for chain in args.invalidate:
+        print(f"[INFO] {chain}: {cache.invalidate(chain=chain)} entries removed")
+    if args.clear:
+        print(f"[INFO] {cache.invalidate()} entries removed")
+    if args.stats or not (args.invalidate or args.clear):
+        count = cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        print(f"[INFO] {CACHE_FILE.name}: {count} entries (max {cache.max_entries})")
+        cache.report(cumulative=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""Shared dispatcher for every Ollama call of 03_Enricher and 04_Notation.
+
+Backends come from OLLAMA_BACKENDS, a comma-separated list of
+``url[=max_concurrent_requests]``, e.g.
+
+    OLLAMA_BACKENDS="http://localhost:11434=4,http://gpu-box:11434=2"
+
+Each request goes to the least-loaded backend that still has a free slot
+(in_flight / limit). When every slot is taken the caller waits in the queue. A
+failed request is retried on another backend, and the failing backend is
+avoided for BACKEND_COOLDOWN seconds.
+
+The slots are shared by every process of the machine (03 and 04 run side by
+side in --pipeline mode, jobs can run in parallel): each slot is a lock file
+in LLM_SLOTS_DIR, held for the duration of the request and released by the
+OS if the process dies. LLM_SHARED_SLOTS=0 keeps the limits per process.
+
+Every process publishes its dispatcher metrics (queue, latencies, requests
+per backend) to the lead store ("llm_metrics" table, one row per run and
+process, at most every METRICS_EVERY seconds), so server.py can serve those
+of the stage processes at /api/llm.
+
+The model of each chain comes from llm_models.json ("default" plus per-chain
+overrides), so classification-style chains can run on a smaller model; see
+compare_models.py to check agreement before switching.
+
+CLI (checks every backend with a one-word prompt):
+    python llm_dispatcher.py [--model mistral]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from telemetry import record, ollama_fields, current_run
+from lead_store import open_store, ensure_table, upsert_row, read_rows
+
+# === SETTINGS ===
+OLLAMA_BACKENDS = os.environ.get("OLLAMA_BACKENDS", "http://localhost:11434")
+DEFAULT_CONCURRENCY = int(os.environ.get("OLLAMA_CONCURRENCY", "2"))  # per backend, match OLLAMA_NUM_PARALLEL
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", "2"))                 # extra attempts, each on another backend
+BACKEND_COOLDOWN = float(os.environ.get("BACKEND_COOLDOWN", "30"))    # seconds a failing backend is avoided
+LATENCY_WINDOW = 500  # latencies kept per backend for the percentiles
+BASE_DIR = Path(__file__).resolve().parent
+MODELS_CONFIG = Path(os.environ.get("LLM_MODELS_CONFIG", "llm_models.json"))
+DEFAULT_MODEL = "mistral"
+SHARED_SLOTS = os.environ.get("LLM_SHARED_SLOTS", "1") != "0"
+SLOTS_DIR = Path(os.environ.get("LLM_SLOTS_DIR", BASE_DIR / ".llm_slots"))
+SLOT_POLL = 0.05  # seconds between two looks at the slots freed by other processes
+METRICS_TABLE = "llm_metrics"
+METRICS_EVERY = float(os.environ.get("LLM_METRICS_EVERY", "5"))  # seconds between two writes of the metrics
+
+if not MODELS_CONFIG.is_absolute():
+    MODELS_CONFIG = BASE_DIR / MODELS_CONFIG
+
+
+def load_chain_models(path=MODELS_CONFIG):
+    """{"default": model, "chains": {chain_name: model}} from MODELS_CONFIG."""
+    config = {"default": DEFAULT_MODEL, "chains": {}}
+    if path.exists():
+        user = json.loads(path.read_text(encoding="utf-8"))
+        config["default"] = user.get("default", DEFAULT_MODEL)
+        config["chains"].update(user.get("chains", {}))
+    return config
+
+
+def chain_model(name, config=None):
+    config = config or load_chain_models()
+    return config["chains"].get(name, config["default"])
+
+
+def parse_backends(spec=OLLAMA_BACKENDS, default_limit=DEFAULT_CONCURRENCY):
+    """[(url, limit)] from "url[=limit],url[=limit]"."""
+    backends = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, limit = item.partition("=")
+        backends.append((url.strip().rstrip("/"), int(limit) if limit.strip() else default_limit))
+    return backends
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Backend:
+    def __init__(self, url, limit):
+        self.url = url
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.down_until = 0.0
+        self.latencies = []
+        self._clients = {}
+
+    def client(self, model, temperature):
+        # One client per (model, temperature): langchain clients keep their HTTP session
+        key = (model, temperature)
+        if key not in self._clients:
+            from langchain_ollama import OllamaLLM  # imported on first use: stages without LLM calls skip it
+            self._clients[key] = OllamaLLM(model=model, temperature=temperature, base_url=self.url)
+        return self._clients[key]
+
+    @property
+    def load(self):
+        return self.in_flight / self.limit
+
+
+# === SLOTS SHARED ACROSS PROCESSES ===
+def _try_lock(handle):
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SharedSlots:
+    """``limit`` lock files per backend; a held lock is a request in flight, whatever the process."""
+
+    def __init__(self, directory=SLOTS_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def try_acquire(self, backend):
+        """An open, locked slot file of ``backend``, or None when all its slots are taken."""
+        prefix = hashlib.sha1(backend.url.encode("utf-8")).hexdigest()[:12]
+        for i in range(backend.limit):
+            handle = open(self.directory / f"{prefix}-{i}.lock", "a+")
+            if _try_lock(handle):
+                return handle
+            handle.close()
+        return None
+
+    def release(self, handle):
+        try:
+            _unlock(handle)
+        finally:
+            handle.close()
+
+
+class LLMDispatcher:
+    """Routes prompts to the least-loaded Ollama backend, within per-backend concurrency limits."""
+
+    def __init__(self, backends=None, retries=LLM_RETRIES, shared=SHARED_SLOTS):
+        self.backends = [Backend(url, limit) for url, limit in (backends or parse_backends())]
+        if not self.backends:
+            raise ValueError("OLLAMA_BACKENDS is empty")
+        self.retries = retries
+        self.slots = SharedSlots() if shared else None
+        self._cond = threading.Condition()
+        self.waiting = 0
+        self.max_waiting = 0
+        self.queue_waits = []
+        self._publish_lock = threading.Lock()
+        self._last_publish = 0.0
+
+    # --- routing ---
+    def _pick(self, exclude):
+        now = time.time()
+        allowed = [b for b in self.backends if b not in exclude]
+        # A backend in cooldown is only used when no healthy one is left (it may be back up)
+        healthy = [b for b in allowed if b.down_until <= now] or allowed
+        candidates = sorted((b for b in healthy if b.in_flight < b.limit), key=lambda b: (b.load, b.in_flight))
+        for backend in candidates:
+            # Least loaded here first, but its slot may be held by another process
+            slot = self.slots.try_acquire(backend) if self.slots else True
+            if slot:
+                return backend, slot
+        return None, None
+
+    def _acquire(self, exclude):
+        start = time.perf_counter()
+        with self._cond:
+            # Every backend already tried: allow them again rather than failing
+            if len(exclude) >= len(self.backends):
+                exclude = set()
+            backend, slot = self._pick(exclude)
+            if backend is None:
+                self.waiting += 1
+                self.max_waiting = max(self.max_waiting, self.waiting)
+                while backend is None:
+                    # Other processes free their slots without notifying us: look again regularly
+                    self._cond.wait(timeout=SLOT_POLL if self.slots else None)
+                    backend, slot = self._pick(exclude)
+                self.waiting -= 1
+            backend.in_flight += 1
+            self.queue_waits.append(time.perf_counter() - start)
+            del self.queue_waits[:-LATENCY_WINDOW]
+        return backend, slot
+
+    def _release(self, backend, slot, latency=None, failed=False):
+        with self._cond:
+            if self.slots:
+                self.slots.release(slot)
+            backend.in_flight -= 1
+            backend.requests += 1
+            if failed:
+                backend.failures += 1
+                backend.down_until = time.time() + BACKEND_COOLDOWN
+            else:
+                backend.down_until = 0.0
+                backend.latencies.append(latency)
+                del backend.latencies[:-LATENCY_WINDOW]
+            self._cond.notify_all()
+
+    def invoke(self, model, temperature, text):
+        tried, last_error = set(), None
+        for _ in range(1 + self.retries):
+            backend, slot = self._acquire(tried)
+            tried.add(backend)
+            start = time.perf_counter()
+            try:
+                # generate() instead of invoke(): same text, plus Ollama's token counts and durations
+                generation = backend.client(model, temperature).generate([text]).generations[0][0]
+            except Exception as e:
+                self._release(backend, slot, failed=True)
+                record("llm", model, time.perf_counter() - start, backend=backend.url, ok=False)
+                last_error = e
+                print(f"[WARNING] LLM backend {backend.url} failed ({model}): {e}")
+                continue
+            latency = time.perf_counter() - start
+            self._release(backend, slot, latency)
+            record("llm", model, latency, backend=backend.url, ok=True, **ollama_fields(generation.generation_info))
+            self.publish()
+            return generation.text
+        self.publish()
+        raise last_error
+
+    # --- metrics ---
+    def metrics(self):
+        with self._cond:
+            return {
+                "queue_depth": self.waiting,
+                "max_queue_depth": self.max_waiting,
+                "queue_wait_p50": round(_percentile(self.queue_waits, 0.5), 3),
+                "queue_wait_p95": round(_percentile(self.queue_waits, 0.95), 3),
+                "backends": [
+                    {
+                        "url": b.url,
+                        "limit": b.limit,
+                        "in_flight": b.in_flight,
+                        "requests": b.requests,
+                        "failures": b.failures,
+                        "healthy": b.down_until <= time.time(),
+                        "latency_p50": round(_percentile(b.latencies, 0.5), 3),
+                        "latency_p95": round(_percentile(b.latencies, 0.95), 3),
+                    }
+                    for b in self.backends
+                ],
+            }
+
+    def publish(self, force=False):
+        """Write metrics() to the lead store, at most every METRICS_EVERY seconds unless ``force``."""
+        now = time.time()
+        if not force and now - self._last_publish < METRICS_EVERY:
+            return
+        # Another thread is already writing them: nothing new to add
+        if not self._publish_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_publish = now
+            row = {"run": current_run(), "pid": os.getpid(), "process": Path(sys.argv[0]).name,
+                   "at": now, **self.metrics()}
+            conn = open_store()
+            try:
+                ensure_table(conn, METRICS_TABLE)
+                upsert_row(conn, METRICS_TABLE, f"{row['run']}/{row['pid']}", row)
+            finally:
+                conn.close()
+        except Exception as e:  # metrics must never fail an LLM call
+            print(f"[WARNING] LLM metrics not saved: {e}")
+        finally:
+            self._publish_lock.release()
+
+    def report(self):
+        m = self.metrics()
+        if not any(b["requests"] for b in m["backends"]):
+            return
+        self.publish(force=True)
+        print(f"[INFO] LLM dispatcher: max queue depth {m['max_queue_depth']}, "
+              f"queue wait p50 {m['queue_wait_p50']:.2f}s / p95 {m['queue_wait_p95']:.2f}s")
+        for b in m["backends"]:
+            print(f"  {b['url']:<32} {b['requests']:>6} requests ({b['failures']} failed, limit {b['limit']})  "
+                  f"latency p50 {b['latency_p50']:.2f}s / p95 {b['latency_p95']:.2f}s")
+
+
+def published_metrics(conn, run=None):
+    """Metrics published by the processes of ``run`` (default: the latest run), latest first."""
+    ensure_table(conn, METRICS_TABLE)
+    rows = sorted(read_rows(conn, METRICS_TABLE), key=lambda r: r["at"], reverse=True)
+    run = run or (rows[0]["run"] if rows else None)
+    return [r for r in rows if r["run"] == run]
+
+
+class DispatchedLLM:
+    """Stand-in for ``OllamaLLM(model=..., temperature=...)`` whose calls go through the dispatcher."""
+
+    def __init__(self, model, temperature=0.0, dispatcher=None):
+        self.model = model
+        self.temperature = temperature
+        self.dispatcher = dispatcher or get_dispatcher()
+
+    def invoke(self, text):
+        return self.dispatcher.invoke(self.model, self.temperature, text)
+
+
+_DISPATCHER = None
+_DISPATCHER_LOCK = threading.Lock()
+
+
+def get_dispatcher():
+    """Process-wide dispatcher (its slots are shared with the other processes, see SharedSlots)."""
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            _DISPATCHER = LLMDispatcher()
+        return _DISPATCHER
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the configured Ollama backends")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+
+    dispatcher = get_dispatcher()
+    status = 0
+    for backend in dispatcher.backends:
+        start = time.perf_counter()
+        try:
+            backend.client(args.model, 0.0).invoke("Reply with one word: ok")
+            print(f"[OK] {backend.url} (limit {backend.limit}) {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            print(f"[ERROR] {backend.url}: {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import os
+import re
+import codecs
+import threading
+
+import requests
+from lxml import etree
+
+from telemetry import http_hook
+
+# === SETTINGS ===
+MAX_BYTES = int(os.environ.get("PAGE_MAX_BYTES", str(256 * 1024)))  # Budget de téléchargement par page
+CHUNK_SIZE = 16 * 1024
+MAX_PARAGRAPHS = 5
+MAX_CONTENT = 1000
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+SKIP_TEXT_TAGS = {"script", "style", "template"}
+HTTP_POOL_SIZE = 16  # connexions gardées ouvertes par hôte
+_COMMENT_RE = re.compile(r"(<!--.*?-->)", re.S)
+
+
+# === SESSION HTTP PARTAGÉE ===
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session():
+    """Session requests du processus : connexions keep-alive réutilisées par 03 et 04 (et entre étapes en mode in-process)."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            _SESSION.mount("https://", adapter)
+            _SESSION.mount("http://", adapter)
+            _SESSION.headers.update(HEADERS)
+            _SESSION.hooks["response"].append(http_hook)  # latence par hôte dans metrics.jsonl
+        return _SESSION
+
+
+# === INCREMENTAL EXTRACTION (lxml target parser, no tree is built) ===
+class PageSummary:
+    """Collects title, meta description and the first <p> texts while the page is fed.
+
+    Mirrors the BeautifulSoup extraction used before: ``soup.title.string``,
+    the first ``<meta name="description">`` and ``p.get_text(strip=True)``.
+
+    Known differences with the html.parser output, on malformed pages only:
+    an unclosed ``<p>`` ends at the next ``<p>`` or block tag, as in browsers
+    (``<p>a<p>b<p>c`` gives "a b c" where html.parser nested the paragraphs
+    and repeated their text: "abc bc c"), and the text after a block tag
+    inside a ``<p>`` is not part of that paragraph.
+    """
+
+    def __init__(self, max_paragraphs=MAX_PARAGRAPHS, max_content=MAX_CONTENT):
+        self.max_paragraphs = max_paragraphs
+        self.max_content = max_content
+        self.title = None
+        self.meta = None
+        self.paragraphs = []
+        self._open_p = []      # indices of <p> currently open
+        self._in_title = False
+        self._title_parts = []
+        self._skip_depth = 0
+        self._pending = []     # text of the current node, joined on the next tag boundary
+        self._content_len = 0
+
+    # --- parser target interface ---
+    def start(self, tag, attrib):
+        self._flush()
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta" and self.meta is None and attrib.get("name") == "description":
+            self.meta = (attrib.get("content") or "").strip()
+        elif tag == "p" and len(self.paragraphs) < self.max_paragraphs:
+            self.paragraphs.append([])
+            self._open_p.append(len(self.paragraphs) - 1)
+
+    def end(self, tag):
+        self._flush()
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = self._title_string()
+        elif tag == "p" and self._open_p:
+            closed = self.paragraphs[self._open_p.pop()]
+            self._content_len += len("".join(closed)) + 1
+
+    def data(self, text):
+        self._pending.append(text)
+
+    def comment(self, text):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        if self._in_title:
+            self.title = self._title_string()
+        return self
+
+    # --- helpers ---
+    def _title_string(self):
+        # lxml hands the title over as raw text, comments included; like soup.title.string,
+        # keep the text of a title made of one text or one comment, nothing when mixed
+        parts = [p for p in _COMMENT_RE.split("".join(self._title_parts)) if p]
+        if len(parts) != 1:
+            return ""
+        part = parts[0]
+        return (part[4:-3] if part.startswith("<!--") else part).strip()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending = []
+        if self._in_title:
+            self._title_parts.append(text)
+            return
+        if self._skip_depth:
+            return
+        text = text.strip()
+        if text:
+            for i in self._open_p:
+                self.paragraphs[i].append(text)
+
+    @property
+    def done(self):
+        """True once later bytes can no longer change the output."""
+        if self._open_p or self._in_title:
+            return False
+        return len(self.paragraphs) >= self.max_paragraphs or self._content_len > self.max_content
+
+    def content(self):
+        return " ".join("".join(parts) for parts in self.paragraphs)[:self.max_content]
+
+
+def extract_page(chunks, encoding="utf-8", max_bytes=MAX_BYTES):
+    """Feed byte chunks to the parser until the summary is complete or the budget is spent.
+
+    Returns (summary, bytes_read).
+    """
+    summary = PageSummary()
+    parser = etree.HTMLParser(target=summary, recover=True)
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if summary.done or read >= max_bytes:
+            break
+    try:
+        parser.close()
+    except etree.LxmlError:
+        summary.close()
+    return summary, read
+
+
+def format_page_text(url, summary):
+    return (
+        f"[URL: {url}]\nTitle: {summary.title or ''}\n"
+        f"Meta: {summary.meta or ''}\nContent: {summary.content()}"
+    )
+
+
+# === STREAMING FETCH ===
+def scrape_page_text(url, max_bytes=MAX_BYTES, session=None):
+    """Download at most ``max_bytes`` of ``url`` and return the title/meta/content snippet."""
+    getter = (session or get_session()).get
+    try:
+        with getter(url, timeout=10, headers=HEADERS, stream=True) as res:
+            summary, _ = extract_page(res.iter_content(CHUNK_SIZE), res.encoding or "utf-8", max_bytes)
+        return format_page_text(url, summary)
+    except Exception as e:
+        return f"[URL: {url}] - Failed to scrape: {str(e)}"
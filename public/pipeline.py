@@ -0,0 +1,122 @@
+"""Stage coordination for the pipelined run (``06_Executable.py --pipeline``).
+
+Stages hand rows to each other through the lead store instead of Excel files:
+
+    01_Scraper  --(scraped)-->  03_Enricher --follow  --(enriched)-->  04_Notation --follow  --(scored)
+
+06_Executable marks each stage "running" under a run id (PIPELINE_RUN), then
+"done" or "failed" when its process exits. A follower keeps polling its
+upstream table until the upstream stage is finished and nothing is left. A
+producer blocks while its downstream stage has more than PIPELINE_MAX_BACKLOG
+rows waiting (back-pressure), so Chrome doesn't race ahead of Ollama.
+
+A run can also be narrowed (06_Executable --keywords/--limit): RUN_KEYWORDS
+and ROW_LIMIT are read by the stages through ``in_scope`` and ``row_limit``.
+"""
+import os
+import json
+import time
+import importlib
+
+import pandas as pd
+
+from lead_store import ensure_table, upsert_row, read_rows, read_frame
+
+# === SETTINGS ===
+PIPELINE_RUN = os.environ.get("PIPELINE_RUN", "")  # set by 06_Executable --pipeline
+MAX_BACKLOG = int(os.environ.get("PIPELINE_MAX_BACKLOG", "20"))
+POLL_SECONDS = float(os.environ.get("PIPELINE_POLL", "5"))
+STATE_TABLE = "stage_state"
+SCRAPED_TABLE = "scraped"
+
+# Stage -> store table holding its finished rows
+STAGE_TABLES = {"scrape": SCRAPED_TABLE, "enrich": "enriched", "score": "scored"}
+FINISHED = ("done", "failed")
+
+
+# === STAGE STATE ===
+def set_stage_state(conn, stage, state, run_id=PIPELINE_RUN):
+    ensure_table(conn, STATE_TABLE)
+    upsert_row(conn, STATE_TABLE, stage, {"stage": stage, "state": state, "run_id": run_id, "at": time.time()})
+
+
+def stage_state(conn, stage):
+    ensure_table(conn, STATE_TABLE)
+    for row in read_rows(conn, STATE_TABLE):
+        if row["stage"] == stage:
+            return row
+    return None
+
+
+def stage_finished(conn, stage, run_id=PIPELINE_RUN):
+    """True once ``stage`` exited (done or failed) in this run, or when not running pipelined."""
+    if not run_id:
+        return True
+    state = stage_state(conn, stage)
+    return state is not None and state["run_id"] == run_id and state["state"] in FINISHED
+
+
+# === BACK-PRESSURE ===
+def backlog(conn, stage):
+    """Rows produced by ``stage``'s upstream table that ``stage`` has not stored yet."""
+    upstream = {"enrich": SCRAPED_TABLE, "score": "enriched"}[stage]
+    table = STAGE_TABLES[stage]
+    ensure_table(conn, upstream)
+    ensure_table(conn, table)
+    return conn.execute(
+        f'SELECT COUNT(*) FROM "{upstream}" u WHERE NOT EXISTS (SELECT 1 FROM "{table}" d WHERE d.key = u.key)'
+    ).fetchone()[0]
+
+
+def wait_for_room(conn, producer, downstream, max_backlog=MAX_BACKLOG):
+    """Block ``producer`` while ``downstream`` has more than ``max_backlog`` rows to do."""
+    if not PIPELINE_RUN or run_keywords():
+        # A keyword subset leaves out-of-scope rows in the backlog for good: no back-pressure
+        return 0.0
+    start = time.perf_counter()
+    announced = False
+    while backlog(conn, downstream) > max_backlog and not stage_finished(conn, downstream):
+        if not announced:
+            print(f"[INFO] {producer}: {downstream} is {backlog(conn, downstream)} rows behind, waiting...", flush=True)
+            announced = True
+        time.sleep(POLL_SECONDS)
+    return time.perf_counter() - start
+
+
+# === RUN SCOPE (06_Executable --keywords / --limit) ===
+def run_keywords():
+    """Keywords this run is restricted to (RUN_KEYWORDS, a JSON list), or None for all of them."""
+    raw = os.environ.get("RUN_KEYWORDS")
+    return json.loads(raw) if raw else None
+
+
+def row_limit():
+    """Most rows a stage processes in this run (ROW_LIMIT, 0 = no limit)."""
+    return int(os.environ.get("ROW_LIMIT") or 0)
+
+
+def in_scope(df):
+    """Rows of ``df`` that belong to the run's keywords (every row without a keyword subset)."""
+    keywords = run_keywords()
+    if not keywords or df.empty or "keyword" not in df.columns:
+        return df
+    return df[df["keyword"].astype(str).isin(keywords)]
+
+
+# === STAGE INPUTS ===
+def cleaned_frame(conn):
+    """Scraped rows cleaned exactly like 02_Cleaner (what Cleaned.xlsx would contain)."""
+    ensure_table(conn, SCRAPED_TABLE)
+    df = read_frame(conn, SCRAPED_TABLE)
+    if df.empty:
+        return df
+    return importlib.import_module("02_Cleaner").enrich_data(df)
+
+
+def enriched_frame(conn):
+    """Cleaned rows joined to their enrichment, same columns as Enriched.xlsx."""
+    ensure_table(conn, STAGE_TABLES["enrich"])
+    cleaned, enriched = cleaned_frame(conn), read_frame(conn, STAGE_TABLES["enrich"])
+    if cleaned.empty or enriched.empty:
+        return pd.DataFrame()
+    return cleaned.merge(enriched, how="inner", on="post_id")
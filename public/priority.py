@@ -0,0 +1,128 @@
+"""Cheap lead priority, so that 03/04 handle the most promising rows first.
+
+In priority mode (PRIORITY=1, set by 06_Executable --priority) 03_Enricher
+and 04_Notation walk their rows best first instead of in file order. The
+priority costs no LLM call and mixes three signals (WEIGHTS):
+
+* keyword: mean score_global of the leads the keyword brought in before
+  (scored store), relative to the best keyword; unseen keywords get the mean;
+* lexicon: project / procurement terms found in the post text;
+* role: decision makers (director, head of, procurement...) over other roles.
+
+Together with ``IntervalExport`` (Enriched, Scored_Enriched and the JSON of
+the front end rewritten every EXPORT_INTERVAL seconds), a run stopped early
+(/api/stop, --limit) still leaves its best leads behind.
+"""
+import os
+import re
+import time
+
+import pandas as pd
+
+from lead_store import open_store, ensure_table, read_frame
+
+# === SETTINGS ===
+EXPORT_INTERVAL = float(os.environ.get("EXPORT_INTERVAL", "300"))  # seconds between two partial exports
+WEIGHTS = {"keyword": 0.5, "lexicon": 0.3, "role": 0.2}
+SCORED_TABLE = "scored"  # 04_Notation store
+
+LEXICON = [
+    "tender", "contract", "awarded", "procurement", "feasibility", "survey", "site investigation",
+    "geotechnical", "geophysical", "monitoring", "pre-construction", "construction", "consent",
+    "planning", "installation", "foundation", "cable", "seabed", "offshore wind", "wind farm",
+]
+LEXICON_FULL = 4  # terms found for a full lexicon signal
+SENIOR_ROLES = ["ceo", "founder", "owner", "director", "head of", "vp", "vice president", "chief",
+                "procurement", "buyer", "partner"]
+OTHER_ROLES = ["manager", "lead", "principal", "coordinator"]
+
+
+def _words(text):
+    # Punctuation dropped like 02_Cleaner does ("pre-construction" -> "preconstruction"),
+    # on the terms and on the text, so raw and cleaned posts match alike
+    return re.sub(r"[^\w\s]", "", str(text or "").lower())
+
+
+_LEXICON_RE = re.compile("|".join(re.escape(_words(t)) for t in LEXICON))
+
+
+def enabled():
+    return os.environ.get("PRIORITY") == "1"
+
+
+# === SIGNALS ===
+def keyword_yields(conn=None):
+    """Keyword -> mean score_global of its scored leads, divided by the best keyword's."""
+    own = conn is None
+    conn = conn or open_store()
+    try:
+        ensure_table(conn, SCORED_TABLE)
+        scored = read_frame(conn, SCORED_TABLE, columns=["keyword", "score_global"])
+    finally:
+        if own:
+            conn.close()
+    scored = scored.assign(score_global=pd.to_numeric(scored["score_global"], errors="coerce")).dropna()
+    if scored.empty:
+        return {}
+    means = scored.groupby(scored["keyword"].astype(str))["score_global"].mean()
+    best = means.max()
+    return (means / best).to_dict() if best > 0 else {}
+
+
+def lexicon_signal(text):
+    found = set(_LEXICON_RE.findall(_words(text)))
+    return min(len(found) / LEXICON_FULL, 1.0)
+
+
+def role_signal(role):
+    role = str(role or "").lower()
+    if any(term in role for term in SENIOR_ROLES):
+        return 1.0
+    if any(term in role for term in OTHER_ROLES):
+        return 0.5
+    return 0.0
+
+
+def priority(row, yields):
+    """Priority of one row (dict or Series) in [0, 1]."""
+    default = sum(yields.values()) / len(yields) if yields else 0.0
+    return (WEIGHTS["keyword"] * yields.get(str(row.get("keyword")), default)
+            + WEIGHTS["lexicon"] * lexicon_signal(row.get("post_text"))
+            + WEIGHTS["role"] * role_signal(row.get("author_role")))
+
+
+# === ORDERING (no-op outside priority mode) ===
+def order_frame(df, conn=None):
+    """``df`` best first (stable: equal priorities keep the file order)."""
+    if not enabled() or df.empty:
+        return df
+    yields = keyword_yields(conn)
+    ranks = pd.Series([priority(r, yields) for r in df.to_dict(orient="records")], index=df.index)
+    return df.loc[ranks.sort_values(ascending=False, kind="stable").index]
+
+
+def order_pairs(pairs, conn=None):
+    """(key, row) pairs best first."""
+    if not enabled() or not pairs:
+        return pairs
+    yields = keyword_yields(conn)
+    return sorted(pairs, key=lambda pair: priority(pair[1], yields), reverse=True)
+
+
+# === PARTIAL EXPORTS ===
+class IntervalExport:
+    """Calls ``export`` at most once every EXPORT_INTERVAL seconds, in priority mode only."""
+
+    def __init__(self, export, interval=EXPORT_INTERVAL):
+        self.export = export
+        self.interval = interval
+        self.last = time.time()
+
+    def tick(self):
+        if not enabled() or time.time() - self.last < self.interval:
+            return
+        try:
+            self.export()
+        except Exception as e:  # a failed partial export must not stop the stage
+            print(f"[WARNING] Partial export failed: {e}")
+        self.last = time.time()
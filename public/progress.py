@@ -0,0 +1,128 @@
+"""Structured progress of a run: stage, rows done / total, throughput and ETA.
+
+Stages report through a ``ProgressTracker``. The latest event of each stage
+is kept in the lead store ("progress" table, one row per run and stage, so
+jobs running side by side keep their own progress). That works
+the same way for in-process stages, --isolated subprocesses and the parallel
+--pipeline stages. server.py serves the snapshot at /api/progress and streams
+it over Server-Sent Events at /api/progress/stream.
+
+Event:
+
+    {"run": "3f2a...", "stage": "score", "state": "running", "done": 42, "total": 120,
+     "unit": "rows", "rate": 0.21, "eta": 371, "elapsed": 200.4, "at": 1729000000.0}
+"""
+import os
+import time
+
+from lead_store import open_store, ensure_table, upsert_row, read_rows
+from telemetry import current_run
+
+# === SETTINGS ===
+PROGRESS_TABLE = "progress"
+EMIT_EVERY = float(os.environ.get("PROGRESS_EVERY", "1"))  # seconds between two writes of the same stage
+
+# Script -> stage name shown to the UI
+SCRIPT_STAGES = {
+    "01_Scraper.py": "scrape",
+    "02_Cleaner.py": "clean",
+    "03_Enricher.py": "enrich",
+    "04_Notation.py": "score",
+    "05_excel_to_json.py": "export",
+}
+
+
+def _write(conn, event):
+    ensure_table(conn, PROGRESS_TABLE)
+    upsert_row(conn, PROGRESS_TABLE, f"{event['run']}/{event['stage']}", event)
+
+
+# === STAGE SIDE ===
+class ProgressTracker:
+    """Counts finished items of one stage and writes its progress event (throttled)."""
+
+    def __init__(self, stage, total=None, unit="rows", conn=None):
+        self.stage = stage
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.started = time.time()
+        self._conn = conn or open_store()
+        self._last_emit = 0.0
+        self.emit("running", force=True)
+
+    def advance(self, n=1, remaining=None):
+        """``n`` more items done; ``remaining`` re-estimates the total when it is not known upfront."""
+        self.done += n
+        if remaining is not None:
+            self.total = self.done + remaining
+        self.emit("running")
+
+    def finish(self, state="done"):
+        if state == "done":
+            self.total = self.done
+        self.emit(state, force=True)
+
+    def event(self, state):
+        elapsed = time.time() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        left = None if self.total is None else max(self.total - self.done, 0)
+        eta = None if left is None or not rate else round(left / rate)
+        return {
+            "run": current_run(),
+            "stage": self.stage,
+            "state": state,
+            "done": self.done,
+            "total": self.total,
+            "unit": self.unit,
+            "rate": round(rate, 3),
+            "eta": eta,
+            "elapsed": round(elapsed, 1),
+            "at": round(time.time(), 3),
+        }
+
+    def emit(self, state, force=False):
+        now = time.time()
+        if not force and now - self._last_emit < EMIT_EVERY:
+            return
+        self._last_emit = now
+        try:
+            _write(self._conn, self.event(state))
+        except Exception as e:  # progress must never stop a stage
+            print(f"[WARNING] Progress not recorded for {self.stage}: {e}")
+
+
+# === RUNNER SIDE (06_Executable) ===
+def start_run(conn, stages):
+    """Mark every stage of the new run as pending, so clients see the whole plan at once."""
+    now = round(time.time(), 3)
+    for stage in stages:
+        _write(conn, {"run": current_run(), "stage": stage, "state": "pending", "done": 0, "total": None,
+                      "unit": "rows", "rate": 0.0, "eta": None, "elapsed": 0.0, "at": now})
+
+
+def mark_stage(conn, stage, state):
+    """Final state of a stage as seen by the runner (a crashed stage cannot report it itself)."""
+    ensure_table(conn, PROGRESS_TABLE)
+    event = next((e for e in read_rows(conn, PROGRESS_TABLE) if e["stage"] == stage and e["run"] == current_run()), None)
+    event = dict(event or {"run": current_run(), "stage": stage, "done": 0, "total": None, "unit": "rows",
+                           "rate": 0.0, "eta": None, "elapsed": 0.0})
+    event.update({"state": state, "eta": 0 if state == "done" else None, "at": round(time.time(), 3)})
+    _write(conn, event)
+
+
+# === READER SIDE (server.py) ===
+def snapshot(conn, run=None):
+    """Latest event of every stage of ``run`` (default: the most recently updated run)."""
+    ensure_table(conn, PROGRESS_TABLE)
+    events = read_rows(conn, PROGRESS_TABLE)
+    if not events:
+        return {"run": None, "updated": None, "stages": []}
+    run = run or max(events, key=lambda e: e["at"])["run"]
+    stages = sorted((e for e in events if e["run"] == run), key=lambda e: _stage_order(e["stage"]))
+    return {"run": run, "updated": max(e["at"] for e in stages), "stages": stages}
+
+
+def _stage_order(stage):
+    order = list(SCRIPT_STAGES.values())
+    return order.index(stage) if stage in order else len(order)
@@ -0,0 +1,146 @@
+import re
+import math
+from collections import Counter, defaultdict
+
+# === SETTINGS ===
+# Same project when: a shared project entity + some overlap, or same company + more overlap,
+# or near-duplicate text on its own
+ENTITY_MIN_SIMILARITY = 0.3
+COMPANY_MIN_SIMILARITY = 0.5
+TEXT_MIN_SIMILARITY = 0.7
+TOP_TERMS = 12          # terms per post used to find candidate pairs
+MAX_POSTING = 60        # ignore terms shared by too many posts when generating pairs
+MAX_ENTITY_SHARE = 0.05  # an "entity" found in more posts than this is a topic, not a project
+
+# Nouns that follow a project name in a post ("hornsea 3 offshore wind farm", "viking link interconnector")
+PROJECT_NOUNS = {
+    "wind", "windfarm", "farm", "interconnector", "interconnection", "cable", "pipeline",
+    "link", "array", "field", "hub", "project",
+}
+# Words that never name a project on their own (cable types, dates, generic qualifiers)
+GENERIC_WORDS = {
+    "submarine", "subsea", "undersea", "export", "inter", "array", "hvdc", "hvac", "fibre", "fiber", "optic",
+    "optical", "power", "telecom", "telecommunications", "communication", "communications", "data", "floating",
+    "fixed", "bottom", "first", "second", "third", "largest", "global", "major", "key", "large", "next",
+    "jan", "january", "feb", "february", "mar", "march", "apr", "april", "may", "jun", "june", "jul", "july",
+    "aug", "august", "sep", "sept", "september", "oct", "october", "nov", "november", "dec", "december",
+    "hashtag", "phase", "round", "mw", "gw", "kv", "km",
+}
+STOPWORDS = set("""
+a an and are as at be been but by for from has have in into is it its of on or our the their this to was were
+we will with our your you they he she his her them that these those than then there here about after over under
+new more most very just also all any each other such can could would should may might not no so if what which
+who whom how when where why offshore onshore marine energy renewable renewables power project projects proud
+excited today team great work working support thanks thank happy congratulations learn read join us my me i
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text):
+    return [t for t in _TOKEN_RE.findall(str(text or "").lower()) if len(t) > 1 or t.isdigit()]
+
+
+def project_entities(text):
+    """Project-like names: 1-3 words before a project noun, and n-grams carrying a number."""
+    tokens = _tokens(text)
+    entities = set()
+    for i, tok in enumerate(tokens):
+        if tok in PROJECT_NOUNS and i:
+            name = []
+            for prev in reversed(tokens[max(0, i - 3):i]):
+                if prev in STOPWORDS or prev in PROJECT_NOUNS or prev in GENERIC_WORDS:
+                    break
+                name.insert(0, prev)
+            if any(not t.isdigit() for t in name):
+                entities.add(" ".join(name))
+        # "hornsea 3", "nordlicht 2" (years and big numbers are dates/amounts, not project names)
+        if tok.isdigit() and len(tok) <= 2 and i and tokens[i - 1] not in STOPWORDS | GENERIC_WORDS \
+                and not tokens[i - 1].isdigit():
+            entities.add(f"{tokens[i - 1]} {tok}")
+    return entities
+
+
+def normalize_company(name):
+    name = str(name or "").strip().lower()
+    if name in ("", "nan", "none", "missing", "not found", "company name not identified"):
+        return ""
+    name = re.sub(r"\b(ltd|limited|inc|plc|gmbh|sa|as|asa|bv|llc|group|the)\b", " ", name)
+    return re.sub(r"[^a-z0-9]+", " ", name).strip()
+
+
+def _tfidf(docs):
+    n = len(docs)
+    df = Counter(t for d in docs for t in set(d))
+    vectors = []
+    for d in docs:
+        tf = Counter(t for t in d if t not in STOPWORDS)
+        vec = {t: c * math.log(1 + n / df[t]) for t, c in tf.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vectors.append({t: v / norm for t, v in vec.items()})
+    return vectors
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+def cluster_posts(posts):
+    """Group posts describing the same project.
+
+    ``posts`` is a list of (key, post_text, company_name). Returns {key: cluster_key}
+    where cluster_key is the key of the first post of the cluster (input order).
+    """
+    keys = [k for k, _, _ in posts]
+    docs = [_tokens(text) for _, text, _ in posts]
+    vectors = _tfidf(docs)
+    entities = [project_entities(text) for _, text, _ in posts]
+    entity_df = Counter(e for ents in entities for e in ents)
+    max_df = max(2, int(MAX_ENTITY_SHARE * len(posts)))
+    entities = [{e for e in ents if entity_df[e] <= max_df} for ents in entities]
+    companies = [normalize_company(c) for _, _, c in posts]
+
+    parent = list(range(len(posts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)  # the earliest post stays the representative
+
+    # Candidate pairs: shared entity, shared company, or a shared distinctive term
+    postings = defaultdict(list)
+    for i, vec in enumerate(vectors):
+        for e in entities[i]:
+            postings[("entity", e)].append(i)
+        if companies[i]:
+            postings[("company", companies[i])].append(i)
+        for t, _ in sorted(vec.items(), key=lambda kv: kv[1], reverse=True)[:TOP_TERMS]:
+            postings[("term", t)].append(i)
+
+    seen = set()
+    for (_, _), members in postings.items():
+        if len(members) < 2 or len(members) > MAX_POSTING:
+            continue
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                i, j = members[x], members[y]
+                if (i, j) in seen:
+                    continue
+                seen.add((i, j))
+                sim = _cosine(vectors[i], vectors[j])
+                if (
+                    sim >= TEXT_MIN_SIMILARITY
+                    or (entities[i] & entities[j] and sim >= ENTITY_MIN_SIMILARITY)
+                    or (companies[i] and companies[i] == companies[j] and sim >= COMPANY_MIN_SIMILARITY)
+                ):
+                    union(i, j)
+
+    return {keys[i]: keys[find(i)] for i in range(len(posts))}
@@ -1,17 +1,21 @@
 from __future__ import annotations
+import asyncio
+import importlib.util
 import json
 import os
 import sys
+import time
 import threading
-import subprocess
 from pathlib import Path
-from subprocess import Popen, TimeoutExpired
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Query, Body, Depends, Header
+from fastapi import FastAPI, HTTPException, Query, Body, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from job_queue import JobQueue, SLOTS  # file de jobs persistante (table "jobs" du store)
+
 # -----------------------------
 # Sécurité (CORS + clé d'accès)
 # -----------------------------
@@ -48,6 +52,18 @@ class KeywordPayload(BaseModel):
     keyword: str
 
 
+class ScorePayload(BaseModel):
+    post_text: str
+    author_name: str
+    author_role: str = ""
+    company_name: str = ""
+    city: str = ""
+    country: str = ""
+    website: str = ""
+    one_sentence_description: str = ""
+    post_url: str = ""
+
+
 app = FastAPI(title="Cosma API", version="1.1.0")
 
 # -----------------------------
@@ -60,7 +76,7 @@ app.add_middleware(
     allow_origins=[ALLOWED_ORIGIN, "http://localhost:3000", "http://127.0.0.1:3000"],
     allow_origin_regex=r"^https://([a-z0-9-]+\.)?cosma-radar\.pages\.dev$",
     allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
     allow_headers=["*", "X-Access-Key", "Content-Type"],
     expose_headers=["*"],
     max_age=600,
@@ -73,8 +89,8 @@ def verify_key(x_access_key: str | None = Header(default=None)):
         raise HTTPException(status_code=403, detail="forbidden")
 
 
-RUN_PROC: Optional[Popen] = None
-PROC_LOCK = threading.Lock()
+JOBS = JobQueue(BASE_DIR)  # jobs en parallèle selon leurs ressources (JOB_SLOTS_BROWSER / JOB_SLOTS_LLM)
+PIPELINED = os.environ.get("PIPELINED") == "1"  # /api/run lance 06 en mode --pipeline par défaut
 
 
 def find_executable() -> Path:
@@ -95,51 +111,117 @@ def find_executable() -> Path:
     raise HTTPException(status_code=404, detail="06_Executable introuvable dans 'public/'")
 
 
-def start_job() -> dict:
-    """Lance 06_Executable en tâche de fond."""
-    global RUN_PROC
-    with PROC_LOCK:
-        if RUN_PROC and RUN_PROC.poll() is None:
-            raise HTTPException(status_code=409, detail="Un job est déjà en cours")
-        exe = find_executable()
-        creation_flags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
-        if exe.suffix.lower() == ".py":
-            cmd = [sys.executable, str(exe)]
-        else:
-            cmd = [str(exe)]
-        RUN_PROC = Popen(cmd, cwd=str(BASE_DIR), creationflags=creation_flags)
-        return {"pid": RUN_PROC.pid}
+def parse_stages(stages: Optional[str]) -> list[str]:
+    """Étapes demandées, dans l'ordre du pipeline (toutes par défaut)."""
+    from progress import SCRIPT_STAGES
+    order = list(SCRIPT_STAGES.values())
+    wanted = [s.strip() for s in stages.split(",") if s.strip()] if stages else order
+    unknown = [s for s in wanted if s not in order]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Étape(s) inconnue(s) : {', '.join(unknown)}")
+    return [s for s in order if s in wanted]
+
+
+def run_args(stages: Optional[list[str]] = None, keywords: Optional[list[str]] = None,
+             limit: Optional[int] = None, max_posts: Optional[int] = None, priority: bool = False) -> list[str]:
+    """Options de 06_Executable pour un run partiel (étapes, mots-clés, nombre de lignes, priorité)."""
+    args: list[str] = []
+    if stages:
+        args += ["--stages", ",".join(stages)]
+    if keywords:
+        args += ["--keywords", *keywords]
+    if limit:
+        args += ["--limit", str(limit)]
+    if max_posts:
+        args += ["--max-posts", str(max_posts)]
+    if priority:
+        args.append("--priority")
+    return args
+
+
+def start_job(pipeline: bool = False, args: Optional[list[str]] = None,
+              stages: Optional[list[str]] = None, params: Optional[dict] = None) -> dict:
+    """Met 06_Executable en file (étapes en parallèle si ``pipeline``) ; il démarre dès que ses ressources sont libres."""
+    exe = find_executable()
+    if exe.suffix.lower() == ".py":
+        cmd = [sys.executable, str(exe)]
+    else:
+        cmd = [str(exe)]
+    if pipeline:
+        cmd.append("--pipeline")
+    cmd += args or []
+    return JOBS.submit(cmd, stages or parse_stages(None), params)
 
 
 def stop_job() -> dict:
-    """Arrête le process si en cours."""
-    global RUN_PROC
-    with PROC_LOCK:
-        if not RUN_PROC or RUN_PROC.poll() is not None:
-            return {"stopped": False, "reason": "aucun job en cours"}
-        pid = RUN_PROC.pid
-        try:
-            if os.name == "nt":
-                subprocess.run(
-                    ["taskkill", "/PID", str(pid), "/T", "/F"],
-                    check=False,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-            else:
-                RUN_PROC.terminate()
-                try:
-                    RUN_PROC.wait(timeout=5)
-                except TimeoutExpired:
-                    RUN_PROC.kill()
-            return {"stopped": True, "pid": pid}
-        finally:
-            RUN_PROC = None
+    """Arrête les jobs en cours (les jobs en file restent en file)."""
+    running = JOBS.running()
+    if not running:
+        return {"stopped": False, "reason": "aucun job en cours"}
+    for job in running:
+        JOBS.cancel(job["id"])
+    # "pid": le premier, pour les anciens clients
+    return {"stopped": True, "pid": running[0]["pid"], "pids": [j["pid"] for j in running],
+            "jobs": [j["id"] for j in running]}
+
+
+JOBS.start()
+
+
+# -----------------------------
+# Scoring à la demande (chaînes 04_Notation gardées en mémoire)
+# -----------------------------
+SCORER = None
+SCORER_LOCK = threading.Lock()
+
+
+def get_scorer():
+    """Importe 04_Notation une seule fois et prépare ses chaînes LLM."""
+    global SCORER
+    with SCORER_LOCK:
+        if SCORER is None:
+            spec = importlib.util.spec_from_file_location("notation", BASE_DIR / "04_Notation.py")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.warm_up()
+            SCORER = module
+    return SCORER
+
+
+# Préchauffage optionnel au démarrage (la première requête /api/score est alors rapide)
+if os.environ.get("SCORE_WARMUP") == "1":
+    threading.Thread(target=get_scorer, daemon=True).start()
 
 
 def job_status() -> dict:
-    running = RUN_PROC is not None and RUN_PROC.poll() is None
-    return {"running": running, "pid": RUN_PROC.pid if running else None}
+    running = JOBS.running()
+    return {"running": bool(running), "pid": running[0]["pid"] if running else None,
+            "pids": [j["pid"] for j in running], "jobs": JOBS.counts()}
+
+
+# -----------------------------
+# Progression du run (écrite par les étapes dans le store, cf. progress.py)
+# -----------------------------
+PROGRESS_POLL = float(os.environ.get("PROGRESS_POLL", "1"))  # relecture du store, en secondes
+SSE_KEEPALIVE = 15
+_PROGRESS = {"at": 0.0, "state": None}
+_PROGRESS_LOCK = threading.Lock()
+
+
+def progress_state() -> dict:
+    """Dernier état connu du run, relu au plus une fois par PROGRESS_POLL pour tous les clients."""
+    with _PROGRESS_LOCK:
+        if _PROGRESS["state"] is None or time.time() - _PROGRESS["at"] >= PROGRESS_POLL:
+            from lead_store import open_store
+            from progress import snapshot
+            conn = open_store()
+            try:
+                state = snapshot(conn)
+            finally:
+                conn.close()
+            state["job"] = job_status()
+            _PROGRESS.update(at=time.time(), state=state)
+        return _PROGRESS["state"]
 
 
 # -----------------
@@ -157,7 +239,35 @@ def ping():
 
 @app.get("/api/status")
 def api_status():
-    return job_status()
+    return {**job_status(), "progress": progress_state()["stages"]}
+
+
+@app.get("/api/progress")
+def api_progress():
+    """Étapes du dernier run : état, lignes faites / total, débit (lignes/s) et ETA (s)."""
+    return progress_state()
+
+
+@app.get("/api/progress/stream")
+async def api_progress_stream(request: Request):
+    """Server-Sent Events : l'état complet à la connexion (reconnexion sans rattrapage), puis à chaque changement."""
+    async def events():
+        yield "retry: 3000\n\n"
+        last, idle = None, 0.0
+        while not await request.is_disconnected():
+            state = await asyncio.to_thread(progress_state)
+            version = (state["run"], state["updated"], state["job"]["running"])
+            if version != last:
+                last, idle = version, 0.0
+                yield f"event: progress\nid: {state['updated'] or 0}\ndata: {json.dumps(state)}\n\n"
+            elif idle >= SSE_KEEPALIVE:
+                idle = 0.0
+                yield ": keepalive\n\n"
+            await asyncio.sleep(PROGRESS_POLL)
+            idle += PROGRESS_POLL
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.get("/api/data")
@@ -174,8 +284,17 @@ def get_data():
 
 
 @app.post("/api/run", dependencies=[Depends(verify_key)])
-def api_run():
-    return start_job()
+def api_run(
+    pipeline: bool = Query(default=PIPELINED),
+    stages: Optional[str] = Query(None, description="ex. score,export (défaut : toutes les étapes)"),
+    keywords: Optional[list[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    max_posts: Optional[int] = Query(None, ge=1),
+    priority: bool = Query(False, description="meilleurs posts d'abord, exports partiels (EXPORT_INTERVAL)"),
+):
+    wanted = parse_stages(stages)
+    params = {"pipeline": pipeline, "keywords": keywords, "limit": limit, "max_posts": max_posts, "priority": priority}
+    return start_job(pipeline, run_args(stages and wanted, keywords, limit, max_posts, priority), wanted, params)
 
 
 @app.post("/api/stop", dependencies=[Depends(verify_key)])
@@ -183,6 +302,95 @@ def api_stop():
     return stop_job()
 
 
+@app.get("/api/jobs")
+def api_jobs(limit: int = Query(50, ge=1, le=500)):
+    """Jobs du plus récent au plus ancien : statut, étapes, ressources, code de retour."""
+    return {"jobs": JOBS.list(limit), "slots": SLOTS}
+
+
+@app.get("/api/jobs/{job_id}")
+def api_job(job_id: str):
+    """Un job et la progression de ses étapes (son id est aussi l'id de run de la progression)."""
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job introuvable")
+    from lead_store import open_store
+    from progress import snapshot
+    conn = open_store()
+    try:
+        job["progress"] = snapshot(conn, run=job_id)["stages"]
+    finally:
+        conn.close()
+    return job
+
+
+@app.delete("/api/jobs/{job_id}", dependencies=[Depends(verify_key)])
+def api_cancel_job(job_id: str):
+    """Annule un job en file, ou arrête un job en cours."""
+    job = JOBS.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job introuvable")
+    return job
+
+
+@app.post("/api/score", dependencies=[Depends(verify_key)])
+def api_score(payload: ScorePayload):
+    """Note un post ad hoc sans lancer le pipeline (chaînes déjà chaudes)."""
+    if not payload.post_text.strip() or not payload.author_name.strip():
+        raise HTTPException(status_code=400, detail="post_text et author_name sont requis")
+    try:
+        scored = get_scorer().score_row(payload.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Erreur de scoring : {e}")
+    return {k: v for k, v in scored.items() if k != "scoring_fingerprint"}
+
+
+@app.get("/api/llm", dependencies=[Depends(verify_key)])
+def api_llm(run: Optional[str] = Query(default=None)):
+    """File d'attente et latences des backends Ollama : processus des étapes du dernier run (ou de ``run``) et serveur."""
+    from lead_store import open_store
+    from llm_dispatcher import get_dispatcher, published_metrics
+    conn = open_store()
+    try:
+        processes = published_metrics(conn, run)
+    finally:
+        conn.close()
+    return {"run": processes[0]["run"] if processes else run, "processes": processes,
+            "server": get_dispatcher().metrics()}
+
+
+@app.get("/api/metrics", dependencies=[Depends(verify_key)])
+def api_metrics(run: Optional[str] = Query(default=None)):
+    """Télémétrie agrégée (étapes, lignes, appels LLM/HTTP, cache) de la dernière exécution ou de ``run``."""
+    from telemetry import summary
+    return summary(run)
+
+
+@app.get("/api/estimate", dependencies=[Depends(verify_key)])
+def api_estimate(
+    pipeline: bool = Query(default=PIPELINED),
+    stages: Optional[str] = Query(None),
+    keywords: Optional[list[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    max_posts: Optional[int] = Query(None, ge=1),
+):
+    """Prévision d'un run (mêmes paramètres que /api/run) : posts, appels LLM, tokens et durée."""
+    from estimator import predict
+    return predict(keywords, parse_stages(stages), max_posts, limit, pipeline)
+
+
+@app.get("/api/estimates", dependencies=[Depends(verify_key)])
+def api_estimates(limit: int = Query(20, ge=1, le=200)):
+    """Prévisions des derniers runs face au réel (ratio réel / estimé)."""
+    from estimator import history
+    from lead_store import open_store
+    conn = open_store()
+    try:
+        return {"estimates": history(conn, limit)}
+    finally:
+        conn.close()
+
+
 @app.get("/api/keywords")
 def get_keywords():
     return {"keywords": _read_keywords()}
@@ -0,0 +1,234 @@
+"""Lightweight performance telemetry shared by the stages (01-05).
+
+Each measurement is one JSON line appended to METRICS_FILE, tagged with the
+run and the stage that produced it:
+
+    {"at": 1729000000.0, "run": "3f2a...", "stage": "04_Notation", "kind": "llm",
+     "name": "mistral", "seconds": 2.41, "prompt_tokens": 812, "eval_tokens": 96, "eval_seconds": 1.9}
+
+Kinds written today: stage (06_Executable, ``pipelined`` when the stage
+overlapped others), row (01/03/04), selenium and backpressure (01), http
+(shared requests session), chain (one per CachedChain.invoke, ``cached``
+tells hits from misses) and llm (one per Ollama call, with the token counts
+and durations Ollama returns in generation_info).
+
+Events are buffered and appended by batches: at the latest after
+FLUSH_EVERY events or FLUSH_SECONDS, right away for stage and row events,
+and on exit, including a SIGTERM (cancelled job, /api/stop).
+
+``summary()`` aggregates one run (the latest by default) per kind and name;
+server.py serves it at /api/metrics.
+
+    python telemetry.py [--run RUN_ID]
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import signal
+import argparse
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# === SETTINGS ===
+BASE_DIR = Path(__file__).resolve().parent
+METRICS_FILE = Path(os.environ.get("METRICS_FILE", "metrics.jsonl"))
+if not METRICS_FILE.is_absolute():
+    METRICS_FILE = BASE_DIR / METRICS_FILE
+TELEMETRY = os.environ.get("TELEMETRY", "1") != "0"
+FLUSH_EVERY = 100  # events buffered before an append to METRICS_FILE
+FLUSH_SECONDS = float(os.environ.get("TELEMETRY_FLUSH_SECONDS", "5"))  # max age of a buffered event
+FLUSH_KINDS = ("stage", "row")  # boundaries: written right away
+
+_PROCESS_RUN = f"pid{os.getpid()}-{int(time.time())}"
+_buffer = []
+_lock = threading.Lock()
+_stage = None
+
+
+# === CONTEXT ===
+def current_run():
+    """Run id shared by every stage of one 06_Executable run (TELEMETRY_RUN, set by 06)."""
+    return os.environ.get("TELEMETRY_RUN") or os.environ.get("PIPELINE_RUN") or _PROCESS_RUN
+
+
+def set_stage(stage):
+    """Tag the following events with ``stage`` (in-process runner)."""
+    global _stage
+    _stage = stage
+
+
+def current_stage():
+    return _stage or os.environ.get("TELEMETRY_STAGE") or Path(sys.argv[0]).stem
+
+
+# === RECORDING ===
+def record(kind, name, seconds=None, **fields):
+    if not TELEMETRY:
+        return
+    event = {"at": round(time.time(), 3), "run": current_run(), "stage": current_stage(), "kind": kind, "name": name}
+    if seconds is not None:
+        event["seconds"] = round(seconds, 4)
+    event.update(fields)
+    with _lock:
+        _buffer.append(event)
+        if len(_buffer) >= FLUSH_EVERY or kind in FLUSH_KINDS or event["at"] - _buffer[0]["at"] >= FLUSH_SECONDS:
+            _flush_locked()
+
+
+@contextmanager
+def timed(kind, name, **fields):
+    """Record the duration of the ``with`` block; the yielded dict can take extra fields."""
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record(kind, name, time.perf_counter() - start, **fields)
+
+
+def _flush_locked():
+    if not _buffer:
+        return
+    try:
+        with open(METRICS_FILE, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in _buffer)
+    except OSError as e:
+        print(f"[WARNING] Telemetry not written to {METRICS_FILE}: {e}")
+    _buffer.clear()
+
+
+def flush():
+    with _lock:
+        _flush_locked()
+
+
+def _flush_on_sigterm(signum, frame):
+    # The interrupted code may hold the lock: give up on the buffer rather than hang
+    if _lock.acquire(timeout=1):
+        try:
+            _flush_locked()
+        finally:
+            _lock.release()
+    # Then die of the SIGTERM as before (same return code for the job queue)
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+atexit.register(flush)
+# atexit does not run on SIGTERM; only when nobody else handles it (main thread, default handler)
+if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+    signal.signal(signal.SIGTERM, _flush_on_sigterm)
+
+
+# === HOOKS ===
+def ollama_fields(generation_info):
+    """Token counts and durations (seconds) from an Ollama generation_info dict."""
+    info = generation_info or {}
+    fields = {"prompt_tokens": info.get("prompt_eval_count"), "eval_tokens": info.get("eval_count")}
+    for key, name in (("eval_duration", "eval_seconds"), ("prompt_eval_duration", "prompt_eval_seconds"),
+                      ("load_duration", "load_seconds")):
+        if info.get(key) is not None:
+            fields[name] = round(info[key] / 1e9, 4)
+    return {k: v for k, v in fields.items() if v is not None}
+
+
+def http_hook(response, *args, **kwargs):
+    """requests response hook: latency to the response headers, per host."""
+    record("http", urlparse(response.url).netloc, response.elapsed.total_seconds(), status=response.status_code)
+
+
+# === SUMMARY ===
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def load_events(run=None, path=METRICS_FILE):
+    """Events of ``run`` (default: the run of the last event in the file)."""
+    flush()
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    if run is None and events:
+        run = events[-1]["run"]
+    return [e for e in events if e["run"] == run]
+
+
+def events_by_run(path=METRICS_FILE):
+    """Every event of METRICS_FILE grouped by run, oldest run first (estimator.py)."""
+    flush()
+    if not path.exists():
+        return {}
+    runs = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                runs.setdefault(event["run"], []).append(event)
+    return runs
+
+
+def summary(run=None, path=METRICS_FILE):
+    events = load_events(run, path)
+    if not events:
+        return {"run": run, "events": 0, "metrics": []}
+    groups = {}
+    for e in events:
+        groups.setdefault((e["kind"], e["name"]), []).append(e)
+    metrics = []
+    for (kind, name), group in sorted(groups.items()):
+        seconds = [e["seconds"] for e in group if "seconds" in e]
+        item = {
+            "kind": kind,
+            "name": name,
+            "count": len(group),
+            "total_seconds": round(sum(seconds), 3),
+            "p50": round(_percentile(seconds, 0.5), 3),
+            "p95": round(_percentile(seconds, 0.95), 3),
+        }
+        for field in ("prompt_tokens", "eval_tokens", "eval_seconds", "startup"):
+            values = [e[field] for e in group if e.get(field) is not None]
+            if values:
+                item[field] = round(sum(values), 3)
+        if item.get("eval_seconds"):
+            item["tokens_per_second"] = round(item.get("eval_tokens", 0) / item["eval_seconds"], 1)
+        if any("cached" in e for e in group):
+            item["hit_rate"] = round(sum(1 for e in group if e.get("cached")) / len(group), 3)
+        if any("ok" in e for e in group):
+            item["failures"] = sum(1 for e in group if e.get("ok") is False)
+        metrics.append(item)
+    return {
+        "run": events[0]["run"],
+        "events": len(events),
+        "started": min(e["at"] for e in events),
+        "ended": max(e["at"] for e in events),
+        "metrics": metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregated telemetry of one run")
+    parser.add_argument("--run", help="run id (default: latest run in METRICS_FILE)")
+    args = parser.parse_args()
+    s = summary(args.run)
+    if not s["metrics"]:
+        print(f"No telemetry in {METRICS_FILE}")
+        return 1
+    print(f"Run {s['run']}: {s['events']} events over {s['ended'] - s['started']:.0f}s")
+    print(f"{'kind':<14}{'name':<34}{'count':>7}{'total':>10}{'p50':>8}{'p95':>8}  extra")
+    for m in s["metrics"]:
+        extra = ", ".join(f"{k}={m[k]}" for k in ("hit_rate", "failures", "prompt_tokens", "eval_tokens",
+                                                   "tokens_per_second", "startup") if k in m)
+        print(f"{m['kind']:<14}{m['name'][:33]:<34}{m['count']:>7}{m['total_seconds']:>9.1f}s"
+              f"{m['p50']:>7.2f}s{m['p95']:>7.2f}s  {extra}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
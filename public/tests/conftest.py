@@ -0,0 +1,49 @@
+"""Shared setup: the scripts of public/ importable, every store and metrics file in a temp folder."""
+import os
+import sys
+import sqlite3
+import tempfile
+import importlib
+from pathlib import Path
+
+import pytest
+
+PUBLIC_DIR = Path(__file__).resolve().parents[1]
+TMP_DIR = Path(tempfile.mkdtemp(prefix="lead_tests_"))
+
+# Read once at import by the modules: set before any of them is imported
+os.environ.update({
+    "STORE_FILE": str(TMP_DIR / "lead_store.sqlite"),
+    "LLM_CACHE_FILE": str(TMP_DIR / "llm_cache.sqlite"),
+    "METRICS_FILE": str(TMP_DIR / "metrics.jsonl"),
+    "LLM_SLOTS_DIR": str(TMP_DIR / "llm_slots"),
+    "TELEMETRY": "0",
+    "EXPORT_EXCEL": "0",
+})
+for name in ("RUN_KEYWORDS", "ROW_LIMIT", "PRIORITY", "PIPELINE_RUN", "TELEMETRY_RUN"):
+    os.environ.pop(name, None)
+sys.path.insert(0, str(PUBLIC_DIR))
+
+
+def script(name):
+    """A numbered stage script (``04_Notation``...) imported as a module."""
+    return importlib.import_module(name)
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    """Every test starts from an empty lead store."""
+    conn = sqlite3.connect(os.environ["STORE_FILE"])
+    tables = [t for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for table in tables:
+        conn.execute(f'DROP TABLE "{table}"')
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def conn():
+    from lead_store import open_store
+    conn = open_store()
+    yield conn
+    conn.close()
@@ -0,0 +1,33 @@
+from context_compactor import compact_snippets, count_tokens
+
+FILLER = "Our team loves sunny days and good coffee at lunch time. " * 20
+PAGE = (
+    "[URL: https://acme-marine.com/about]\n"
+    f"{FILLER}\n"
+    "Acme Marine is headquartered in Aberdeen, Scotland. "
+    "Contact the office by email at info@acme-marine.com.\n"
+    f"{FILLER}"
+)
+
+
+def test_short_snippets_are_left_alone():
+    text = "[URL: https://acme.com]\nAcme provides offshore survey services."
+    assert compact_snippets(text, "Acme", budget=300) == text
+
+
+def test_relevant_sentences_are_kept_in_page_order():
+    compact = compact_snippets(PAGE, "Acme Marine", budget=60)
+    assert compact.splitlines()[0] == "[URL: https://acme-marine.com/about]"  # header always kept
+    assert "headquartered in Aberdeen" in compact and "info@acme-marine.com" in compact
+    assert compact.index("headquartered") < compact.index("info@")
+    assert "coffee" not in compact
+
+
+def test_compaction_stays_within_the_budget():
+    pages = "\n\n".join(PAGE.replace("about", f"page-{i}") for i in range(5))
+    compact = compact_snippets(pages, "Acme Marine", budget=80)
+    assert count_tokens(compact) <= 80 < count_tokens(pages)
+
+
+def test_snippets_without_any_match_are_returned_unchanged():
+    assert compact_snippets(FILLER, "Acme Marine", budget=20) == FILLER
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from lead_store import ensure_table, upsert_row, read_rows
+from conftest import script
+
+enricher = script("03_Enricher")
+
+CLEANED = pd.DataFrame({
+    "post_id": ["a", "b", "c"],
+    "post_url": ["https://x/a", "https://x/b", "https://x/c"],
+})
+
+
+def stored(conn):
+    return {r["post_id"]: r for r in read_rows(conn, enricher.STORE_TABLE)}
+
+
+def test_positional_rows_are_rekeyed_by_url_then_by_index(conn):
+    ensure_table(conn, enricher.STORE_TABLE)
+    # Rows of the previous store: keyed by position, "b" moved since (its URL wins over its index)
+    upsert_row(conn, enricher.STORE_TABLE, "0", {"index": 0, "post_url": "https://x/b", "theme": "B"})
+    upsert_row(conn, enricher.STORE_TABLE, "2", {"index": 2, "post_url": "", "theme": "C"})
+    upsert_row(conn, enricher.STORE_TABLE, "9", {"index": 9, "post_url": "https://gone", "theme": "lost"})
+
+    assert enricher.migrate_legacy_logs(conn, CLEANED) == 2
+    rows = stored(conn)
+    assert set(rows) == {"b", "c"}
+    assert rows["b"]["theme"] == "B" and "index" not in rows["b"]
+    assert rows["c"]["theme"] == "C"
+    # Second pass: nothing left to migrate
+    assert enricher.migrate_legacy_logs(conn, CLEANED) == 0
+
+
+def test_legacy_csv_is_imported_once(conn, tmp_path, monkeypatch):
+    log = tmp_path / "log_03.csv"
+    pd.DataFrame({"index": [1, 1], "post_url": ["https://x/b", "https://x/b"], "theme": ["old", "new"]}).to_csv(log, index=False)
+    monkeypatch.setattr(enricher, "LOG_FILE", str(log))
+    ensure_table(conn, enricher.STORE_TABLE)
+
+    assert enricher.migrate_legacy_logs(conn, CLEANED) == 1
+    assert stored(conn)["b"]["theme"] == "new"  # last line of an index wins
+    # The store is no longer empty: the CSV is not read again
+    assert enricher.migrate_legacy_logs(conn, CLEANED) == 0
@@ -0,0 +1,106 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import estimator
+from handoff import write_table
+from lead_store import ensure_table, upsert_row
+from conftest import script
+
+
+def run_events(keywords=("wind", "cable"), posts=4, enrich_seconds=40.0, rows=4):
+    events = [{"kind": "selenium", "name": "search_page", "stage": "01_Scraper", "keyword": k} for k in keywords]
+    events += [{"kind": "row", "name": "scrape", "stage": "01_Scraper", "keyword": k}
+               for k in keywords for _ in range(posts)]
+    events += [{"kind": "stage", "name": "01_Scraper", "seconds": 60.0 * len(keywords)},
+               {"kind": "stage", "name": "03_Enricher", "seconds": enrich_seconds}]
+    events += [{"kind": "row", "name": "enrich", "stage": "03_Enricher"} for _ in range(rows)]
+    events += [{"kind": "llm", "name": "mistral", "stage": "03_Enricher", "prompt_tokens": 900, "eval_tokens": 100}
+               for _ in range(rows * 3)]
+    return events
+
+
+def test_rates_are_learnt_from_past_runs(conn):
+    model = estimator.learn({"r1": run_events(), "r2": run_events(enrich_seconds=80.0)}, conn)
+    rates = model["rates"]
+    assert model["runs"] == 2 and model["yields"] == {"wind": 4, "cable": 4}
+    assert rates["scrape_seconds_per_keyword"] == 60.0
+    assert rates["enrich_seconds_per_row"] == 15.0  # median of 10 and 20
+    assert rates["fresh_share"] == 0.5
+    assert (rates["enrich_llm_calls_per_row"], rates["enrich_tokens_per_row"]) == (3.0, 3000.0)
+    assert rates["score_seconds_per_row"] == estimator.DEFAULTS["score_seconds_per_row"]
+    assert "score_seconds_per_row" not in model["measured"]
+
+
+def test_prediction_of_a_run(conn):
+    model = estimator.learn({"r1": run_events()}, conn)
+    e = estimator.predict(["wind", "cable", "survey"], ["scrape", "enrich"], max_posts=3, model=model)
+    # Known keywords capped at --max-posts, the unseen one at the mean yield
+    assert e["posts"] == 9 and e["rows"] == {"enrich": 4}
+    assert e["stage_seconds"] == {"scrape": 180.0, "enrich": 40.0}
+    assert e["llm_calls"] == 12
+    piped = estimator.predict(["wind", "cable", "survey"], ["scrape", "enrich"], max_posts=3, model=model, pipeline=True)
+    assert piped["seconds"] == 180.0  # the slowest overlapping stage
+
+
+def test_calibration_ignores_estimates_made_on_default_timings(conn):
+    ensure_table(conn, estimator.ESTIMATES_TABLE)
+    for run, predicted, actual, defaults in (("r1", 100, 150, []), ("r2", 300, 450, []),
+                                            ("r3", 10, 400, ["score_seconds_per_row"])):
+        upsert_row(conn, estimator.ESTIMATES_TABLE, run, {
+            "run": run, "at": len(run), "predicted": {"raw_seconds": predicted, "defaults_used": defaults},
+            "actual": {"seconds": actual}})
+    assert estimator.calibration(conn) == 1.5
+
+
+@pytest.fixture
+def tables(tmp_path, monkeypatch):
+    """Cleaned and Enriched in a temp folder, where 03/04 and the estimator look for them."""
+    notation = script("04_Notation")
+    monkeypatch.setattr(estimator, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(notation, "INPUT_FILE", tmp_path / "Enriched.parquet")
+    monkeypatch.setattr("lead_schema.TEXT_TABLE", tmp_path / "Cleaned")
+    cleaned = pd.DataFrame({"post_id": ["a", "b", "c"], "keyword": ["wind", "wind", "cable"],
+                            "post_text": ["text a", "text b", "text c"]})
+    write_table(cleaned, tmp_path / "Cleaned")
+    write_table(cleaned.drop(columns=["post_text"]).assign(company_name="Acme"), tmp_path / "Enriched")
+    return notation
+
+
+def test_pending_rows_follow_the_stores(conn, tables):
+    assert estimator.pending_rows("enrich") == 3
+    ensure_table(conn, "enriched")
+    upsert_row(conn, "enriched", "a", {"post_id": "a"})
+    assert estimator.pending_rows("enrich") == 2
+    assert estimator.pending_rows("enrich", ["cable"]) == 1
+
+
+def test_pending_scores_count_changed_fingerprints(conn, tables, monkeypatch):
+    notation = tables
+    ensure_table(conn, notation.STORE_TABLE)
+    enriched = notation.attach_text(notation.read_table(notation.INPUT_FILE))
+    for _, row in enriched.iterrows():
+        upsert_row(conn, notation.STORE_TABLE, row["post_id"],
+                   {"post_id": row["post_id"], "score_global": 50, "scoring_fingerprint": notation.scoring_fingerprint(row)})
+    assert estimator.pending_rows("score") == 0
+    monkeypatch.setattr(notation, "PROMPT_VERSION", "another-version")
+    assert estimator.pending_rows("score") == 3
+    assert estimator.pending_rows("score", ["wind"]) == 2
+
+
+def test_pending_scores_are_counted_without_writing(conn, tables):
+    notation = tables
+    ensure_table(conn, notation.STORE_TABLE)
+    legacy = notation.attach_text(notation.read_table(notation.INPUT_FILE)).iloc[0].to_dict()
+    upsert_row(conn, notation.STORE_TABLE, "a", {**legacy, "score_global": 50})  # scored before fingerprints
+    before = conn.execute(f'SELECT data, updated_at FROM "{notation.STORE_TABLE}"').fetchall()
+    assert estimator.pending_rows("score") == 2
+    assert conn.execute(f'SELECT data, updated_at FROM "{notation.STORE_TABLE}"').fetchall() == before
+
+
+def test_pending_scores_are_unknown_without_cleaned(conn, tables, tmp_path):
+    shutil.rmtree(tmp_path / "Cleaned.parquet")
+    assert estimator.pending_rows("score") is None
+    e = estimator.predict(["wind"], ["score"], model=estimator.learn({}, conn))
+    assert e["rows"] == {"score": 0} and e["rows_unknown"] == ["score"]
@@ -0,0 +1,81 @@
+import time
+import threading
+
+import pytest
+
+from geo_gazetteer import GAZETTEER_FILE, GeoScorer, UNKNOWN_GEO_SCORE, gazetteer_version
+
+
+class FakeGeoChain:
+    """Answers "Score: 42" after ``seconds``; the first ``failures`` calls raise."""
+
+    def __init__(self, seconds=0.0, failures=0):
+        self.seconds, self.failures = seconds, failures
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, inputs):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.failures
+        time.sleep(self.seconds)
+        if fail:
+            raise ConnectionError("backend down")
+        return "Score: 42"
+
+
+@pytest.fixture
+def scorer_for(tmp_path):
+    scorers = []
+
+    def make(chain=None):
+        scorers.append(GeoScorer(chain, store_path=tmp_path / "store.sqlite"))
+        return scorers[-1]
+
+    yield make
+    for s in scorers:
+        s.conn.close()
+
+
+def test_gazetteer_then_memoized_llm_answer(scorer_for):
+    chain = FakeGeoChain()
+    scorer = scorer_for(chain)
+    assert scorer.score("Aberdeen", "United Kingdom") == 100
+    assert scorer.score("Atlantis", "Nowhere") == 42
+    assert scorer.score("Atlantis", "Nowhere") == 42
+    assert scorer.score("", "") == UNKNOWN_GEO_SCORE
+    assert scorer.stats == {"gazetteer": 1, "memo": 1, "llm": 1, "unknown": 1}
+    # The memo outlives the scorer (lead store)
+    assert scorer_for(FakeGeoChain()).score("Atlantis", "Nowhere") == 42
+    assert chain.calls == 1
+
+
+def test_parallel_rows_ask_once_per_place(scorer_for):
+    chain = FakeGeoChain(seconds=0.3)
+    scorer = scorer_for(chain)
+    places = [("Atlantis", "Nowhere")] * 4 + [("Lemuria", "Nowhere")]
+    threads = [threading.Thread(target=scorer.score, args=place) for place in places]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert chain.calls == 2
+    assert time.perf_counter() - start < 0.55  # both places asked at the same time
+    assert scorer.stats["llm"] == 2 and scorer.stats["memo"] == 3
+
+
+def test_failed_answer_is_asked_again(scorer_for):
+    scorer = scorer_for(FakeGeoChain(failures=1))
+    with pytest.raises(ConnectionError):
+        scorer.score("Atlantis", "Nowhere")
+    assert scorer.score("Atlantis", "Nowhere") == 42
+
+
+def test_gazetteer_version_follows_the_file(tmp_path):
+    copy = tmp_path / "geo_gazetteer.csv"
+    copy.write_bytes(GAZETTEER_FILE.read_bytes())
+    assert gazetteer_version(copy) == gazetteer_version()
+    with open(copy, "a", encoding="utf-8") as f:
+        f.write("city,Esbjerg2,,Denmark,1\n")
+    assert gazetteer_version(copy) != gazetteer_version()
@@ -0,0 +1,129 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import handoff
+from handoff import read_table, write_table, append_table, table_exists, table_path
+from lead_schema import attach_text
+
+LEADS = pd.DataFrame({
+    "post_id": ["a", "b", "c"],
+    "keyword": ["wind", "cable", "wind"],
+    "score_project_relevance": [80, None, 35],
+    "score_global": [71.5, None, 20.0],
+    "author_name": ["Ann", "Bob", None],
+})
+
+
+def test_round_trip_keeps_values_and_schema(tmp_path):
+    write_table(LEADS, tmp_path / "Scored_Enriched")
+    df = read_table(tmp_path / "Scored_Enriched")
+    assert isinstance(df["keyword"].dtype, pd.CategoricalDtype)
+    assert str(df["score_project_relevance"].dtype) == "Int16"
+    assert str(df["score_global"].dtype) == "Float64"
+    assert df["score_project_relevance"].tolist() == [80, pd.NA, 35]
+    assert df["author_name"].tolist()[:2] == ["Ann", "Bob"] and pd.isna(df["author_name"][2])
+
+
+def test_read_only_the_requested_columns(tmp_path):
+    write_table(LEADS, tmp_path / "Enriched")
+    df = read_table(tmp_path / "Enriched", columns=["post_id", "keyword", "not_a_column"])
+    assert list(df.columns) == ["post_id", "keyword"]
+
+
+def test_legacy_xlsx_is_read_until_parquet_exists(tmp_path):
+    LEADS.to_excel(tmp_path / "Cleaned.xlsx", index=False)
+    assert table_exists(tmp_path / "Cleaned")
+    assert read_table(tmp_path / "Cleaned")["post_id"].tolist() == ["a", "b", "c"]
+    write_table(LEADS.iloc[:1], tmp_path / "Cleaned")
+    assert read_table(tmp_path / "Cleaned")["post_id"].tolist() == ["a"]
+
+
+def test_append_skips_known_keys(tmp_path):
+    path = tmp_path / "Scraped"
+    append_table(LEADS.iloc[:2], path, dedup_on="post_id")
+    append_table(LEADS.iloc[1:].assign(author_name=["Bob again", "Cid"]), path, dedup_on="post_id")
+    df = read_table(path)
+    assert df["post_id"].tolist() == ["a", "b", "c"]
+    assert df.set_index("post_id").loc["b", "author_name"] == "Bob"  # rows already written are kept
+    assert len(list(table_path(path).glob("*.parquet"))) == 2      # history not rewritten
+
+
+def test_append_missing_and_new_columns(tmp_path):
+    path = tmp_path / "Scraped"
+    write_table(LEADS, path)
+    append_table(pd.DataFrame({"post_id": ["d"]}), path, dedup_on="post_id")
+    append_table(pd.DataFrame({"post_id": ["e"], "post_date": ["2026-10-19"]}), path, dedup_on="post_id")
+    df = read_table(path).set_index("post_id")
+    assert list(df.index) == ["a", "b", "c", "d", "e"]
+    assert pd.isna(df.loc["d", "keyword"])
+    assert df.loc["e", "post_date"] == "2026-10-19" and pd.isna(df.loc["a", "post_date"])
+
+
+def test_readers_always_get_a_whole_table_during_rewrites(tmp_path):
+    path = tmp_path / "Enriched"
+    write_table(LEADS.assign(author_name="0"), path)
+    stop, missing = threading.Event(), []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                df = read_table(path) if table_exists(path) else None
+            except FileNotFoundError:
+                df = None
+            if df is None or len(df) != 3 or df["author_name"].nunique() != 1:
+                missing.append(df)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(30):
+            write_table(LEADS.assign(author_name=str(i)), path)
+    finally:
+        stop.set()
+        thread.join()
+    assert not missing
+    assert read_table(path)["author_name"].tolist() == ["29"] * 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Enriched.parquet"]
+
+
+def test_concurrent_writers_of_the_same_table(tmp_path, monkeypatch):
+    # Two enrich jobs on disjoint keywords both rewrite Enriched (and its .xlsx copy)
+    monkeypatch.setattr(handoff, "EXPORT_EXCEL", "all")
+    path = tmp_path / "Enriched"
+    errors = []
+
+    def writer(name):
+        for i in range(20):
+            try:
+                write_table(LEADS.assign(author_name=f"{name}{i}"), path)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in "ab"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    last = read_table(path)["author_name"].tolist()
+    assert last in (["a19"] * 3, ["b19"] * 3)
+    assert len(pd.read_excel(tmp_path / "Enriched.xlsx")) == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Enriched.parquet", "Enriched.xlsx"]
+
+
+def test_excel_export_gets_the_post_text_back(tmp_path, monkeypatch):
+    texts = pd.DataFrame({"post_id": ["a", "b", "c"], "post_text": ["text a", "text b", "text c"]})
+    monkeypatch.setattr(handoff, "attach_text", lambda df: attach_text(df, texts))
+    monkeypatch.setattr(handoff, "EXPORT_EXCEL", "final")
+    write_table(LEADS, tmp_path / "Scored_Enriched")
+    assert "post_text" not in read_table(tmp_path / "Scored_Enriched").columns
+    exported = pd.read_excel(tmp_path / "Scored_Enriched.xlsx")
+    assert exported["post_text"].tolist() == ["text a", "text b", "text c"]
+
+
+def test_attach_text_needs_the_text_table(monkeypatch, tmp_path):
+    monkeypatch.setattr("lead_schema.TEXT_TABLE", tmp_path / "Cleaned")
+    with pytest.raises(FileNotFoundError):
+        attach_text(LEADS)
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue, conflicts, touches
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+
+def job(stages, keywords=None):
+    return {"stages": stages, "params": {"keywords": keywords} if keywords else {}}
+
+
+def test_touches_same_and_neighbouring_stages():
+    assert touches("enrich", "enrich")
+    assert touches("enrich", "score") and touches("clean", "enrich")
+    assert not touches("scrape", "score")
+    assert not touches("scrape", "export")
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    (job(["scrape"]), job(["score"]), False),                       # disjoint tables
+    (job(["enrich"]), job(["enrich"]), True),                       # same table, every keyword
+    (job(["enrich"], ["wind"]), job(["enrich"], ["cable"]), False),  # same table, other rows
+    (job(["enrich"], ["wind"]), job(["score"], ["wind", "cable"]), True),
+    (job(["enrich"], ["wind"]), job(["enrich"]), True),              # no keywords: all of them
+    (job(["score"], ["wind"]), job(["export"], ["cable"]), True),   # export covers every row
+    (job(["clean"]), job(["enrich"], ["wind"]), True),              # so does clean
+])
+def test_conflicts(a, b, expected):
+    assert conflicts(a, b) is expected
+    assert conflicts(b, a) is expected
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path)
+    yield queue
+    for j in queue.running():
+        queue.cancel(j["id"])
+
+
+def test_jobs_wait_for_their_resource_slot(queue, monkeypatch):
+    monkeypatch.setitem(job_queue.SLOTS, "llm", 2)
+    first = queue.submit(SLEEP, ["enrich"], {"keywords": ["wind"]})
+    second = queue.submit(SLEEP, ["enrich"], {"keywords": ["cable"]})
+    third = queue.submit(SLEEP, ["score"], {"keywords": ["survey"]})
+    scrape = queue.submit(SLEEP, ["scrape"], {"keywords": ["wind"]})
+    assert [first["status"], second["status"]] == ["running", "running"]
+    assert third["status"] == "queued"     # both llm slots taken
+    assert scrape["status"] == "running"   # browser slot free, scrape does not touch enrich's table
+
+    queue.cancel(first["id"])
+    assert queue.get(third["id"])["status"] == "running"
+
+
+def test_conflicting_job_waits_even_with_a_free_slot(queue, monkeypatch):
+    monkeypatch.setitem(job_queue.SLOTS, "llm", 2)
+    first = queue.submit(SLEEP, ["enrich"], {"keywords": ["wind"]})
+    second = queue.submit(SLEEP, ["score"], {"keywords": ["wind"]})
+    assert second["status"] == "queued"
+    queue.cancel(first["id"])
+    assert queue.get(second["id"])["status"] == "running"
+
+
+def test_finished_jobs_are_reaped(queue):
+    done = queue.submit([sys.executable, "-c", "pass"], ["export"])
+    failed = queue.submit([sys.executable, "-c", "raise SystemExit(3)"], ["scrape"])
+    deadline = time.time() + 10
+    while time.time() < deadline and {queue.get(j["id"])["status"] for j in (done, failed)} & {"running"}:
+        time.sleep(0.1)
+        queue.tick()
+    assert queue.get(done["id"])["status"] == "done"
+    assert queue.get(failed["id"])["returncode"] == 3
+    assert queue.get(failed["id"])["status"] == "failed"
+
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_cancel_stops_the_stage_subprocesses(queue, tmp_path):
+    child_pid = tmp_path / "child.pid"
+    # Like 06 --pipeline: the job process starts its own stage processes
+    command = [sys.executable, "-c",
+               "import subprocess, sys, time; "
+               f"p = subprocess.Popen({SLEEP!r}); open({str(child_pid)!r}, 'w').write(str(p.pid)); time.sleep(60)"]
+    running = queue.submit(command, ["score"])
+    deadline = time.time() + 10
+    while not (child_pid.exists() and child_pid.read_text()) and time.time() < deadline:
+        time.sleep(0.05)
+    pid = int(child_pid.read_text())
+    assert _alive(pid)
+
+    assert queue.cancel(running["id"])["status"] == "cancelled"
+    deadline = time.time() + 5
+    while _alive(pid) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(pid)
+
+
+def _restarted(tmp_path):
+    restarted = JobQueue(tmp_path)
+    restarted._loop = lambda: None  # start() without its scheduler thread
+    restarted.start()
+    return restarted
+
+
+def test_live_jobs_stay_running_on_restart(tmp_path, monkeypatch):
+    monkeypatch.setitem(job_queue.SLOTS, "llm", 2)
+    first = JobQueue(tmp_path)
+    started = first.submit(SLEEP, ["enrich"], {"keywords": ["wind"]})
+    proc = first._procs[started["id"]]
+    try:
+        restarted = _restarted(tmp_path)
+        assert restarted.get(started["id"])["status"] == "running"
+        # Still holds its table: a conflicting job submitted to the new server waits
+        assert restarted.submit(SLEEP, ["score"], {"keywords": ["wind"]})["status"] == "queued"
+
+        assert restarted.cancel(started["id"])["status"] == "cancelled"
+        proc.wait(timeout=5)
+    finally:
+        job_queue.terminate(proc)
+        for j in restarted.running():
+            restarted.cancel(j["id"])
+
+
+def test_jobs_of_a_previous_server_are_reaped_when_they_exit(tmp_path):
+    first = JobQueue(tmp_path)
+    started = first.submit(SLEEP, ["scrape"])
+    proc = first._procs[started["id"]]
+    restarted = _restarted(tmp_path)
+    assert restarted.get(started["id"])["status"] == "running"
+    job_queue.terminate(proc)
+    restarted.tick()
+    assert restarted.get(started["id"])["status"] == "failed"  # its stages never finished
+
+
+def test_dead_jobs_are_marked_interrupted_on_restart(tmp_path):
+    first = JobQueue(tmp_path)
+    started = first.submit(SLEEP, ["scrape"])
+    job_queue.terminate(first._procs[started["id"]])
+    assert _restarted(tmp_path).get(started["id"])["status"] == "interrupted"
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from lead_schema import apply_schema, attach_text, without_text
+
+
+def test_columns_get_their_declared_dtypes():
+    df = apply_schema(pd.DataFrame({
+        "keyword": ["wind", "wind", "cable"],
+        "error": ["", 404, None],                         # Excel leftovers: numbers among strings
+        "score_project_relevance": ["80", 55.4, None],
+        "score_global": [71.25, None, "12"],
+        "company_name": ["Acme", "Blue", "Cod"],
+    }))
+    assert isinstance(df["keyword"].dtype, pd.CategoricalDtype)
+    assert list(df["error"].cat.categories) == ["", "404"] and pd.isna(df["error"][2])
+    assert str(df["score_project_relevance"].dtype) == "Int16"
+    assert df["score_project_relevance"].tolist()[:2] == [80, 55]
+    assert str(df["score_global"].dtype) == "Float64" and df["score_global"][2] == 12.0
+    assert not isinstance(df["company_name"].dtype, pd.CategoricalDtype)  # free text stays as it is
+
+
+def test_merge_leftovers_are_folded_and_repeats_dropped():
+    df = apply_schema(pd.DataFrame({
+        "city_x": ["Oslo", "", None],
+        "city_y": ["Bergen", "Hull", "Cork"],
+        "author_name": ["Ann", "Bob", "Cy"],
+        "post_author": ["Ann", "Bob", "Cy"],
+        "index": [0, 1, 2],
+    }))
+    assert sorted(df.columns) == ["author_name", "city"]
+    assert df["city"].tolist() == ["Oslo", "Hull", "Cork"]  # first non-empty value wins
+
+
+def test_schema_is_idempotent():
+    df = apply_schema(pd.DataFrame({"theme": ["A", None], "cluster_size": [2, None]}))
+    again = apply_schema(df.copy())
+    pd.testing.assert_frame_equal(df, again)
+
+
+def test_post_text_is_dropped_then_joined_back_by_post_id():
+    texts = pd.DataFrame({"post_id": ["1", "2", "2"], "post_text": ["first", "second", "duplicate"]})
+    rows = pd.DataFrame({"post_id": [2, 1, 3], "company_name": ["Blue", "Acme", "Cod"],
+                         "post_text": ["second", "first", ""]})
+    slim = without_text(rows)
+    assert "post_text" not in slim.columns
+    assert without_text({"post_id": 1, "post_text": "first"}) == {"post_id": 1}
+
+    joined = attach_text(slim, texts)
+    assert joined["post_text"].tolist() == ["second", "first", ""]  # unknown post_id: empty text
+    assert joined["company_name"].tolist() == ["Blue", "Acme", "Cod"]
+
+
+def test_text_cannot_be_attached_without_the_text_table(tmp_path, monkeypatch):
+    monkeypatch.setattr("lead_schema.TEXT_TABLE", tmp_path / "Cleaned")
+    with pytest.raises(FileNotFoundError):
+        attach_text(pd.DataFrame({"post_id": ["1"]}))
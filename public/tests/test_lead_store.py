@@ -0,0 +1,35 @@
+import pandas as pd
+
+from lead_store import ensure_table, upsert_row, upsert_many, read_rows, read_frame, load_keys, count_rows, row_key
+
+
+def test_upsert_replaces_the_row_of_a_key(conn):
+    ensure_table(conn, "enriched")
+    upsert_row(conn, "enriched", "p1", {"post_id": "p1", "theme": "OTHER"})
+    upsert_row(conn, "enriched", "p1", {"post_id": "p1", "theme": "WIND"})
+    upsert_many(conn, "enriched", [("p2", {"post_id": "p2", "theme": "CABLE"})])
+    assert count_rows(conn, "enriched") == 2
+    assert read_rows(conn, "enriched") == [{"post_id": "p1", "theme": "WIND"}, {"post_id": "p2", "theme": "CABLE"}]
+    assert load_keys(conn, "enriched") == {"p1", "p2"}
+
+
+def test_nan_is_stored_as_null(conn):
+    ensure_table(conn, "enriched")
+    upsert_row(conn, "enriched", "p1", {"post_id": "p1", "city": float("nan"), "year": pd.NaT})
+    assert read_rows(conn, "enriched") == [{"post_id": "p1", "city": None, "year": None}]
+    assert conn.execute("SELECT json_extract(data, '$.city') IS NULL FROM enriched").fetchone() == (1,)
+
+
+def test_read_frame_keeps_the_requested_columns(conn):
+    ensure_table(conn, "scored")
+    upsert_row(conn, "scored", "p1", {"post_id": "p1", "score_global": 80})
+    df = read_frame(conn, "scored", columns=["post_id", "keyword", "score_global"])
+    assert list(df.columns) == ["post_id", "keyword", "score_global"]
+    assert df["keyword"].isna().all()
+
+
+def test_row_key_ignores_the_position():
+    assert row_key({"post_id": " p1 "}) == "p1"
+    no_id = {"post_id": "nan", "post_url": "https://x/1", "post_text": "hello"}
+    assert row_key(no_id) == row_key(dict(reversed(list(no_id.items()))))
+    assert row_key(no_id) != row_key({**no_id, "post_text": "other"})
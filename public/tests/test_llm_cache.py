@@ -0,0 +1,113 @@
+import pytest
+from langchain.prompts import PromptTemplate
+
+from llm_cache import LLMCache, CachedChain
+
+
+class FakeLLM:
+    """Counts calls; answers with the prompt it got."""
+
+    def __init__(self, model="mistral", temperature=0):
+        self.model = model
+        self.temperature = temperature
+        self.calls = 0
+
+    def invoke(self, text):
+        self.calls += 1
+        return f"answer to {text}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMCache(path=tmp_path / "cache.sqlite", enabled=True)
+    yield cache
+    cache.close()
+
+
+def chain(cache, llm, template="Company of {author}?", name="inference_chain"):
+    return CachedChain(name, PromptTemplate(input_variables=["author"], template=template), llm, cache)
+
+
+def test_same_inputs_are_served_from_the_cache(cache):
+    llm = FakeLLM()
+    first = chain(cache, llm).invoke({"author": "Ann"})
+    assert chain(cache, llm).invoke({"author": "Ann"}) == first
+    chain(cache, llm).invoke({"author": "Bob"})
+    assert llm.calls == 2
+    assert cache.hit_rates()["inference_chain"] == {"hits": 1, "misses": 2, "hit_rate": 0.333}
+
+
+def test_template_or_model_change_misses(cache):
+    llm = FakeLLM()
+    chain(cache, llm).invoke({"author": "Ann"})
+    chain(cache, llm, template="Employer of {author}?").invoke({"author": "Ann"})
+    chain(cache, FakeLLM(model="phi3")).invoke({"author": "Ann"})
+    chain(cache, FakeLLM(temperature=0.7)).invoke({"author": "Ann"})
+    assert cache.hit_rates()["inference_chain"]["hits"] == 0
+
+
+def test_invalidate_one_chain_or_one_template(cache):
+    llm = FakeLLM()
+    old, new = chain(cache, llm), chain(cache, llm, template="Employer of {author}?")
+    other = chain(cache, llm, template="Theme of {author}?", name="theme_chain")
+    for c in (old, new, other):
+        c.invoke({"author": "Ann"})
+
+    assert cache.invalidate(chain="inference_chain", thash=old.template_hash) == 1
+    assert cache.invalidate(chain="inference_chain") == 1
+    calls = llm.calls
+    other.invoke({"author": "Ann"})
+    assert llm.calls == calls  # theme_chain kept
+    old.invoke({"author": "Ann"})
+    assert llm.calls == calls + 1
+
+
+def test_lru_eviction_keeps_the_recently_used(cache, monkeypatch):
+    monkeypatch.setattr("llm_cache.EVICT_EVERY", 1)
+    cache.max_entries = 2
+    llm = FakeLLM()
+    c = chain(cache, llm)
+    c.invoke({"author": "Ann"})
+    c.invoke({"author": "Bob"})
+    c.invoke({"author": "Ann"})  # Ann used again, Bob is now the oldest
+    c.invoke({"author": "Cid"})
+    assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 2
+    calls = llm.calls
+    c.invoke({"author": "Ann"})
+    assert llm.calls == calls
+    c.invoke({"author": "Bob"})
+    assert llm.calls == calls + 1
+
+
+def test_disabled_cache_always_calls_the_llm(tmp_path):
+    cache = LLMCache(path=tmp_path / "cache.sqlite", enabled=False)
+    llm = FakeLLM()
+    for _ in range(2):
+        chain(cache, llm).invoke({"author": "Ann"})
+    assert llm.calls == 2
+    cache.close()
+
+
+def test_lookups_write_nothing_until_a_flush(cache, tmp_path):
+    c = chain(cache, FakeLLM())
+    c.invoke({"author": "Ann"})
+    writes = cache.conn.total_changes
+    for _ in range(5):
+        c.invoke({"author": "Ann"})
+    assert cache.conn.total_changes == writes  # hits only read SQLite
+
+    cache.close()
+    reopened = LLMCache(path=tmp_path / "cache.sqlite", enabled=True)
+    assert reopened.hit_rates(cumulative=True)["inference_chain"] == {"hits": 5, "misses": 1, "hit_rate": 0.833}
+    reopened.close()
+
+
+def test_counters_are_flushed_every_few_lookups(cache, monkeypatch):
+    monkeypatch.setattr("llm_cache.FLUSH_EVERY", 3)
+    c = chain(cache, FakeLLM())
+    c.invoke({"author": "Ann"})  # miss, then written with the response
+    c.invoke({"author": "Ann"})
+    c.invoke({"author": "Ann"})
+    assert cache.conn.execute("SELECT hits, misses FROM chain_stats").fetchone() == (0, 1)
+    c.invoke({"author": "Ann"})  # third lookup since the last write
+    assert cache.conn.execute("SELECT hits, misses FROM chain_stats").fetchone() == (3, 1)
@@ -0,0 +1,104 @@
+import json
+import time
+import threading
+from types import SimpleNamespace
+
+from llm_dispatcher import (DEFAULT_MODEL, DispatchedLLM, LLMDispatcher, SharedSlots, chain_model,
+                            load_chain_models, parse_backends, published_metrics)
+
+
+class FakeClient:
+    """Stands for OllamaLLM: ``seconds`` per call, raises when ``fail``; tracks its peak concurrency."""
+
+    def __init__(self, seconds=0.2, fail=False):
+        self.seconds, self.fail = seconds, fail
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate(self, texts):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.seconds)
+            if self.fail:
+                raise ConnectionError("backend down")
+            return SimpleNamespace(generations=[[SimpleNamespace(text="ok", generation_info={})]])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def dispatcher(backends, clients, shared=False, slots_dir=None):
+    d = LLMDispatcher(backends=backends, retries=1, shared=shared)
+    if slots_dir is not None:
+        d.slots = SharedSlots(slots_dir)
+    for backend, client in zip(d.backends, clients):
+        backend.client = lambda model, temperature, client=client: client
+    return d
+
+
+def run_parallel(calls):
+    threads = [threading.Thread(target=call) for call in calls]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_parse_backends():
+    assert parse_backends("http://a:11434=4, http://b:11434", default_limit=2) == [("http://a:11434", 4), ("http://b:11434", 2)]
+
+
+def test_limit_per_backend_is_honoured():
+    client = FakeClient()
+    d = dispatcher([("http://a", 2)], [client])
+    run_parallel([lambda: d.invoke("m", 0, "hi")] * 6)
+    assert client.peak == 2
+    assert d.metrics()["backends"][0]["requests"] == 6
+
+
+def test_failed_request_is_retried_on_another_backend():
+    down, up = FakeClient(seconds=0, fail=True), FakeClient(seconds=0)
+    d = dispatcher([("http://down", 1), ("http://up", 1)], [down, up])
+    assert [d.invoke("m", 0, "hi") for _ in range(3)] == ["ok"] * 3
+    backends = {b["url"]: b for b in d.metrics()["backends"]}
+    assert backends["http://down"]["failures"] == 1 and not backends["http://down"]["healthy"]
+    assert backends["http://up"]["requests"] == 3
+
+
+def test_slots_are_shared_between_dispatchers(tmp_path):
+    # Two dispatchers stand for 03 and 04 running side by side: one slot in total, not one each
+    client = FakeClient()
+    enrich = dispatcher([("http://a", 1)], [client], slots_dir=tmp_path)
+    score = dispatcher([("http://a", 1)], [client], slots_dir=tmp_path)
+    run_parallel([lambda: enrich.invoke("m", 0, "hi"), lambda: score.invoke("m", 0, "hi")] * 2)
+    assert client.peak == 1
+
+
+def test_metrics_are_published_per_process(conn, monkeypatch):
+    monkeypatch.setenv("TELEMETRY_RUN", "run-1")
+    d = dispatcher([("http://a", 1)], [FakeClient(seconds=0)])
+    d.invoke("m", 0, "hi")
+    d.publish(force=True)
+    [row] = published_metrics(conn)
+    assert row["run"] == "run-1" and row["backends"][0]["requests"] == 1
+    assert published_metrics(conn, run="other") == []
+
+
+def test_per_chain_models_override_the_default(tmp_path):
+    path = tmp_path / "llm_models.json"
+    assert load_chain_models(path) == {"default": DEFAULT_MODEL, "chains": {}}
+    path.write_text(json.dumps({"default": "mistral:7b", "chains": {"geo_chain": "qwen2.5:3b"}}), encoding="utf-8")
+    config = load_chain_models(path)
+    assert chain_model("geo_chain", config) == "qwen2.5:3b"
+    assert chain_model("scoring_chain", config) == "mistral:7b"
+
+
+def test_each_chain_calls_its_own_model():
+    asked = []
+    d = LLMDispatcher(backends=[("http://a", 2)], retries=1, shared=False)
+    d.backends[0].client = lambda model, temperature: asked.append(model) or FakeClient(seconds=0)
+    DispatchedLLM("qwen2.5:3b", dispatcher=d).invoke("where is Esbjerg?")
+    DispatchedLLM("mistral", dispatcher=d).invoke("score this post")
+    assert asked == ["qwen2.5:3b", "mistral"]
@@ -0,0 +1,63 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import script
+from handoff import write_table
+from pipeline import in_scope, row_limit
+
+runner = script("06_Executable")
+
+ROWS = pd.DataFrame({"post_id": ["a", "b", "c"], "keyword": ["wind", "cable", "wind"]})
+
+
+def test_stages_are_put_back_in_pipeline_order():
+    assert runner.parse_stages("export, score") == ["score", "export"]
+    assert runner.parse_stages("") == runner.STAGES
+    with pytest.raises(ValueError, match="scoring"):
+        runner.parse_stages("scrape,scoring")
+
+
+def test_skipped_stage_needs_the_table_it_would_have_written(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    assert runner.check_inputs(["scrape", "clean", "enrich"])  # nothing skipped upstream
+    assert not runner.check_inputs(["enrich", "score"])        # clean skipped, no Cleaned yet
+    assert "Cleaned introuvable" in capsys.readouterr().out
+
+    write_table(ROWS, "Cleaned")
+    assert runner.check_inputs(["enrich", "score"])
+    assert "[WARNING]" not in capsys.readouterr().out
+
+
+def test_a_stale_handoff_table_is_reported(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    write_table(ROWS, "Cleaned")
+    past = time.time() - 3600
+    for part in (tmp_path / "Cleaned.parquet").iterdir():
+        os.utime(part, (past, past))
+    write_table(ROWS, "Scraped")  # scraped again since Cleaned was written
+    assert runner.check_inputs(["enrich"])
+    assert "relancez clean" in capsys.readouterr().out
+
+
+def test_keyword_subset_and_row_limit(monkeypatch):
+    assert in_scope(ROWS) is ROWS and row_limit() == 0
+    monkeypatch.setenv("RUN_KEYWORDS", '["wind"]')
+    monkeypatch.setenv("ROW_LIMIT", "2")
+    assert list(in_scope(ROWS)["post_id"]) == ["a", "c"]
+    assert row_limit() == 2
+
+
+def test_api_run_options_become_runner_arguments():
+    from fastapi import HTTPException
+    import server
+    stages = server.parse_stages("export,score")
+    assert stages == ["score", "export"]
+    assert server.run_args(stages, ["wind farm", "cable"], limit=5, priority=True) == [
+        "--stages", "score,export", "--keywords", "wind farm", "cable", "--limit", "5", "--priority"]
+    assert server.run_args() == []
+    with pytest.raises(HTTPException) as error:
+        server.parse_stages("scrape,bogus")
+    assert error.value.status_code == 400
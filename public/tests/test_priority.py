@@ -0,0 +1,69 @@
+import pandas as pd
+
+import priority
+from lead_store import ensure_table, upsert_row
+
+
+def test_lexicon_matches_raw_and_cleaned_posts():
+    raw = "Pre-construction survey: tender for the cable route"
+    cleaned = "Preconstruction survey tender for the cable route"  # as 02_Cleaner leaves it
+    assert priority.lexicon_signal(raw) == priority.lexicon_signal(cleaned) == 1.0
+    assert priority.lexicon_signal("Pre construction works") == 0.25  # "construction" only
+
+
+def test_rows_are_ordered_by_keyword_yield_then_role(conn, monkeypatch):
+    monkeypatch.setenv("PRIORITY", "1")
+    ensure_table(conn, priority.SCORED_TABLE)
+    for key, keyword, score in (("s1", "wind", 80), ("s2", "wind", 60), ("s3", "cable", 35)):
+        upsert_row(conn, priority.SCORED_TABLE, key, {"keyword": keyword, "score_global": score})
+    assert priority.keyword_yields(conn) == {"wind": 1.0, "cable": 0.5}
+
+    df = pd.DataFrame({
+        "post_id": ["a", "b", "c", "d"],
+        "keyword": ["cable", "wind", "wind", "cable"],
+        "author_role": ["Head of Procurement", "Engineer", "Project Manager", "Intern"],
+        "post_text": [""] * 4,
+    })
+    assert list(priority.order_frame(df, conn)["post_id"]) == ["c", "b", "a", "d"]
+    pairs = [(key, row) for key, row in zip(df["post_id"], df.to_dict(orient="records"))]
+    assert [key for key, _ in priority.order_pairs(pairs, conn)] == ["c", "b", "a", "d"]
+
+
+def test_order_is_unchanged_outside_priority_mode(conn):
+    df = pd.DataFrame({"post_id": ["a", "b"], "keyword": ["x", "y"],
+                       "author_role": ["Intern", "CEO"], "post_text": ["", ""]})
+    assert list(priority.order_frame(df, conn)["post_id"]) == ["a", "b"]
+
+
+def test_interval_export_runs_at_most_once_per_interval(monkeypatch):
+    monkeypatch.setenv("PRIORITY", "1")
+    now = [1000.0]
+    monkeypatch.setattr(priority.time, "time", lambda: now[0])
+    calls = []
+    partial = priority.IntervalExport(lambda: calls.append(now[0]), interval=300)
+    partial.tick()
+    now[0] += 299
+    partial.tick()
+    assert calls == []
+    now[0] += 1
+    partial.tick()
+    partial.tick()
+    assert calls == [1300.0]
+    now[0] += 300
+    partial.tick()
+    assert calls == [1300.0, 1600.0]
+
+
+def test_partial_exports_only_in_priority_mode_and_never_raise(monkeypatch):
+    calls = []
+
+    def export():
+        calls.append(1)
+        raise OSError("disk full")
+
+    partial = priority.IntervalExport(export, interval=0)
+    partial.tick()
+    assert calls == []
+    monkeypatch.setenv("PRIORITY", "1")
+    partial.tick()  # only warns
+    assert calls == [1]
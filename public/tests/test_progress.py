@@ -0,0 +1,88 @@
+import json
+import time
+import asyncio
+
+import progress
+from progress import ProgressTracker, start_run, mark_stage, snapshot
+
+
+def states(conn):
+    return {e["stage"]: (e["state"], e["done"], e["total"]) for e in snapshot(conn)["stages"]}
+
+
+def test_run_plan_then_stage_progress(conn, monkeypatch):
+    monkeypatch.setenv("TELEMETRY_RUN", "run-1")
+    start_run(conn, ["scrape", "enrich", "score"])
+    tracker = ProgressTracker("enrich", total=3, conn=conn)
+    monkeypatch.setattr(progress, "EMIT_EVERY", 0)
+    tracker.advance()
+    assert states(conn) == {"scrape": ("pending", 0, None), "enrich": ("running", 1, 3), "score": ("pending", 0, None)}
+    assert [e["stage"] for e in snapshot(conn)["stages"]] == ["scrape", "enrich", "score"]
+
+    tracker.advance(2)
+    tracker.finish()
+    mark_stage(conn, "score", "failed")
+    assert states(conn)["enrich"] == ("done", 3, 3)
+    assert states(conn)["score"][0] == "failed"
+
+
+def test_writes_are_throttled(conn, monkeypatch):
+    monkeypatch.setattr(progress, "EMIT_EVERY", 3600)
+    tracker = ProgressTracker("score", conn=conn)
+    tracker.advance(5, remaining=10)
+    assert states(conn)["score"] == ("running", 0, None)  # only the first event was written
+    tracker.finish()
+    assert states(conn)["score"] == ("done", 5, 5)
+
+
+def test_runs_side_by_side_keep_their_own_progress(conn, monkeypatch):
+    monkeypatch.setenv("TELEMETRY_RUN", "job-a")
+    ProgressTracker("enrich", total=10, conn=conn).finish("failed")
+    time.sleep(0.01)  # events are stamped to the millisecond
+    monkeypatch.setenv("TELEMETRY_RUN", "job-b")
+    ProgressTracker("enrich", total=4, conn=conn)
+    assert snapshot(conn)["run"] == "job-b"
+    assert states(conn) == {"enrich": ("running", 0, 4)}
+    assert [e["state"] for e in snapshot(conn, run="job-a")["stages"]] == ["failed"]
+
+
+class SSEClient:
+    """Stands for the Request of /api/progress/stream: runs ``actions[n]`` at the n-th poll, leaves after ``polls``."""
+
+    def __init__(self, polls, actions):
+        self.polls, self.actions, self.seen = polls, actions, 0
+
+    async def is_disconnected(self):
+        self.seen += 1
+        if self.seen in self.actions:
+            self.actions[self.seen]()
+        return self.seen > self.polls
+
+
+def test_progress_stream_sends_the_state_then_each_change(conn, monkeypatch):
+    import server
+    monkeypatch.setattr(server, "PROGRESS_POLL", 0.01)
+    monkeypatch.setattr(server, "SSE_KEEPALIVE", 0.05)
+    monkeypatch.setitem(server._PROGRESS, "state", None)
+    monkeypatch.setattr(progress, "EMIT_EVERY", 0)
+    monkeypatch.setenv("TELEMETRY_RUN", "run-sse")
+    start_run(conn, ["enrich", "score"])
+    tracker = ProgressTracker("enrich", total=2, conn=conn)
+
+    def advance():
+        time.sleep(0.01)  # events are stamped to the millisecond
+        tracker.advance()
+
+    client = SSEClient(polls=12, actions={3: advance})
+
+    async def read():
+        response = await server.api_progress_stream(client)
+        assert response.media_type == "text/event-stream"
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(read())
+    assert chunks[0] == "retry: 3000\n\n"
+    events = [json.loads(c.split("data: ", 1)[1]) for c in chunks if c.startswith("event: progress")]
+    assert [e["run"] for e in events] == ["run-sse", "run-sse"]  # the state at connection, then one change
+    assert [(s["stage"], s["done"]) for s in events[1]["stages"]] == [("enrich", 1), ("score", 0)]
+    assert ": keepalive\n\n" in chunks  # idle stream kept open
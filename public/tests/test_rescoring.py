@@ -0,0 +1,113 @@
+import json
+
+import pandas as pd
+
+from handoff import read_table
+from lead_store import ensure_table, upsert_row, read_rows
+from conftest import script
+
+notation = script("04_Notation")
+
+ENRICHED = pd.DataFrame({
+    "post_id": ["a", "b"],
+    "post_text": ["Tender for a cable survey", "Wind farm consent granted"],
+    "company_name": ["Acme", "Blue"],
+    "author_name": ["Ann", "Bob"],
+    "keyword": ["cable", "wind"],
+})
+
+
+def store_scores(conn, df):
+    ensure_table(conn, notation.STORE_TABLE)
+    for _, row in df.iterrows():
+        upsert_row(conn, notation.STORE_TABLE, row["post_id"],
+                   {**row.to_dict(), "score_global": 50, "scoring_fingerprint": notation.scoring_fingerprint(row)})
+
+
+def pending_ids(conn, df):
+    return [key for key, _ in notation.pending_rows(df, notation.load_scored_fingerprints(conn), quiet=True)]
+
+
+def test_unchanged_rows_are_not_rescored(conn):
+    store_scores(conn, ENRICHED)
+    assert pending_ids(conn, ENRICHED) == []
+
+
+def test_new_and_changed_rows_are_rescored(conn):
+    store_scores(conn, ENRICHED.iloc[:1])
+    changed = ENRICHED.assign(company_name=["Acme Marine", "Blue"])
+    assert pending_ids(conn, ENRICHED) == ["b"]
+    assert pending_ids(conn, changed) == ["a", "b"]
+
+
+def test_fields_outside_the_prompts_do_not_trigger_a_rescore(conn):
+    store_scores(conn, ENRICHED)
+    assert pending_ids(conn, ENRICHED.assign(scraped_at="2026-10-19")) == []
+
+
+def test_prompt_change_rescores_every_row(conn, monkeypatch):
+    store_scores(conn, ENRICHED)
+    monkeypatch.setattr(notation, "PROMPT_VERSION", "another-version")
+    assert pending_ids(conn, ENRICHED) == ["a", "b"]
+
+
+def test_rows_stored_with_an_error_are_retried(conn):
+    ensure_table(conn, notation.STORE_TABLE)
+    upsert_row(conn, notation.STORE_TABLE, "a", {"post_id": "a", "score_global": None, "error": "timeout"})
+    store_scores(conn, ENRICHED.iloc[1:])
+    assert pending_ids(conn, ENRICHED) == ["a"]
+
+
+def test_a_failed_rescore_keeps_the_previous_score(conn):
+    store_scores(conn, ENRICHED.iloc[:1])
+    changed = ENRICHED.iloc[:1].assign(company_name="Acme Marine")
+    notation.store_score(conn, "a", {**changed.iloc[0].to_dict(), "error": "timeout"})
+
+    stored = read_rows(conn, notation.STORE_TABLE)[0]
+    assert stored["score_global"] == 50 and stored["company_name"] == "Acme"
+    assert stored["error"] == "timeout"
+    assert pending_ids(conn, changed) == ["a"]  # still retried
+
+
+def test_rows_scored_before_fingerprints_are_stamped_once(conn):
+    ensure_table(conn, notation.STORE_TABLE)
+    for row in ENRICHED.to_dict(orient="records"):
+        upsert_row(conn, notation.STORE_TABLE, row["post_id"], {**row, "score_global": 70})
+    assert pending_ids(conn, ENRICHED) == []
+    assert all(r["scoring_fingerprint"] for r in read_rows(conn, notation.STORE_TABLE))
+
+
+def test_only_the_run_keywords_are_pending(conn, monkeypatch):
+    monkeypatch.setenv("RUN_KEYWORDS", '["wind"]')
+    ensure_table(conn, notation.STORE_TABLE)
+    assert pending_ids(conn, ENRICHED) == ["b"]
+
+
+def test_scoring_config_overrides_only_the_given_weights(tmp_path):
+    path = tmp_path / "scoring_config.json"
+    path.write_text(json.dumps({"weights": {"relevance": 0.2}, "geo_bonus": 5}), encoding="utf-8")
+    config = notation.load_scoring_config(path)
+    assert config["weights"] == {"relevance": 0.2, "stage": 0.35, "company_fit": 0.15}
+    assert config["geo_bonus"] == 5 and config["max_score"] == 100
+    assert notation.load_scoring_config(tmp_path / "missing.json") == notation.DEFAULT_SCORING
+
+
+def test_rescore_recomputes_score_global_without_any_llm_call(conn, tmp_path, monkeypatch):
+    def no_llm():
+        raise AssertionError("rescore must not build the LLM chains")
+
+    monkeypatch.setattr(notation, "warm_up", no_llm)
+    monkeypatch.setattr(notation, "OUTPUT_FILE", tmp_path / "Scored_Enriched.parquet")
+    monkeypatch.setattr(notation, "SCORING", {**notation.DEFAULT_SCORING,
+                                              "weights": {"relevance": 0.0, "stage": 0.0, "company_fit": 1.0}})
+    ensure_table(conn, notation.STORE_TABLE)
+    for key, fit, geo in (("a", 40, 90), ("b", 90, 10)):
+        upsert_row(conn, notation.STORE_TABLE, key, {
+            "post_id": key, "score_global": 50, "score_project_relevance": 80, "score_project_stage": 60,
+            "score_company_fit": fit, "geographic_accessibility": geo})
+    upsert_row(conn, notation.STORE_TABLE, "c", {"post_id": "c", "score_global": None, "error": "timeout"})
+
+    notation.rescore()
+    scores = {r["post_id"]: r["score_global"] for r in read_rows(conn, notation.STORE_TABLE)}
+    assert scores == {"a": 42.0, "b": 90.0, "c": None}  # a: 40 + geo bonus, c: never scored
+    assert list(read_table(notation.OUTPUT_FILE)["post_id"][:2]) == ["b", "a"]  # re-exported, best first
@@ -0,0 +1,61 @@
+import os
+import sys
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import PUBLIC_DIR
+
+
+def test_importing_04_builds_no_chain_and_runs_nothing():
+    # A fresh interpreter: 04's import alone must not score, read tables or open Ollama clients
+    code = ("import importlib; m = importlib.import_module('04_Notation'); "
+            "print(m.llm is None and m.scoring_chain is None)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=PUBLIC_DIR, env=os.environ.copy(),
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip().splitlines()[-1] == "True"
+
+
+class FakeScorer:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.rows = []
+
+    def score_row(self, row):
+        if self.fail:
+            raise RuntimeError("ollama down")
+        self.rows.append(row)
+        return {**row, "score_global": 72.5, "scoring_fingerprint": "abc"}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    import server
+    scorer = FakeScorer()
+    monkeypatch.setattr(server, "get_scorer", lambda: scorer)
+    return TestClient(server.app), scorer
+
+
+def test_score_endpoint_scores_one_post(api):
+    client, scorer = api
+    r = client.post("/api/score", json={"post_text": "Cable survey tender", "author_name": "Ann", "city": "Oslo"})
+    assert r.status_code == 200
+    assert r.json()["score_global"] == 72.5 and "scoring_fingerprint" not in r.json()
+    assert scorer.rows[0]["city"] == "Oslo" and scorer.rows[0]["country"] == ""  # optional fields default to ""
+
+
+def test_score_endpoint_needs_text_and_author(api):
+    client, scorer = api
+    assert client.post("/api/score", json={"post_text": "  ", "author_name": "Ann"}).status_code == 400
+    assert client.post("/api/score", json={"post_text": "Tender"}).status_code == 422
+    assert scorer.rows == []
+
+
+def test_scoring_errors_are_a_bad_gateway(api, monkeypatch):
+    import server
+    client, _ = api
+    monkeypatch.setattr(server, "get_scorer", lambda: FakeScorer(fail=True))
+    r = client.post("/api/score", json={"post_text": "Tender", "author_name": "Ann"})
+    assert r.status_code == 502 and "ollama down" in r.json()["detail"]
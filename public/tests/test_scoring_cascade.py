@@ -0,0 +1,69 @@
+import pytest
+
+from conftest import script
+
+notation = script("04_Notation")
+
+POST = {"post_id": "p1", "post_text": "Tender for a cable route survey", "author_name": "Ann",
+        "author_role": "Head of Procurement", "company_name": "Acme", "city": "Aberdeen", "country": "UK"}
+
+
+class FakeChain:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return self.answer
+
+
+class FakeGeo:
+    def score(self, city, country):
+        return 90
+
+
+@pytest.fixture
+def chains(monkeypatch):
+    """04's chains answering canned text; ``chains["scoring"].answer`` sets the relevance."""
+    fakes = {
+        "analysis": FakeChain("PROJECT_SUMMARY: Cable survey\nPROJECT_PHASE: tender\nKEYWORDS: cable"),
+        "scoring": FakeChain("PROJECT_RELEVANCE: 80\nPROJECT_STAGE: 60\nCOMPANY_FIT: 70"),
+        "opportunity": FakeChain("COSMA_OPPORTUNITY: Route survey.\nCAPABILITY: geophysics\nEVIDENCE: tender"),
+        "contact": FakeChain("IDEAL_CONTACT: Ann\nRECOMMENDED_ACTION: Call\nREASONING: tender open"),
+    }
+    monkeypatch.setattr(notation, "llm", object())  # warm_up() has nothing left to build
+    monkeypatch.setattr(notation, "project_analysis_chain", fakes["analysis"])
+    monkeypatch.setattr(notation, "scoring_chain", fakes["scoring"])
+    monkeypatch.setattr(notation, "opportunity_chain", fakes["opportunity"])
+    monkeypatch.setattr(notation, "contact_action_chain", fakes["contact"])
+    monkeypatch.setattr(notation, "geo_scorer", FakeGeo())
+    monkeypatch.setattr(notation, "duckduckgo_search", lambda query: "")
+    return fakes
+
+
+def test_relevant_leads_run_every_chain(chains):
+    row = notation.score_row(dict(POST))
+    assert row["scoring_tier"] == "full"
+    assert (chains["opportunity"].calls, chains["contact"].calls) == (1, 1)
+    assert row["recommended_action"] == "Call" and row["cosma_opportunity"] == "Route survey."
+
+
+def test_low_relevance_leads_skip_opportunity_and_contact(chains):
+    chains["scoring"].answer = "PROJECT_RELEVANCE: 10\nPROJECT_STAGE: 60\nCOMPANY_FIT: 70"
+    row = notation.score_row(dict(POST))
+    assert row["scoring_tier"] == "low"
+    assert (chains["opportunity"].calls, chains["contact"].calls) == (0, 0)
+    assert row["recommended_action"] == "Low priority - archive"
+    assert row["ideal_contact"] == "Ann (Head of Procurement)"
+    assert row["cosma_opportunity"] == ""
+    # The skipped chains do not change how score_global is computed
+    assert row["score_global"] == notation.global_scores(10, 60, 70, 90, notation.SCORING)
+
+
+def test_threshold_zero_turns_the_cascade_off(chains, monkeypatch):
+    monkeypatch.setattr(notation, "CASCADE_THRESHOLD", 0)
+    chains["scoring"].answer = "PROJECT_RELEVANCE: 10\nPROJECT_STAGE: 60\nCOMPANY_FIT: 70"
+    row = notation.score_row(dict(POST))
+    assert row["scoring_tier"] == "full"
+    assert (chains["opportunity"].calls, chains["contact"].calls) == (1, 1)
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import signal
+import subprocess
+
+import pytest
+
+import telemetry
+from conftest import PUBLIC_DIR
+
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setattr(telemetry, "TELEMETRY", True)
+    monkeypatch.setattr(telemetry, "METRICS_FILE", path)
+    monkeypatch.setenv("TELEMETRY_RUN", "run-1")
+    yield path
+    telemetry._buffer.clear()
+
+
+def written(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()] if path.exists() else []
+
+
+def test_calls_are_buffered_rows_are_written_at_once(metrics):
+    telemetry.record("llm", "mistral", 1.5)
+    assert written(metrics) == []
+    telemetry.record("row", "score", 2.0, ok=True)
+    assert [e["kind"] for e in written(metrics)] == ["llm", "row"]
+    assert written(metrics)[1] == {**written(metrics)[1], "run": "run-1", "name": "score", "seconds": 2.0, "ok": True}
+
+
+def test_buffer_is_written_when_full_or_old(metrics, monkeypatch):
+    monkeypatch.setattr(telemetry, "FLUSH_EVERY", 3)
+    for _ in range(3):
+        telemetry.record("http", "example.com", 0.1)
+    assert len(written(metrics)) == 3
+
+    monkeypatch.setattr(telemetry, "FLUSH_SECONDS", 0)
+    telemetry.record("http", "example.com", 0.1)
+    assert len(written(metrics)) == 4
+
+
+def test_summary_of_a_run(metrics):
+    for seconds in (1.0, 3.0):
+        telemetry.record("llm", "mistral", seconds, prompt_tokens=100)
+    telemetry.record("chain", "theme_chain", 0.0, cached=True)
+    report = {(m["kind"], m["name"]): m for m in telemetry.summary("run-1", path=metrics)["metrics"]}
+    llm = report["llm", "mistral"]
+    assert (llm["count"], llm["total_seconds"], llm["prompt_tokens"]) == (2, 4.0, 200)
+    assert report["chain", "theme_chain"]["hit_rate"] == 1.0
+    assert telemetry.summary("other-run", path=metrics)["events"] == 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX signals")
+def test_sigterm_keeps_the_buffered_events(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    code = ("import sys, time, telemetry; "
+            "[telemetry.record('llm', 'mistral', 0.1) for _ in range(3)]; "
+            "print('ready', flush=True); time.sleep(60)")
+    env = {**os.environ, "TELEMETRY": "1", "METRICS_FILE": str(path), "PYTHONPATH": str(PUBLIC_DIR)}
+    proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, env=env)
+    assert proc.stdout.readline().strip() == b"ready"
+    proc.send_signal(signal.SIGTERM)
+    assert proc.wait(timeout=10) == -signal.SIGTERM  # still dies of the signal
+    proc.stdout.close()
+    assert len(written(path)) == 3
@@ -188,7 +188,7 @@ function App() {
       const res = await stopJob();
       console.log(res);
       if (res.stopped) {
-        setLastRunLog(`Process arrêté (PID: ${res.pid})`);
+        setLastRunLog(`Process arrêté (PID: ${(res.pids || [res.pid]).join(", ")})`);
       } else {
         setLastRunLog(`Arrêt échoué: ${res.reason}`);
       }
@@ -486,7 +486,7 @@ function App() {
                   background: jobStatus.running ? '#2ecc71' : '#bdc3c7'
                 }} />
                 {jobStatus.running
-                  ? `En cours (PID: ${jobStatus.pid})`
+                  ? `En cours (PID: ${(jobStatus.pids || [jobStatus.pid]).join(", ")})`
                   : 'Arrêté'}
               </span>
               {dataMeta?.exists && (